@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class OpsConfig(AppConfig):
+    """ The project package, installed in every profile for the commands and tests of its modules. """
+    name = 'app.app'
+    label = 'ops'
+    verbose_name = 'Operations'
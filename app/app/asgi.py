@@ -2,15 +2,23 @@
 ASGI config for app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it from the ``app`` folder with gunicorn's uvicorn workers (the Procfile's ``asgi``
+process); the /async/ catalog endpoints then handle their requests as coroutines.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
 """
 
 import os
+import sys
 
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+# Add the project root directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
 
-application = get_asgi_application()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.app.settings')
+os.environ['DJANGO_SERVER_MODE'] = 'asgi'
+
+application = ASGIStaticFilesHandler(get_asgi_application())
@@ -0,0 +1,206 @@
+"""
+Read path for list endpoints that skips per-row serializer instances.
+
+`ValuesReader` inspects a ModelSerializer once, then builds its output rows straight from
+`.values()` dicts with one precompiled converter per field (Decimal, datetime, choices).
+Many-to-many primary key fields are filled from one query over the through table.
+Serializer fields it can't reproduce exactly make the reader fall back to the serializer.
+"""
+from collections import defaultdict
+from functools import lru_cache
+
+from django.utils import timezone
+from rest_framework import fields as drf_fields
+from rest_framework import relations
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .metrics import timed
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.normalize_output or field.decimal_places is None:
+        return None
+    # Database values already carry the column's decimal places, so no quantize() is needed
+    spec = f'.{field.decimal_places}f'
+    return lambda value: '' if value is None else format(value, spec)
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != drf_fields.ISO_8601:
+        return None
+    default_timezone = getattr(field, 'timezone', None) or field.default_timezone()
+
+    def convert(value):
+        if value is None:
+            return None
+        if default_timezone is not None and timezone.is_aware(value):
+            value = value.astimezone(default_timezone)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _choice_converter(field):
+    mapping = dict(field.choice_strings_to_values)
+    return lambda value: mapping.get(str(value), value) if value is not None else None
+
+
+def _identity(value):
+    return value
+
+
+# Checked in order, so subclasses come before their bases
+CONVERTERS = [
+    (drf_fields.DecimalField, _decimal_converter),
+    (drf_fields.DateTimeField, _datetime_converter),
+    (drf_fields.ChoiceField, _choice_converter),
+    (drf_fields.CharField, lambda field: _identity),
+    (drf_fields.IntegerField, lambda field: _identity),
+    (drf_fields.FloatField, lambda field: _identity),
+    (drf_fields.BooleanField, lambda field: _identity),
+    (drf_fields.ReadOnlyField, lambda field: _identity),
+    (relations.PrimaryKeyRelatedField, lambda field: None if field.pk_field else _identity),
+]
+
+
+class UnsupportedField(Exception):
+    pass
+
+
+class ValuesReader:
+    def __init__(self, serializer_class, serializer_kwargs=None):
+        self.serializer_class = serializer_class
+        # E.g. the `fields` / `expand` of a fieldset (app.app.fieldsets)
+        self.serializer_kwargs = serializer_kwargs or {}
+        self._compiled = None
+
+    def compile(self):
+        """ Returns (columns, [(key, column, converter)], [(key, through, from_column, to_column)]). """
+        if self._compiled is not None:
+            return self._compiled
+        serializer = self.serializer_class(**self.serializer_kwargs)
+        model = serializer.Meta.model
+        columns, fields, many = [], [], []
+        for key, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, relations.ManyRelatedField):
+                if not isinstance(field.child_relation, relations.PrimaryKeyRelatedField):
+                    raise UnsupportedField(key)
+                m2m = model._meta.get_field(field.source)
+                through = m2m.remote_field.through
+                many.append((key, through, f'{m2m.m2m_field_name()}_id', f'{m2m.m2m_reverse_field_name()}_id'))
+                # Placeholder that keeps the serializer's key order, filled in by rows()
+                fields.append((key, model._meta.pk.attname, _identity))
+                continue
+            if '.' in field.source or field.source == '*':
+                raise UnsupportedField(key)
+            for field_class, factory in CONVERTERS:
+                if isinstance(field, field_class):
+                    converter = factory(field)
+                    break
+            else:
+                converter = None
+            if converter is None:
+                raise UnsupportedField(key)
+            column = model._meta.get_field(field.source).attname
+            columns.append(column)
+            fields.append((key, column, converter))
+        self._compiled = (columns, fields, many)
+        return self._compiled
+
+    def supported(self):
+        try:
+            self.compile()
+        except UnsupportedField:
+            return False
+        return True
+
+    def values(self, queryset, extra_columns=()):
+        """ `.values()` queryset with every column the rows need plus `extra_columns` (e.g. sort keys). """
+        columns = self.compile()[0]
+        wanted = list(dict.fromkeys([*columns, *extra_columns]))
+        return queryset.prefetch_related(None).values(*wanted)
+
+    def rows(self, values):
+        """ Output rows for an evaluated list of `.values()` dicts. """
+        links = {key: list(queryset) for key, queryset in self._link_querysets(values)}
+        with timed('serialize'):
+            return self._build(values, links)
+
+    async def arows(self, values):
+        """ `rows` for async views, the many-to-many links are fetched with the async ORM. """
+        links = {key: [pair async for pair in queryset] for key, queryset in self._link_querysets(values)}
+        with timed('serialize'):
+            return self._build(values, links)
+
+    def _link_querysets(self, values):
+        """ (key, (from id, to id) queryset) for every many-to-many field. """
+        if not values:
+            return []
+        pks = [value['id'] for value in values]
+        return [
+            (key, through.objects.filter(**{f'{from_column}__in': pks}).order_by('id').values_list(from_column, to_column))
+            for key, through, from_column, to_column in self.compile()[2]
+        ]
+
+    def _build(self, values, links):
+        _, fields, _ = self.compile()
+        rows = [{key: convert(value[column]) for key, column, convert in fields} for value in values]
+        for key, pairs in links.items():
+            related = defaultdict(list)
+            for from_id, to_id in pairs:
+                related[from_id].append(to_id)
+            for row, value in zip(rows, values):
+                row[key] = related[value['id']]
+        return rows
+
+
+@lru_cache(maxsize=256)
+def values_reader(serializer_class, fields=None, expand=None):
+    """ The shared reader of a serializer class, or of one of its fieldsets. """
+    if fields is None and expand is None:
+        return ValuesReader(serializer_class)
+    return ValuesReader(serializer_class, {'fields': fields, 'expand': expand})
+
+
+class FastListMixin:
+    """
+    `list` through a ValuesReader built from the viewset's serializer class. Only the rows
+    of the current page are converted, so the pagination and filters work unchanged.
+    """
+    fast_list = True
+
+    def use_fast_list(self):
+        reader = self.get_values_reader()
+        return self.fast_list and reader is not None and reader.supported()
+
+    def get_fieldset(self):
+        """ Overridden by FieldsetViewMixin. """
+        return {}
+
+    def get_values_reader(self):
+        return values_reader(self.get_serializer_class(), **self.get_fieldset())
+
+    def get_values_queryset(self):
+        """ The filtered `.values()` queryset of `list`, including the columns the pagination sorts on. """
+        queryset = self.filter_queryset(self.get_queryset())
+        sort_columns = [name.lstrip('-') for name in [*queryset.query.order_by, *(getattr(self, 'ordering', None) or [])]
+                        if isinstance(name, str)]
+        return self.get_values_reader().values(queryset, extra_columns=[*sort_columns, 'id'])
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_list():
+            return super().list(request, *args, **kwargs)
+
+        reader = self.get_values_reader()
+        values = self.get_values_queryset()
+        page = self.paginate_queryset(values)
+        if page is not None:
+            return self.get_paginated_response(reader.rows(page))
+        return Response(reader.rows(list(values)))
@@ -0,0 +1,162 @@
+"""
+Sparse fieldsets and on-demand expansion for the read endpoints: `?fields=` and `?expand=`.
+
+`?fields=id,name,price` limits each row to those fields. `?expand=components` renders the
+listed relations as nested objects instead of primary keys, and dotted names reach into
+an expanded relation: `?expand=pcs.components&fields=id,pcs.name,pcs.components.price`.
+
+Serializers opt in with `FieldsetMixin` and list what may be expanded in `expandable_fields`.
+On GET, views with `FieldsetViewMixin` pass the requested fieldset to their serializer and
+derive the queryset from it (`fieldset_queryset`): only the columns behind the rendered
+fields are loaded, and a relation is prefetched only when it is rendered, as bare primary
+keys unless it is expanded. Unknown names are refused with a 400.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+def parse_names(request, param):
+    """ Sorted comma separated names of a query parameter, None if it is absent or empty. """
+    value = request.query_params.get(param, '')
+    return tuple(sorted({name.strip() for name in value.split(',') if name.strip()})) or None
+
+
+def split_names(names):
+    """ ('id', 'pcs.name', 'pcs.components.price') -> ({'id', 'pcs'}, {'pcs': ('name', 'components.price')}) """
+    top, nested = set(), {}
+    for name in names:
+        head, _, rest = name.partition('.')
+        top.add(head)
+        if rest:
+            nested.setdefault(head, []).append(rest)
+    return top, {head: tuple(rest) for head, rest in nested.items()}
+
+
+class FieldsetMixin:
+    """
+    Serializer side: the `fields` and `expand` keyword arguments select its fields and
+    replace the fields in `expandable_fields` by nested serializers.
+    """
+    # name: (serializer class or its dotted path, keyword arguments), e.g. {'many': True, 'read_only': True}
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        self.requested_fields = fields
+        self.requested_expand = expand or ()
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expand, nested_expand = split_names(self.requested_expand)
+        unknown = expand - set(self.expandable_fields)
+        if unknown:
+            raise ValidationError({'expand': f"Cannot expand {', '.join(sorted(unknown))}, "
+                                             f"expected some of: {', '.join(sorted(self.expandable_fields))}."})
+        selected, nested_fields = split_names(self.requested_fields or ())
+        for name in expand:
+            serializer_class, kwargs = self.expandable_fields[name]
+            if isinstance(serializer_class, str):
+                serializer_class = import_string(serializer_class)
+            fields[name] = serializer_class(fields=nested_fields.get(name), expand=nested_expand.get(name), **kwargs)
+
+        if self.requested_fields is None:
+            return fields
+        readable = [name for name, field in fields.items() if not field.write_only]
+        unknown = selected - set(readable)
+        if unknown:
+            raise ValidationError({'fields': f"Unknown fields {', '.join(sorted(unknown))}, "
+                                             f"expected some of: {', '.join(readable)}."})
+        return {name: fields[name] for name in readable if name in selected}
+
+
+def _relation(model, source):
+    """ The model field behind `source`, also for reverse relations named by their accessor (`order_item_set`). """
+    try:
+        return model._meta.get_field(source)
+    except FieldDoesNotExist:
+        for relation in model._meta.related_objects:
+            if relation.get_accessor_name() == source:
+                return relation
+    return None
+
+
+def fieldset_queryset(serializer, queryset, extra_columns=()):
+    """
+    `queryset` loading only what `serializer` renders: `.only()` its columns plus
+    `extra_columns` (e.g. sort keys), and one prefetch per rendered to-many or expanded relation.
+    """
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+    meta = queryset.model._meta
+    columns = {meta.pk.attname}
+    prefetches = []
+    restricted = True
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        nested = field.child if isinstance(field, ListSerializer) else field
+        relation = None if '.' in field.source or field.source == '*' else _relation(queryset.model, field.source)
+        if relation is None:
+            # Computed or annotated values: which columns they read is unknown
+            restricted = False
+            continue
+        if relation.concrete and not relation.many_to_many:
+            columns.add(relation.attname)
+        if not relation.is_relation or not (relation.many_to_many or relation.one_to_many or isinstance(nested, BaseSerializer)):
+            continue
+        related = relation.related_model._default_manager.all()
+        # A reverse foreign key is matched to its objects through the column on the related side
+        back_columns = [relation.field.attname] if relation.one_to_many else []
+        if isinstance(nested, BaseSerializer):
+            related = fieldset_queryset(nested, related, back_columns)
+        else:
+            related = related.only(relation.related_model._meta.pk.attname, *back_columns)
+        prefetches.append(Prefetch(field.source, queryset=related))
+
+    queryset = queryset.prefetch_related(None).prefetch_related(*prefetches)
+    if not restricted:
+        return queryset
+    for name in extra_columns:
+        relation = _relation(queryset.model, name)
+        if relation is not None and relation.concrete:
+            columns.add(relation.attname)
+    return queryset.only(*columns)
+
+
+class FieldsetViewMixin:
+    """
+    `?fields=` / `?expand=` for a viewset whose serializer has `FieldsetMixin`. Write requests
+    are unaffected. Requesting an amount of CurrencyConversionMixin's `converted_fields`
+    also renders the field holding its currency.
+    """
+
+    def get_fieldset(self):
+        """ Serializer keyword arguments of the requested fieldset, empty when there is none. """
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in SAFE_METHODS:
+            return {}
+        if not issubclass(self.get_serializer_class(), FieldsetMixin):
+            return {}
+        fields, expand = parse_names(request, 'fields'), parse_names(request, 'expand')
+        if fields is None and expand is None:
+            return {}
+        if fields is not None:
+            currencies = {getattr(self, 'converted_fields', {}).get(name) for name in fields}
+            fields = tuple(sorted({*fields, *filter(None, currencies)}))
+        return {'fields': fields, 'expand': expand}
+
+    def get_serializer(self, *args, **kwargs):
+        return super().get_serializer(*args, **{**self.get_fieldset(), **kwargs})
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in SAFE_METHODS or not issubclass(self.get_serializer_class(), FieldsetMixin):
+            return queryset
+        serializer = self.get_serializer_class()(**self.get_fieldset())
+        sort_columns = [name.lstrip('-') for name in [*queryset.query.order_by, *(getattr(self, 'ordering', None) or [])]
+                        if isinstance(name, str)]
+        return fieldset_queryset(serializer, queryset, sort_columns)
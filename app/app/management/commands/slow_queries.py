@@ -0,0 +1,51 @@
+import json
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.app.slow_queries import SORT_KEYS, read_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        'Show the slowest query fingerprints recorded by the running server processes, '
+        'merged from their snapshots in SLOW_QUERY_SNAPSHOT_DIR.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--order-by', choices=list(SORT_KEYS), default='total')
+        parser.add_argument('--explain', action='store_true', help='Print the captured query plans')
+        parser.add_argument('--json', action='store_true', help='Print the merged entries as JSON')
+        parser.add_argument('--clear', action='store_true', help='Delete the snapshots instead')
+
+    def handle(self, *args, **options):
+        directory = settings.SLOW_QUERY_SNAPSHOT_DIR
+        if not directory:
+            raise CommandError('SLOW_QUERY_SNAPSHOT_DIR is not set.')
+        if options['clear']:
+            shutil.rmtree(directory, ignore_errors=True)
+            self.stdout.write(self.style.SUCCESS(f'Removed {directory}'))
+            return
+
+        entries = read_snapshots(directory)
+        entries.sort(key=lambda entry: entry[SORT_KEYS[options['order_by']]], reverse=True)
+        entries = entries[:options['limit']]
+        if options['json']:
+            self.stdout.write(json.dumps(entries, indent=2))
+            return
+        if not entries:
+            self.stdout.write(f'No slow queries recorded in {directory}')
+            return
+
+        self.stdout.write(f"{'id':<14}{'count':>7}{'total ms':>11}{'mean ms':>10}{'max ms':>10}  fingerprint")
+        for entry in entries:
+            self.stdout.write(
+                f"{entry['id']:<14}{entry['count']:>7}{entry['total_ms']:>11.1f}{entry['mean_ms']:>10.1f}"
+                f"{entry['max_ms']:>10.1f}  {entry['fingerprint'][:120]}"
+            )
+            self.stdout.write(f"{'':<14}views: {', '.join(entry['views'])}")
+            if options['explain'] and entry['explain']:
+                for line in entry['explain'].splitlines():
+                    self.stdout.write(f"{'':<14}| {line}")
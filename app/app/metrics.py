@@ -0,0 +1,274 @@
+"""
+Per-request performance instrumentation.
+
+`ServerTimingMiddleware` records for every request the SQL query count and DB time (an
+execute wrapper on each database connection), the time spent serializing (DRF's
+`serializer.data` and the values() list path), the render time and the total time. They
+are sent back as a `Server-Timing` header and aggregated per route into histograms that
+`/metrics` serves in the Prometheus text format. Queries over SLOW_QUERY_THRESHOLD_MS are
+handed to the slow-query log (slow_queries.py). The middleware also marks the startup
+phases of the process (startup.py), which `/metrics` serves as well.
+
+The histograms live in process memory, so with several workers each one reports its own;
+scrape them individually or run a single worker per metrics target. The bookkeeping is a
+few perf_counter() calls per request and per query plus one locked update per request.
+"""
+import bisect
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework import serializers
+
+from .slow_queries import recorder as slow_query_recorder
+from .startup import clock as startup_clock
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('request', 'slow_query_threshold', 'queries', 'db', 'serialize', 'render', '_depth')
+
+    def __init__(self, request):
+        self.request = request
+        self.slow_query_threshold = slow_query_recorder.threshold()
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self._depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            result = execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.db += elapsed
+            self.queries += 1
+        if elapsed >= self.slow_query_threshold:
+            slow_query_recorder.record(sql, params, many, elapsed, self.request, context['connection'])
+        return result
+
+
+@contextmanager
+def timed(phase):
+    """ Add the time spent in the block to `phase` of the current request; nested blocks count once. """
+    timings = _current.get()
+    if timings is None or timings._depth:
+        yield
+        return
+    timings._depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings._depth -= 1
+        setattr(timings, phase, getattr(timings, phase) + time.perf_counter() - start)
+
+
+_serializer_data = serializers.BaseSerializer.data
+
+
+def _timed_data(self):
+    with timed('serialize'):
+        return _serializer_data.fget(self)
+
+
+def instrument_serializers():
+    """ Time `serializer.data` of every DRF serializer (Serializer/ListSerializer call into it). """
+    serializers.BaseSerializer.data = property(_timed_data)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        """ (le, cumulative count) pairs including +Inf. """
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float('inf')), self.counts):
+            cumulative += count
+            yield bound, cumulative
+
+
+METRICS = {
+    # name: (help, buckets, value from (timings, total seconds))
+    'http_request_duration_seconds': ('Total request time.', DEFAULT_BUCKETS, lambda t, total: total),
+    'http_request_db_seconds': ('Time spent in SQL queries.', DEFAULT_BUCKETS, lambda t, total: t.db),
+    'http_request_serialize_seconds': ('Time spent serializing.', DEFAULT_BUCKETS, lambda t, total: t.serialize),
+    'http_request_render_seconds': ('Time spent rendering the response.', DEFAULT_BUCKETS, lambda t, total: t.render),
+    'http_request_queries': ('SQL queries per request.', QUERY_BUCKETS, lambda t, total: t.queries),
+}
+
+
+class Registry:
+    """ {(metric, route, method): Histogram} plus request counts by status. """
+
+    def __init__(self):
+        self._histograms = {}
+        self._requests = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route, method, status, timings, total):
+        with self._lock:
+            for name, (_, buckets, value) in METRICS.items():
+                key = (name, route, method)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(buckets)
+                histogram.observe(value(timings, total))
+            key = (route, method, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._requests.clear()
+
+    def render(self):
+        """ Prometheus text exposition format 0.0.4. """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            requests = sorted(self._requests.items())
+        lines = ['# HELP http_requests_total Requests by route, method and status.', '# TYPE http_requests_total counter']
+        lines += [
+            f'http_requests_total{{route="{route}",method="{method}",status="{status}"}} {count}'
+            for (route, method, status), count in requests
+        ]
+        current = None
+        for (name, route, method), histogram in histograms:
+            if name != current:
+                lines += [f'# HELP {name} {METRICS[name][0]}', f'# TYPE {name} histogram']
+                current = name
+            labels = f'route="{route}",method="{method}"'
+            for bound, count in histogram.samples():
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {sum(histogram.counts)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def route_name(request):
+    """ URL name of the matched route (e.g. `component-list`), its pattern as a fallback. """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route or 'unnamed'
+
+
+def _ms(seconds):
+    return f'{seconds * 1000:.2f}'
+
+
+class ServerTimingMiddleware:
+    """
+    Server-Timing header and per-route histograms; see the module docstring. Works in sync
+    and async middleware chains.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        instrument_serializers()
+        # Built with the rest of the middleware chain, i.e. when the application is loaded
+        startup_clock.mark('app_loaded')
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        startup_clock.mark('first_request_started')
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            response = self.get_response(request)
+            startup_clock.mark('first_response')
+            return response
+
+        timings = RequestTimings(request)
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            with self.wrap_connections(timings):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        startup_clock.mark('first_request_started')
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            response = await self.get_response(request)
+            startup_clock.mark('first_response')
+            return response
+
+        timings = RequestTimings(request)
+        token = _current.set(timings)
+        start = time.perf_counter()
+        # Connections are per thread: the async ORM and sync views of this request run on its
+        # thread-sensitive executor thread, so the wrappers go on that thread's connections
+        stack = await sync_to_async(self.wrap_connections)(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current.reset(token)
+        return self.finish(request, response, timings, time.perf_counter() - start)
+
+    @staticmethod
+    def wrap_connections(timings):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timings))
+        return stack
+
+    def finish(self, request, response, timings, total):
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={_ms(timings.db)};desc="{timings.queries} queries"',
+            f'serialize;dur={_ms(timings.serialize)}',
+            f'render;dur={_ms(timings.render)}',
+            f'total;dur={_ms(total)}',
+        ])
+        registry.observe(route_name(request), request.method, response.status_code, timings, total)
+        slow_query_recorder.maybe_snapshot()
+        startup_clock.mark('first_response')
+        return response
+
+    def process_template_response(self, request, response):
+        # Called right before response.render(); the callback runs right after it
+        timings = _current.get()
+        if timings is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                timings.render += time.perf_counter() - start
+            response.add_post_render_callback(rendered)
+        return response
+
+
+def metrics_view(request):
+    """ Prometheus scrape endpoint; requires `Authorization: Bearer <METRICS_TOKEN>` when the setting is set. """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render() + startup_clock.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,217 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over the viewset's ``ordering`` with the primary key as tiebreaker.
+
+    The cursor stores the sort key of the first/last row of the page, so every page is
+    one ``WHERE (name, id) > (...) ORDER BY name, id LIMIT n`` query that walks the
+    matching index instead of an OFFSET scan. Deep pages cost the same as the first one.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """ `paginate_queryset` for async views, the page is fetched with the async ORM. """
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([row async for row in queryset])
+
+    def page_queryset(self, queryset, request, view=None):
+        """ The unevaluated query for the requested page plus one row, or None when not paginating. """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.annotations = queryset.query.annotations
+        self.ordering = self.get_ordering(queryset, view)
+
+        cursor = self.decode_cursor(request)
+        self.reverse = bool(cursor and cursor['r'])
+        self.has_cursor = cursor is not None
+
+        order_by = [self._flip(field) if self.reverse else field for field in self.ordering]
+        queryset = queryset.order_by(*order_by)
+        if cursor is not None:
+            queryset = queryset.filter(self._keyset_filter(cursor['p'], self.reverse))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+
+        if self.reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.has_cursor
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Number of results to return per page (max {self.get_max_page_size()}).',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.get_max_page_size(),
+            )
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+
+    def get_max_page_size(self):
+        return getattr(settings, 'MAX_PAGE_SIZE', None)
+
+    def get_ordering(self, queryset, view):
+        """
+        Explicit ``order_by`` on the queryset (e.g. from OrderingFilter) wins over the
+        viewset's ``ordering``. The primary key is always appended so the sort key is unique.
+        """
+        ordering = [f for f in queryset.query.order_by if isinstance(f, str)]
+        if not ordering:
+            ordering = list(getattr(view, 'ordering', None) or [])
+
+        pk_name = self.model._meta.pk.name
+        ordering = [self._flip(pk_name) if f == '-pk' else pk_name if f == 'pk' else f for f in ordering]
+        if not any(f.lstrip('-') == pk_name for f in ordering):
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append(self._flip(pk_name) if descending else pk_name)
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self._position(self.page[-1])
+        else:
+            position = self._cursor_position
+        return self.encode_cursor(position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self._position(self.page[0])
+        else:
+            position = self._cursor_position
+        return self.encode_cursor(position, reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': [self._dump(value) for value in position], 'r': int(reverse)}
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            self._cursor_position = None
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            position = payload['p']
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            position = [self._load(field, value) for field, value in zip(self.ordering, position)]
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        self._cursor_position = position
+        return {'p': position, 'r': reverse}
+
+    def _keyset_filter(self, position, reverse):
+        """(a, b) > (x, y) expanded to ``a > x OR (a = x AND b > y)``, honouring each field's direction."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            condition |= equal & Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _position(self, item):
+        names = [field.lstrip('-') for field in self.ordering]
+        if isinstance(item, dict):
+            return [item[name] for name in names]
+        return [getattr(item, name) for name in names]
+
+    def _load(self, field, value):
+        name = field.lstrip('-')
+        if name in self.annotations:
+            return self.annotations[name].output_field.to_python(value)
+        try:
+            model_field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        return model_field.to_python(value)
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, Decimal):
+            return str(value)
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
@@ -0,0 +1,130 @@
+"""
+Primary/replica database routing for the replicas configured in DATABASE_REPLICA_URLS.
+
+Reads of the apps in REPLICA_READ_APPS (the catalog and users) go to one replica per
+request. Everything else goes to the primary (`default`), including:
+
+- all orders traffic and every write, including select_for_update() reads;
+- the rest of a request once it has written (read-your-writes);
+- whole requests with an unsafe method, so their validation reads see current rows.
+
+After a write, `ReplicaPinningMiddleware` also sets a cookie that keeps the same client
+on the primary for REPLICA_LAG_SECONDS, covering replication lag for its follow-up
+requests. Clients that drop cookies only get read-your-writes within a request.
+
+Replica reads happen only inside requests handled by the middleware. Management commands,
+the shell and background work read from the primary, and so does code in `primary()`.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'db_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState:
+    """ Per request: the replica serving its reads, or None once it is pinned to the primary. """
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+_state = ContextVar('db_routing', default=None)
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+@contextmanager
+def primary():
+    """ Route the reads in the block to the primary, e.g. to build in-process indexes from current rows. """
+    token = _state.set(None)
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None:
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label not in settings.REPLICA_READ_APPS:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.replica = None
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold copies of the primary's rows
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema through replication
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """ Sets up the routing state of each request and the read-your-writes cookie; see the module docstring. """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    def start(self, request):
+        aliases = replicas()
+        if not aliases:
+            return None
+        if request.method not in SAFE_METHODS or request.COOKIES.get(PIN_COOKIE):
+            return RoutingState(None)
+        return RoutingState(random.choice(aliases))
+
+    def finish(self, state, response):
+        if state is not None and state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_LAG_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,42 @@
+"""
+OpenAPI schema prebuilt at deploy time.
+
+drf-spectacular builds the schema by introspecting every view and serializer, on every
+request to SpectacularAPIView. build.sh instead writes it once with
+`manage.py spectacular --format openapi-json` to OPENAPI_SCHEMA_FILE, and in the prod
+profile (settings.APP_PROFILE), which does not install drf_spectacular, /api/schema/
+serves that file: read once per process, with a strong ETag of its content and
+Cache-Control max-age OPENAPI_SCHEMA_MAX_AGE, so clients revalidate with a 304.
+"""
+import hashlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+CONTENT_TYPE = 'application/vnd.oai.openapi+json'
+
+
+@lru_cache(maxsize=4)
+def load_schema(path):
+    """ (content, ETag) of the schema file; raises OSError when it has not been built. """
+    with open(path, 'rb') as file:
+        content = file.read()
+    return content, f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+@require_safe
+def schema_view(request):
+    try:
+        content, etag = load_schema(settings.OPENAPI_SCHEMA_FILE)
+    except OSError:
+        raise Http404('The OpenAPI schema has not been built; run `manage.py spectacular` as build.sh does.')
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=CONTENT_TYPE)
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE)
+    return response
@@ -0,0 +1,248 @@
+"""
+Sampled slow-query log.
+
+The execute wrapper of ServerTimingMiddleware (metrics.py) already times every query, so
+spotting a slow one costs a single comparison against SLOW_QUERY_THRESHOLD_MS. Only queries
+over the threshold, thinned out by SLOW_QUERY_SAMPLE_RATE, pay for the rest:
+
+- a normalized fingerprint: literals and placeholders become `?`, IN lists `(...)`;
+- one WARNING on the `app.slow_queries` logger with the view that ran the query;
+- an update of a bounded top-N table (SLOW_QUERY_TOP_N fingerprints by total time);
+- for the first sample of a SELECT fingerprint, its EXPLAIN plan, run on the same
+  connection past the execute wrappers, in a savepoint of the request's transaction.
+
+Each process keeps its own table, served at /metrics/slow-queries/ to admins. After it
+changed, it is written to SLOW_QUERY_SNAPSHOT_DIR at the end of a request, at most every
+SLOW_QUERY_SNAPSHOT_INTERVAL seconds; the `slow_queries` command merges the tables of all
+workers from there.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger('app.slow_queries')
+
+LOGGED_SQL_LENGTH = 500
+MAX_VIEWS = 5
+SORT_KEYS = {'total': 'total_ms', 'count': 'count', 'max': 'max_ms'}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w".])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """ `sql` with its values replaced, so queries differing only in values share one entry. """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint_id(text):
+    return hashlib.md5(text.encode()).hexdigest()[:12]
+
+
+def view_label(request):
+    """ URL name of the matched route and the view class or function handling it. """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    func = match.func
+    handler = getattr(func, 'cls', None) or getattr(func, 'view_class', None) or func
+    return f'{match.view_name or match.route} ({handler.__module__}.{handler.__qualname__})'
+
+
+def explain(connection, sql, params):
+    """
+    The query plan of `sql`, or the error that prevented getting it. Within a transaction
+    it runs in a savepoint: on PostgreSQL a failed EXPLAIN would abort the request's own.
+    """
+    prefix = connection.ops.explain_query_prefix()
+    savepoint = 'slow_query_explain' if connection.in_atomic_block and connection.features.uses_savepoints else None
+    try:
+        with connection.cursor() as wrapper, connection.wrap_database_errors:
+            # The backend cursor below the wrapper: no execute wrappers, no recursion
+            cursor = wrapper.cursor
+            if savepoint:
+                cursor.execute(connection.ops.savepoint_create_sql(savepoint))
+            try:
+                cursor.execute(f'{prefix} {sql}', params)
+                rows = cursor.fetchall()
+            except Exception:
+                if savepoint:
+                    cursor.execute(connection.ops.savepoint_rollback_sql(savepoint))
+                raise
+            if savepoint:
+                cursor.execute(connection.ops.savepoint_commit_sql(savepoint))
+    except DatabaseError as error:
+        return f'EXPLAIN failed: {error}'
+    return '\n'.join(' '.join(str(value) for value in row) for row in rows)
+
+
+class Entry:
+    __slots__ = ('id', 'fingerprint', 'count', 'total', 'max', 'last_seen', 'views', 'sql', 'explain')
+
+    def __init__(self, id, fingerprint, sql):
+        self.id = id
+        self.fingerprint = fingerprint
+        self.sql = sql
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last_seen = 0.0
+        self.views = []
+        self.explain = None
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'fingerprint': self.fingerprint,
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else None,
+            'last_seen': self.last_seen,
+            'views': list(self.views),
+            'sql': self.sql,
+            'explain': self.explain,
+        }
+
+
+class SlowQueryRecorder:
+    """ Bounded {fingerprint id: Entry}; when full, a new fingerprint replaces the one with the least total time. """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._snapshot_at = 0.0
+        self._changed = False
+
+    def threshold(self):
+        """ Seconds; infinite when the log is switched off. """
+        threshold_ms = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None)
+        return float('inf') if threshold_ms is None or threshold_ms < 0 else threshold_ms / 1000
+
+    def record(self, sql, params, many, duration, request, connection):
+        if random.random() >= getattr(settings, 'SLOW_QUERY_SAMPLE_RATE', 1.0):
+            return
+        text = fingerprint(sql)
+        key = fingerprint_id(text)
+        view = view_label(request)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= getattr(settings, 'SLOW_QUERY_TOP_N', 50):
+                    del self._entries[min(self._entries.values(), key=lambda e: e.total).id]
+                entry = self._entries[key] = Entry(key, text, sql)
+                needs_plan = not many and sql.lstrip()[:6].upper() == 'SELECT'
+            else:
+                needs_plan = False
+            entry.count += 1
+            entry.total += duration
+            entry.max = max(entry.max, duration)
+            entry.last_seen = time.time()
+            if view not in entry.views and len(entry.views) < MAX_VIEWS:
+                entry.views.append(view)
+            self._changed = True
+
+        logger.warning('Slow query %.1f ms in %s [%s]: %s', duration * 1000, view, key, sql[:LOGGED_SQL_LENGTH])
+        if needs_plan:
+            entry.explain = explain(connection, sql, params)
+
+    def top(self, limit=None, order_by='total'):
+        with self._lock:
+            entries = [entry.as_dict() for entry in self._entries.values()]
+        entries.sort(key=lambda entry: entry[SORT_KEYS[order_by]], reverse=True)
+        return entries[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._changed = False
+
+    def maybe_snapshot(self):
+        directory = getattr(settings, 'SLOW_QUERY_SNAPSHOT_DIR', '')
+        now = time.monotonic()
+        if not directory or not self._changed or now - self._snapshot_at < settings.SLOW_QUERY_SNAPSHOT_INTERVAL:
+            return
+        self._snapshot_at = now
+        self._changed = False
+        try:
+            write_snapshot(directory, self.top())
+        except OSError as error:
+            logger.error('Could not write the slow-query snapshot to %s: %s', directory, error)
+
+
+recorder = SlowQueryRecorder()
+
+
+def write_snapshot(directory, entries):
+    """ This process's table as <directory>/<pid>.json, replaced atomically. """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as file:
+        json.dump({'pid': os.getpid(), 'written_at': time.time(), 'entries': entries}, file)
+    os.replace(f'{path}.tmp', path)
+
+
+def read_snapshots(directory):
+    """ Entries of every process's snapshot merged by fingerprint. """
+    merged = {}
+    if not os.path.isdir(directory):
+        return []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as file:
+                entries = json.load(file)['entries']
+        except (OSError, ValueError, KeyError):
+            continue
+        for entry in entries:
+            current = merged.get(entry['id'])
+            if current is None:
+                merged[entry['id']] = dict(entry)
+                continue
+            current['count'] += entry['count']
+            current['total_ms'] += entry['total_ms']
+            current['max_ms'] = max(current['max_ms'], entry['max_ms'])
+            current['last_seen'] = max(current['last_seen'], entry['last_seen'])
+            current['views'] += [view for view in entry['views'] if view not in current['views']]
+            current['explain'] = current['explain'] or entry['explain']
+    for entry in merged.values():
+        entry['mean_ms'] = round(entry['total_ms'] / entry['count'], 3)
+    return list(merged.values())
+
+
+class SlowQueryView(APIView):
+    """ Top slow-query fingerprints of the process serving the request: ?limit=, ?order_by=total|count|max """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        order_by = request.query_params.get('order_by', 'total')
+        if order_by not in SORT_KEYS:
+            order_by = 'total'
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            limit = 20
+        return Response({
+            'threshold_ms': getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None),
+            'sample_rate': getattr(settings, 'SLOW_QUERY_SAMPLE_RATE', 1.0),
+            'results': recorder.top(limit, order_by),
+        })
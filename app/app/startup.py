@@ -0,0 +1,74 @@
+"""
+Cold-start timing of this process.
+
+Three points in the life of a worker are recorded as seconds since the process started
+(for a gunicorn worker: since the master forked it):
+
+- `app_loaded`: Django is set up and the middleware chain built, i.e. the WSGI/ASGI
+  application exists; ServerTimingMiddleware's constructor marks it;
+- `first_request_started` and `first_response`: the first request entered and left the
+  middleware chain. The difference to `app_loaded` covers what Django imports lazily on
+  the first request: URLconf, views, serializers.
+
+The process start comes from /proc on Linux and falls back to the import of this module
+elsewhere. When the first response is out, the times are logged once on the `app.startup`
+logger and `/metrics` serves them as the `process_startup_seconds` gauge.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('app.startup')
+
+PHASES = ('app_loaded', 'first_request_started', 'first_response')
+
+
+def process_age():
+    """ Seconds since this process was created, or None where /proc is unavailable. """
+    try:
+        with open('/proc/self/stat', encoding='ascii') as file:
+            # Field 22, counted after the parenthesized command name which may contain spaces
+            started_ticks = int(file.read().rpartition(')')[2].split()[19])
+        with open('/proc/uptime', encoding='ascii') as file:
+            uptime = float(file.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(uptime - started_ticks / os.sysconf('SC_CLK_TCK'), 0.0)
+
+
+class StartupClock:
+    def __init__(self):
+        age = process_age()
+        self.started = time.monotonic() - (age if age is not None else 0.0)
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def mark(self, phase):
+        """ Records `phase` the first time it is reached; later calls are a dict lookup. """
+        if phase in self.phases:
+            return
+        with self._lock:
+            if phase in self.phases:
+                return
+            self.phases[phase] = time.monotonic() - self.started
+        if phase == 'first_response':
+            logger.info(
+                'Worker %s: app loaded after %.0f ms, first response after %.0f ms',
+                os.getpid(), self.phases.get('app_loaded', 0.0) * 1000, self.phases[phase] * 1000,
+            )
+
+    def render(self):
+        """ Prometheus text exposition format 0.0.4. """
+        lines = [
+            '# HELP process_startup_seconds Seconds from process start to each startup phase.',
+            '# TYPE process_startup_seconds gauge',
+        ]
+        lines += [
+            f'process_startup_seconds{{phase="{phase}"}} {self.phases[phase]:.6f}'
+            for phase in PHASES if phase in self.phases
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+clock = StartupClock()
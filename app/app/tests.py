@@ -0,0 +1,243 @@
+import io
+import json
+import logging
+import os
+import tempfile
+from unittest import mock
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from pc_components import cache as pc_cache
+from pc_components.models import Pc_Components
+from pc_components.tests import create_pcs
+from users.models import User
+from . import metrics, schema, slow_queries, startup, throttling
+
+PASSWORD = 'secret-password'
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        metrics.registry.clear()
+        pc_cache.clear()
+        create_pcs(2)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/components/')
+        entries = dict(entry.split(';', 1) for entry in response['Server-Timing'].split(', '))
+        self.assertEqual(set(entries), {'db', 'serialize', 'render', 'total'})
+        self.assertRegex(entries['db'], r'^dur=[\d.]+;desc="[1-9]\d* queries"$')
+
+    def test_histograms_per_route(self):
+        self.client.get('/components/')
+        self.client.get('/components/')
+        self.client.get(f'/pcs/{Pc_Components.objects.first().pc_id}/')
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn('http_requests_total{route="component-list",method="GET",status="200"} 2', text)
+        self.assertIn('http_request_duration_seconds_count{route="component-list",method="GET"} 2', text)
+        self.assertIn('http_request_queries_bucket{route="pc-detail",method="GET",le="+Inf"} 1', text)
+        self.assertIn('# TYPE http_request_serialize_seconds histogram', text)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_BUCKETS={
+    'token': {'ip': {'rate': '2/min'}, 'route': {'rate': '3/min'}},
+    'orders': {'user': {'rate': '60/min', 'burst': 2}},
+})
+class ThrottleTests(TestCase):
+    def setUp(self):
+        throttling.clear()
+        self.users = [User.objects.create_user(f'customer{number}', password=PASSWORD) for number in range(2)]
+
+    def login(self, user, ip='198.51.100.1'):
+        return self.client.post('/api/token/', {'username': user.username, 'password': PASSWORD}, REMOTE_ADDR=ip)
+
+    def test_ip_bucket_with_retry_after(self):
+        self.assertEqual(self.login(self.users[0]).status_code, 200)
+        self.assertEqual(self.login(self.users[1]).status_code, 200)
+        response = self.login(self.users[0])
+        self.assertEqual(response.status_code, 429)
+        # One token per 30 seconds
+        self.assertIn(int(response['Retry-After']), range(29, 31))
+        self.assertEqual(self.login(self.users[0], ip='198.51.100.2').status_code, 200)
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        statuses = [
+            self.client.post('/api/token/', {'username': self.users[0].username, 'password': PASSWORD},
+                             REMOTE_ADDR='198.51.100.1', HTTP_X_FORWARDED_FOR=f'203.0.113.{number}').status_code
+            for number in range(3)
+        ]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    @override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, NUM_PROXIES=1))
+    def test_forwarded_for_behind_proxies(self):
+        statuses = [
+            self.client.post('/api/token/', {'username': self.users[0].username, 'password': PASSWORD},
+                             REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=f'203.0.113.{number // 2}').status_code
+            for number in range(3)
+        ]
+        self.assertEqual(statuses, [200, 200, 200])
+
+    def test_route_bucket_is_shared_by_all_clients(self):
+        for number in range(3):
+            self.assertEqual(self.login(self.users[0], ip=f'198.51.100.{number}').status_code, 200)
+        self.assertEqual(self.login(self.users[0], ip='198.51.100.9').status_code, 429)
+
+    def test_user_bucket_refills(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        other = APIClient()
+        other.force_authenticate(self.users[1])
+        with mock.patch('app.app.throttling.time.time', return_value=1000.0):
+            self.assertEqual([client.get('/orders/').status_code for _ in range(3)], [200, 200, 429])
+            self.assertEqual(other.get('/orders/').status_code, 200)
+        with mock.patch('app.app.throttling.time.time', return_value=1001.0):
+            self.assertEqual(client.get('/orders/').status_code, 200)
+            self.assertEqual(client.get('/orders/').status_code, 429)
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_disabled(self):
+        for _ in range(3):
+            self.assertEqual(self.login(self.users[0]).status_code, 200)
+
+    def test_file_backend(self):
+        location = tempfile.mkdtemp()
+        caches = dict(settings.CACHES, throttle={
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        })
+        with override_settings(CACHES=caches):
+            statuses = [self.login(self.users[0]).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+
+class StartupTests(TestCase):
+    def test_phases_are_marked_once(self):
+        clock = startup.StartupClock()
+        with self.assertLogs('app.startup', 'INFO') as logs:
+            clock.mark('app_loaded')
+            clock.mark('first_response')
+            first = clock.phases['first_response']
+            clock.mark('first_response')
+        self.assertEqual(clock.phases['first_response'], first)
+        self.assertLessEqual(clock.phases['app_loaded'], first)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn(f'process_startup_seconds{{phase="first_response"}} {first:.6f}', clock.render())
+
+    def test_served_by_metrics(self):
+        self.client.get('/hello/')
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn('# TYPE process_startup_seconds gauge', text)
+        for phase in startup.PHASES:
+            self.assertIn(f'process_startup_seconds{{phase="{phase}"}}', text)
+
+
+class PrebuiltSchemaTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, 'openapi.json')
+        with open(self.path, 'w') as file:
+            json.dump({'openapi': '3.0.3', 'paths': {}}, file)
+        schema.load_schema.cache_clear()
+        self.addCleanup(schema.load_schema.cache_clear)
+        self.factory = RequestFactory()
+
+    def test_served_with_caching_headers(self):
+        with override_settings(OPENAPI_SCHEMA_FILE=self.path, OPENAPI_SCHEMA_MAX_AGE=600):
+            response = schema.schema_view(self.factory.get('/api/schema/'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content)['openapi'], '3.0.3')
+            self.assertEqual(response['Content-Type'], schema.CONTENT_TYPE)
+            self.assertIn('max-age=600', response['Cache-Control'])
+
+            revalidated = schema.schema_view(self.factory.get('/api/schema/', HTTP_IF_NONE_MATCH=response['ETag']))
+            self.assertEqual(revalidated.status_code, 304)
+            self.assertEqual(revalidated['ETag'], response['ETag'])
+
+    def test_missing_file(self):
+        with override_settings(OPENAPI_SCHEMA_FILE=self.path + '.missing'):
+            with self.assertRaises(schema.Http404):
+                schema.schema_view(self.factory.get('/api/schema/'))
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_SAMPLE_RATE=1.0, SLOW_QUERY_SNAPSHOT_DIR='')
+class SlowQueryTests(TestCase):
+    def setUp(self):
+        slow_queries.recorder.clear()
+        self.addCleanup(slow_queries.recorder.clear)
+        # Keeps the test output clean; assertLogs still sees the records
+        null_handler = logging.NullHandler()
+        slow_queries.logger.addHandler(null_handler)
+        self.addCleanup(slow_queries.logger.removeHandler, null_handler)
+        pc_cache.clear()
+        create_pcs(2)
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            slow_queries.fingerprint("SELECT  a FROM t WHERE id IN (%s, %s, %s) AND name = 'x''y' LIMIT 21"),
+            'SELECT a FROM t WHERE id IN (...) AND name = ? LIMIT ?',
+        )
+        self.assertEqual(slow_queries.fingerprint('SELECT "t2"."c1" FROM "t2"'), 'SELECT "t2"."c1" FROM "t2"')
+
+    def test_records_view_and_explains_once_per_fingerprint(self):
+        with mock.patch.object(slow_queries, 'explain', wraps=slow_queries.explain) as explain, \
+                self.assertLogs('app.slow_queries', 'WARNING') as logs:
+            self.client.get('/components/')
+            self.client.get('/components/?page_size=5')
+        entries = slow_queries.recorder.top()
+        select = next(entry for entry in entries if 'pc_components_component' in entry['fingerprint'])
+        self.assertEqual(select['count'], 2)
+        self.assertEqual(select['views'], ['component-list (pc_components.views.ComponentViewSet)'])
+        self.assertTrue(select['explain'])
+        self.assertEqual(explain.call_count, len(entries))
+        self.assertIn('component-list', logs.output[0])
+
+    def test_failed_explain_is_rolled_back_to_a_savepoint(self):
+        ops = connection.ops
+        with mock.patch.object(ops, 'savepoint_rollback_sql', wraps=ops.savepoint_rollback_sql) as rollback:
+            plan = slow_queries.explain(connection, 'SELECT * FROM missing_table', [])
+        self.assertTrue(plan.startswith('EXPLAIN failed'))
+        rollback.assert_called_once_with('slow_query_explain')
+        # The test's transaction is still usable
+        self.assertEqual(Pc_Components.objects.count(), 6)
+
+    @override_settings(SLOW_QUERY_TOP_N=2)
+    def test_table_is_bounded(self):
+        for url in ['/components/', '/pcs/', '/users/', '/orders/']:
+            self.client.get(url)
+        self.assertEqual(len(slow_queries.recorder.top()), 2)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=-1)
+    def test_disabled(self):
+        self.client.get('/components/')
+        self.assertEqual(slow_queries.recorder.top(), [])
+
+    def test_snapshots_are_merged_by_the_command(self):
+        directory = tempfile.mkdtemp()
+        self.client.get('/components/')
+        first = slow_queries.recorder.top()
+        slow_queries.write_snapshot(directory, first)
+        with open(f'{directory}/other.json', 'w') as file:
+            json.dump({'pid': 0, 'entries': first}, file)
+        out = io.StringIO()
+        with override_settings(SLOW_QUERY_SNAPSHOT_DIR=directory):
+            call_command('slow_queries', '--json', stdout=out)
+            merged = {entry['id']: entry for entry in json.loads(out.getvalue())}
+            call_command('slow_queries', '--clear', stdout=io.StringIO())
+        self.assertEqual({key: entry['count'] for key, entry in merged.items()},
+                         {entry['id']: entry['count'] * 2 for entry in first})
+        self.assertEqual(slow_queries.read_snapshots(directory), [])
+
+    def test_admin_endpoint(self):
+        self.assertIn(self.client.get('/metrics/slow-queries/').status_code, (401, 403))
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='admin', is_staff=True, is_superuser=True))
+        client.get('/components/')
+        response = client.get('/metrics/slow-queries/?order_by=count&limit=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
@@ -0,0 +1,140 @@
+"""
+Token-bucket throttling.
+
+A view opts in with `throttle_classes = [TokenBucketThrottle]` and a `throttle_scope`;
+THROTTLE_BUCKETS maps the scope to up to three buckets, each with a sustained rate and a
+burst capacity:
+
+- `user`: one bucket per authenticated user (anonymous requests skip it);
+- `ip`: one bucket per client address: REMOTE_ADDR, or with NUM_PROXIES set the address
+  DRF's get_ident() reads from X-Forwarded-For that many proxies from its end;
+- `route`: one bucket per URL name shared by every client, capping the load a route
+  puts on the workers and the database.
+
+A view may also set `throttle_buckets` itself, in the same shape, instead of a scope.
+
+A request takes one token from each of its buckets, or from none when one of them is
+empty; the 429 response then carries `Retry-After` with the time until that bucket holds
+a token again. A bucket is stored as (tokens, timestamp) in the THROTTLE_CACHE alias and
+refilled on read, so there is no timer; it expires once it would be full again, and a
+missing bucket is a full one.
+
+The check is a get_many() and a set_many() on the cache under a process lock, which
+makes it exact with the local-memory backend. That backend is per process, though, so
+each worker enforces the rates on its own. The file backend shares the buckets between
+the workers of a host, at the price of a file read and write per bucket; concurrent
+workers may then overwrite each other's update and let a request or two through too many.
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+KINDS = ('user', 'ip', 'route')
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+_lock = threading.Lock()
+
+
+class Bucket:
+    __slots__ = ('capacity', 'refill')
+
+    def __init__(self, rate, burst=None):
+        count, period = parse_rate(rate)
+        self.refill = count / period
+        self.capacity = burst if burst is not None else count
+
+
+def parse_rate(rate):
+    """ '30/min' -> (30, 60): requests per period in seconds. """
+    count, _, period = rate.partition('/')
+    return int(count), PERIODS[period[:1]]
+
+
+def throttle_cache():
+    return caches[settings.THROTTLE_CACHE]
+
+
+def clear():
+    throttle_cache().clear()
+
+
+def take(buckets, now):
+    """
+    Takes a token from each of `buckets` ({cache key: Bucket}) if all of them hold one.
+    Returns 0 then, else the seconds until the emptiest one does.
+    """
+    cache = throttle_cache()
+    with _lock:
+        stored = cache.get_many(buckets)
+        wait = 0.0
+        tokens = {}
+        for key, bucket in buckets.items():
+            available, at = stored.get(key, (bucket.capacity, now))
+            tokens[key] = min(bucket.capacity, available + (now - at) * bucket.refill)
+            if tokens[key] < 1:
+                wait = max(wait, (1 - tokens[key]) / bucket.refill)
+        if wait:
+            return wait
+        timeout = max(
+            math.ceil((bucket.capacity - tokens[key] + 1) / bucket.refill) for key, bucket in buckets.items()
+        )
+        cache.set_many({key: (tokens[key] - 1, now) for key in buckets}, timeout)
+    return 0.0
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """ DRF throttle over the buckets of the view's `throttle_scope`; see the module docstring. """
+
+    def __init__(self):
+        self.wait_seconds = 0.0
+
+    def get_buckets(self, view):
+        config = getattr(view, 'throttle_buckets', None)
+        if config is None:
+            config = settings.THROTTLE_BUCKETS.get(getattr(view, 'throttle_scope', None))
+        buckets = {}
+        # {kind: {'rate': '30/min', 'burst': 10}}
+        for kind, spec in (config or {}).items():
+            if kind not in KINDS:
+                raise ImproperlyConfigured(f'Unknown throttle bucket {kind!r}, expected one of {KINDS}.')
+            buckets[kind] = Bucket(**spec)
+        return buckets
+
+    def get_ident(self, request):
+        # Without NUM_PROXIES DRF would trust the whole X-Forwarded-For header, which any
+        # client can set to get a fresh `ip` bucket per request
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get('REMOTE_ADDR')
+        return super().get_ident(request)
+
+    def identify(self, kind, request, view):
+        if kind == 'user':
+            user = request.user
+            return user.pk if user and user.is_authenticated else None
+        if kind == 'ip':
+            return self.get_ident(request)
+        match = getattr(request, 'resolver_match', None)
+        return (match and match.view_name) or type(view).__name__
+
+    def allow_request(self, request, view):
+        if not settings.THROTTLE_ENABLED:
+            return True
+        scope = getattr(view, 'throttle_scope', None) or type(view).__name__
+        keys = {}
+        for kind, bucket in self.get_buckets(view).items():
+            ident = self.identify(kind, request, view)
+            if ident is not None:
+                keys[f'throttle:{scope}:{kind}:{ident}'] = bucket
+        if not keys:
+            return True
+        self.wait_seconds = take(keys, time.time())
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
@@ -15,15 +15,14 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import include, path, re_path
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from users.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 from django.http import HttpResponse
 from django.conf import settings
 from django.conf.urls.static import static
+from .metrics import metrics_view
+from .schema import schema_view
+from .slow_queries import SlowQueryView
 
 def hello_world(request):
     return HttpResponse("Hello, world!")
@@ -32,20 +31,32 @@ urlpatterns = [
     # Test route
     path('hello/', hello_world, name='hello_world'),
     
-    # Swagger paths
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
-    path("api/docs/swagger/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
+    path('metrics', metrics_view, name='metrics'),
+    path('metrics/slow-queries/', SlowQueryView.as_view(), name='slow-queries'),
 
     path('admin/', admin.site.urls),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
     # App routes
+    path('', include('currencies.urls')),
     path('', include('users.urls')),
     path('', include('orders.urls')),
     path('', include('pc_components.urls'))
 ]
 
+if settings.APP_PROFILE == 'prod':
+    # Prebuilt by build.sh; see schema.py
+    urlpatterns.append(path("api/schema/", schema_view, name="schema"))
+else:
+    from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+
+    # Swagger paths
+    urlpatterns += [
+        path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+        path("api/docs/swagger/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
+    ]
+
 urlpatterns += staticfiles_urlpatterns()
 
 if settings.DEBUG:
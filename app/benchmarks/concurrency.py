@@ -0,0 +1,221 @@
+"""
+Sync vs async throughput under concurrent clients.
+
+Starts the WSGI app under gunicorn's sync workers (the Procfile's `web` process) and the
+ASGI app under gunicorn with uvicorn workers (the `asgi` process) as subprocesses with
+this process's settings, import path and database. Each is then driven by an asyncio
+HTTP/1.1 load generator: `clients` concurrent connections request the list endpoint in a
+loop for `duration` seconds, reconnecting when the server closes the connection (as the
+sync workers do after every response).
+
+The sync server serves /components/, the async one the same rows from /async/components/.
+The catalog response cache is replaced by a dummy cache in both servers unless
+`use_cache` is set, so every request reaches the database.
+
+The load generator is a single Python process; at a few thousand requests per second it
+becomes the bottleneck itself, so compare the servers at the same client count.
+"""
+import asyncio
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+
+from .runner import percentile
+
+# name -> (server command with {project}/{host}/{port}/{workers}, path)
+SERVERS = {
+    'sync': (
+        ['-m', 'gunicorn', '{project}.wsgi:application', '--bind', '{host}:{port}', '--workers', '{workers}',
+         '--log-level', 'warning'],
+        '/components/?page_size=20',
+    ),
+    'async': (
+        ['-m', 'gunicorn', '{project}.asgi:application', '--worker-class', 'uvicorn.workers.UvicornWorker',
+         '--bind', '{host}:{port}', '--workers', '{workers}', '--log-level', 'warning'],
+        '/async/components/?page_size=20',
+    ),
+}
+HOST = '127.0.0.1'
+REQUEST_TIMEOUT = 30
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """ One server subprocess, importing the project the way this process does. """
+
+    def __init__(self, name, workers, use_cache, env=None, path=None, poll_interval=0.2):
+        self.name = name
+        self.port = free_port()
+        arguments, default_path = SERVERS[name]
+        self.path = path or default_path
+        # The package holding urls.py, wsgi.py and asgi.py, under the name it is imported as here
+        project = settings.ROOT_URLCONF.rpartition('.')[0]
+        self.command = [sys.executable] + [
+            argument.format(project=project, host=HOST, port=self.port, workers=workers) for argument in arguments
+        ]
+        self.env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+        if not use_cache:
+            self.env['CATALOG_CACHE_BACKEND'] = 'django.core.cache.backends.dummy.DummyCache'
+        self.env.update(env or {})
+        self.process = None
+        self.poll_interval = poll_interval
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            self.command, env=self.env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            self.wait_ready()
+        except BaseException:
+            self.stop()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+    def wait_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'{self.name} server exited with code {self.process.returncode}: {" ".join(self.command)}')
+            try:
+                status, _ = asyncio.run(asyncio.wait_for(fetch_once(self.port, self.path), 5))
+                if status == 200:
+                    return
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                pass
+            time.sleep(self.poll_interval)
+        raise RuntimeError(f'{self.name} server did not answer {self.path} within {timeout}s')
+
+
+def build_request(path):
+    return f'GET {path} HTTP/1.1\r\nHost: {HOST}\r\nAccept: application/json\r\n\r\n'.encode()
+
+
+async def read_response(reader):
+    """ Reads one response; returns (status, keep_alive). """
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+    keep_alive = headers.get('connection') != 'close'
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.read()
+        keep_alive = False
+    return status, keep_alive
+
+
+async def fetch_once(port, path):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    try:
+        writer.write(build_request(path))
+        return await read_response(reader)
+    finally:
+        writer.close()
+
+
+async def client_loop(port, request, deadline, latencies, counts):
+    """ One client: requests over a kept-alive connection until `deadline`; latency includes reconnects. """
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        keep_alive = False
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(HOST, port)
+            writer.write(request)
+            status, keep_alive = await asyncio.wait_for(read_response(reader), REQUEST_TIMEOUT)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                counts['errors'] += 1
+        except (OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            counts['errors'] += 1
+        if not keep_alive and writer is not None:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, path, clients, duration):
+    latencies, counts = [], {'errors': 0}
+    request = build_request(path)
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(client_loop(port, request, deadline, latencies, counts) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'errors': counts['errors'],
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies_ms, 50), 2) if latencies_ms else None,
+        'p95_ms': round(percentile(latencies_ms, 95), 2) if latencies_ms else None,
+    }
+
+
+class ConcurrencyBenchmark:
+    def __init__(self, clients=(50, 200), duration=5.0, workers=2, servers=None, use_cache=False, warmup=1.0):
+        self.clients = list(clients)
+        self.duration = duration
+        self.workers = workers
+        self.servers = servers or list(SERVERS)
+        self.use_cache = use_cache
+        self.warmup = warmup
+
+    def run(self):
+        results = {}
+        for name in self.servers:
+            with Server(name, self.workers, self.use_cache) as server:
+                results[name] = {'path': server.path, 'runs': []}
+                for clients in self.clients:
+                    if self.warmup:
+                        asyncio.run(load(server.port, server.path, clients, self.warmup))
+                    results[name]['runs'].append(asyncio.run(load(server.port, server.path, clients, self.duration)))
+        return {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': settings.DATABASES['default']['ENGINE'],
+                'workers': self.workers,
+                'duration_s': self.duration,
+                'use_cache': self.use_cache,
+            },
+            'results': results,
+        }
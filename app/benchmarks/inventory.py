@@ -0,0 +1,127 @@
+"""
+Concurrent stress test of the stock decrement (pc_components/stock.py).
+
+`threads` threads, each with its own database connection, keep ordering `quantity` units
+of randomly picked components that only have `units` units in stock each, until every
+thread has made `attempts` orders. There are far more orders than units, so the threads
+race for the last units of every component. Each order is one `stock.take()` in its own
+transaction, as at checkout.
+
+The report proves there was no overselling: the units sold plus the units left equal the
+units stocked and no stock went negative, while every order was either served or refused
+for lack of stock. It also has the throughput in orders per second and the latency
+percentiles. On SQLite concurrent writers fail with "database is locked" instead of
+waiting; those orders are retried and counted as `retries`.
+
+The components are created in committed transactions, since the threads can't see the
+caller's, and deleted at the end.
+"""
+import platform
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+import django
+from django.db import OperationalError, connection, connections, transaction
+
+from pc_components import stock
+from pc_components.models import Component
+from .runner import percentile
+
+RETRY_SLEEP = 0.001
+
+
+class InventoryBenchmark:
+    def __init__(self, threads=16, attempts=200, components=5, units=20, quantity=1, seed=0):
+        self.threads = threads
+        self.attempts = attempts
+        self.components = components
+        self.units = units
+        self.quantity = quantity
+        self.seed = seed
+
+    def order(self, component_ids, rng, result):
+        component_id = rng.choice(component_ids)
+        start = time.perf_counter()
+        while True:
+            try:
+                with transaction.atomic():
+                    stock.take({component_id: self.quantity})
+            except stock.OutOfStock:
+                result['refused'] += 1
+                break
+            except OperationalError:
+                result['retries'] += 1
+                time.sleep(RETRY_SLEEP)
+                continue
+            result['sold'][component_id] += self.quantity
+            break
+        result['latencies'].append(time.perf_counter() - start)
+
+    def worker(self, number, component_ids, barrier, results):
+        rng = random.Random(self.seed * 1000 + number)
+        result = {'sold': dict.fromkeys(component_ids, 0), 'refused': 0, 'retries': 0, 'latencies': []}
+        try:
+            barrier.wait()
+            for _ in range(self.attempts):
+                self.order(component_ids, rng, result)
+        finally:
+            connections.close_all()
+        results[number] = result
+
+    def run(self):
+        components = Component.objects.bulk_create([
+            Component(name=f'Stress {i}', type='CPU', manufacturer='Bench', price='1.00',
+                      description='', technical_details='', stock=self.units)
+            for i in range(self.components)
+        ])
+        component_ids = [component.id for component in components]
+        try:
+            results = [None] * self.threads
+            barrier = threading.Barrier(self.threads + 1)
+            threads = [
+                threading.Thread(target=self.worker, args=(number, component_ids, barrier, results))
+                for number in range(self.threads)
+            ]
+            for thread in threads:
+                thread.start()
+            barrier.wait()
+            start = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            left = stock.component_availability(component_ids)
+        finally:
+            Component.objects.filter(id__in=component_ids).delete()
+
+        sold = {component_id: sum(result['sold'][component_id] for result in results) for component_id in component_ids}
+        latencies = [latency for result in results for latency in result['latencies']]
+        orders = len(latencies)
+        stocked = self.units * self.components
+        return {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'threads': self.threads,
+                'attempts_per_thread': self.attempts,
+                'components': self.components,
+                'units_per_component': self.units,
+                'quantity_per_order': self.quantity,
+            },
+            'orders': orders,
+            'served': sum(sold.values()) // self.quantity,
+            'refused': sum(result['refused'] for result in results),
+            'retries': sum(result['retries'] for result in results),
+            'units_stocked': stocked,
+            'units_sold': sum(sold.values()),
+            'units_left': sum(left.values()),
+            'oversold': max(sum(sold.values()) - stocked, 0),
+            'consistent': all(sold[cid] + left[cid] == self.units and left[cid] >= 0 for cid in component_ids),
+            'elapsed_s': elapsed,
+            'orders_per_s': orders / elapsed if elapsed else None,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+        }
@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.concurrency import SERVERS, ConcurrencyBenchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the sync (gunicorn/WSGI) and async (uvicorn/ASGI) catalog list endpoints under '
+        'concurrent clients: requests per second and p50/p95 latency per client count.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, action='append',
+                            help='Concurrent clients (repeatable, default 50 and 200)')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds of load per run')
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes per server')
+        parser.add_argument('--server', action='append', choices=list(SERVERS), dest='servers',
+                            help='Only run this server (repeatable)')
+        parser.add_argument('--use-cache', action='store_true',
+                            help='Keep the catalog response cache instead of a dummy cache')
+        parser.add_argument('--output', default='concurrency_results.json')
+
+    def handle(self, *args, **options):
+        benchmark = ConcurrencyBenchmark(
+            clients=options['clients'] or [50, 200],
+            duration=options['duration'],
+            workers=options['workers'],
+            servers=options['servers'],
+            use_cache=options['use_cache'],
+        )
+        try:
+            report = benchmark.run()
+        except RuntimeError as error:
+            raise CommandError(error)
+
+        self.stdout.write(f"{'server':<8}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+        for name, result in report['results'].items():
+            for run in result['runs']:
+                self.stdout.write(
+                    f"{name:<8}{run['clients']:>8}{run['requests_per_second']:>10.1f}"
+                    f"{run['p50_ms'] or 0:>10.2f}{run['p95_ms'] or 0:>10.2f}{run['errors']:>8}"
+                )
+
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
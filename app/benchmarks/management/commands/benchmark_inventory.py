@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.inventory import InventoryBenchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Stress the stock decrement: many threads ordering the last units of a few components. '
+        'Fails if any unit was oversold; reports orders per second.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--attempts', type=int, default=200, help='Orders per thread')
+        parser.add_argument('--components', type=int, default=5)
+        parser.add_argument('--units', type=int, default=20, help='Units in stock per component')
+        parser.add_argument('--quantity', type=int, default=1, help='Units per order')
+        parser.add_argument('--output', default='inventory_results.json')
+
+    def handle(self, *args, **options):
+        benchmark = InventoryBenchmark(
+            threads=options['threads'],
+            attempts=options['attempts'],
+            components=options['components'],
+            units=options['units'],
+            quantity=options['quantity'],
+        )
+        report = benchmark.run()
+
+        self.stdout.write(
+            f"{report['orders']} orders by {options['threads']} threads in {report['elapsed_s']:.2f}s: "
+            f"{report['orders_per_s']:,.0f} orders/s, p50 {report['p50_ms']:.2f} ms, p95 {report['p95_ms']:.2f} ms"
+        )
+        self.stdout.write(
+            f"served {report['served']}, refused {report['refused']}, retries {report['retries']}; "
+            f"units stocked {report['units_stocked']}, sold {report['units_sold']}, left {report['units_left']}"
+        )
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        if report['oversold'] or not report['consistent']:
+            raise CommandError(f"Stock is inconsistent: {report['oversold']} units oversold.")
+        self.stdout.write(self.style.SUCCESS(f"No overselling. Results written to {options['output']}"))
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from app.app.fast_list import ValuesReader
+from app.app.renderers import FastJSONRenderer
+from benchmarks.seed import seed
+from orders.models import Order
+from orders.serializers import OrderSerializer
+from pc_components.models import Component
+from pc_components.serializers import ComponentSerializer, PcSerializer
+from pc_components.views import pc_queryset
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare rows per second of ModelSerializer + JSONRenderer against the values()-based '
+        'reader + FastJSONRenderer used by the list endpoints. Seeds inside a rolled back transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Components to seed (pcs and orders scale with it)')
+        parser.add_argument('--repeat', type=int, default=3, help='Best of N runs')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with transaction.atomic():
+            seed({
+                'components': rows,
+                'pcs': rows // 4,
+                'components_per_pc': 6,
+                'users': max(rows // 20, 1),
+                'orders_per_user': 5,
+                'items_per_order': 0,
+            })
+            cases = [
+                ('components', ComponentSerializer, Component.objects.defer('search_vector').order_by('name', 'id')),
+                ('pcs', PcSerializer, pc_queryset().order_by('name', 'id')),
+                ('orders', OrderSerializer, Order.objects.order_by('created_at', 'id')),
+            ]
+            self.stdout.write(f"{'endpoint':<12}{'rows':>8}{'serializer rows/s':>20}{'fast rows/s':>14}{'speedup':>9}")
+            for name, serializer_class, queryset in cases:
+                slow = self.best(options['repeat'], lambda: self.serializer_path(serializer_class, queryset))
+                fast = self.best(options['repeat'], lambda: self.fast_path(serializer_class, queryset))
+                count = queryset.count()
+                self.stdout.write(
+                    f'{name:<12}{count:>8}{count / slow:>20,.0f}{count / fast:>14,.0f}{slow / fast:>8.1f}x'
+                )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def best(repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    @staticmethod
+    def serializer_path(serializer_class, queryset):
+        return JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+
+    @staticmethod
+    def fast_path(serializer_class, queryset):
+        reader = ValuesReader(serializer_class)
+        return FastJSONRenderer().render(reader.rows(list(reader.values(queryset.all()))))
@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.concurrency import SERVERS
+from benchmarks.startup import PROFILES, StartupBenchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the cold start of a single-worker server per app profile: time from spawning '
+        'it to its first response, and the phases the worker reports for itself.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Server starts per profile')
+        parser.add_argument('--profile', action='append', choices=PROFILES, dest='profiles',
+                            help='Only measure this profile (repeatable)')
+        parser.add_argument('--server', choices=list(SERVERS), default='sync')
+        parser.add_argument('--output', default='startup_results.json')
+
+    def handle(self, *args, **options):
+        benchmark = StartupBenchmark(
+            profiles=options['profiles'] or PROFILES,
+            runs=options['runs'],
+            server=options['server'],
+        )
+        try:
+            report = benchmark.run()
+        except RuntimeError as error:
+            raise CommandError(error)
+
+        self.stdout.write(f"{'profile':<8}{'measure':<32}{'median ms':>11}{'min ms':>9}{'max ms':>9}")
+        for profile, result in report['results'].items():
+            rows = [('first response from spawn', result['first_response_from_spawn'])]
+            rows += [(f'worker {phase}', values) for phase, values in result['worker'].items()]
+            for label, values in rows:
+                self.stdout.write(
+                    f"{profile:<8}{label:<32}{values['median_ms']:>11.1f}{values['min_ms']:>9.1f}{values['max_ms']:>9.1f}"
+                )
+
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
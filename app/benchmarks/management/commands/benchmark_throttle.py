@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.runner import ENDPOINTS
+from benchmarks.throttle import BACKENDS, ThrottleBenchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the token-bucket throttle check per cache backend, alone and as part of the '
+        'throttled endpoints (with and without the throttle) against the seeded data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=5000, help='Throttle checks timed per backend')
+        parser.add_argument('--iterations', type=int, default=50, help='Requests per endpoint and run')
+        parser.add_argument('--backend', action='append', choices=list(BACKENDS), dest='backends',
+                            help='Only measure this cache backend (repeatable)')
+        parser.add_argument('--endpoint', action='append', choices=list(ENDPOINTS), dest='endpoints',
+                            help='Endpoint to time with and without the throttle (repeatable, '
+                                 'default orders-list and token_obtain_pair)')
+        parser.add_argument('--checks-only', action='store_true', help='Skip the endpoint runs')
+        parser.add_argument('--output', default='throttle_results.json')
+
+    def handle(self, *args, **options):
+        endpoints = [] if options['checks_only'] else options['endpoints'] or ['orders-list', 'token_obtain_pair']
+        benchmark = ThrottleBenchmark(options['checks'], options['iterations'], options['backends'], endpoints)
+        try:
+            report = benchmark.run()
+        except RuntimeError as error:
+            raise CommandError(error)
+
+        self.stdout.write(f"{'backend':<8}{'check p50 us':>14}{'p95 us':>10}{'mean us':>10}")
+        for backend, result in report['results'].items():
+            check = result['check']
+            self.stdout.write(f"{backend:<8}{check['p50_us']:>14.1f}{check['p95_us']:>10.1f}{check['mean_us']:>10.1f}")
+        for backend, result in report['results'].items():
+            if 'endpoints' not in result:
+                continue
+            self.stdout.write(f"\n{backend:<8}{'endpoint':<22}{'unthrottled p50 ms':>20}{'throttled p50 ms':>18}")
+            unthrottled, throttled = result['endpoints']['unthrottled'], result['endpoints']['throttled']
+            for name in throttled:
+                self.stdout.write(
+                    f"{'':<8}{name:<22}{unthrottled[name]['p50_ms']:>20.3f}{throttled[name]['p50_ms']:>18.3f}"
+                )
+
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.runner import ENDPOINTS, EndpointBenchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Time every API endpoint in-process (p50/p95 latency, query count, peak memory) '
+        'against the seeded data and write the results to a JSON file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--output', default='benchmark_results.json')
+        parser.add_argument('--compare', help='Previous results file to print the p50 change against')
+        parser.add_argument('--endpoint', action='append', choices=list(ENDPOINTS), dest='endpoints',
+                            help='Only run this endpoint (repeatable)')
+        parser.add_argument('--use-cache', action='store_true',
+                            help='Keep the catalog response cache warm instead of clearing it per request')
+
+    def handle(self, *args, **options):
+        try:
+            benchmark = EndpointBenchmark(options['iterations'], options['use_cache'], options['endpoints'])
+            report = benchmark.run()
+        except RuntimeError as error:
+            raise CommandError(error)
+
+        previous = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                previous = json.load(file)['results']
+
+        self.stdout.write(f"{'endpoint':<28}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'peak KB':>10}")
+        for name, result in report['results'].items():
+            line = (f"{name:<28}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                    f"{result['queries']:>9}{result['peak_memory_kb']:>10.1f}")
+            if name in previous and previous[name]['p50_ms']:
+                change = (result['p50_ms'] / previous[name]['p50_ms'] - 1) * 100
+                line += f'{change:>+9.1f}%'
+            self.stdout.write(line)
+
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks.seed import DEFAULT_VOLUMES, PASSWORD, USERNAME_PREFIX, seed
+
+
+class Command(BaseCommand):
+    help = 'Seed synthetic users, components, pcs, links, orders and order items for benchmarking.'
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_VOLUMES.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=int, default=default,
+                                help=f'(default: {default})')
+        parser.add_argument('--random-seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        volumes = {name: options[name] for name in DEFAULT_VOLUMES}
+        counts = seed(volumes, random_seed=options['random_seed'])
+        for name, count in counts.items():
+            self.stdout.write(f'{name:<15}{count:>10}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Users are named '{USERNAME_PREFIX}<n>' with password '{PASSWORD}'."
+        ))
@@ -0,0 +1,135 @@
+"""
+In-process endpoint benchmarks with the Django test client.
+
+Each endpoint is requested `iterations` times after a warm-up request; the report holds
+p50/p95/mean latency, the SQL query count of one request and the peak Python memory
+allocated by one request (tracemalloc, measured in a separate pass so it doesn't skew
+the timings). The throttle check runs as in production, over buckets that never run dry.
+"""
+import math
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+
+from orders.models import Order, Order_Item
+from pc_components import cache
+from pc_components.models import Component, Pc, Pc_Components
+from users.models import User
+from users.serializers import TokenObtainPairSerializer
+from .seed import PASSWORD, USERNAME_PREFIX
+
+# name -> (method, path, authenticated); {pc_id} is the first seeded pc
+ENDPOINTS = {
+    'components-list': ('get', '/components/', False),
+    'pcs-list': ('get', '/pcs/', False),
+    'pcs-compatible-components': ('get', '/pcs/{pc_id}/compatible-components/?type=CPU', False),
+    'catalog-snapshot': ('get', '/catalog/snapshot.json', False),
+    'orders-list': ('get', '/orders/', True),
+    'order_items-list': ('get', '/order_items/', True),
+    'users-list': ('get', '/users/', True),
+    'token_obtain_pair': ('post', '/api/token/', False),
+}
+UNLIMITED_RATE = '1000000/s'
+
+
+def unlimited_buckets():
+    """ THROTTLE_BUCKETS with the same buckets, none of which a benchmark can empty. """
+    return {
+        scope: {kind: {'rate': UNLIMITED_RATE} for kind in buckets}
+        for scope, buckets in settings.THROTTLE_BUCKETS.items()
+    }
+
+
+def percentile(values, percent):
+    """ Nearest-rank percentile. """
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class EndpointBenchmark:
+    def __init__(self, iterations=50, use_cache=False, endpoints=None):
+        self.iterations = iterations
+        self.use_cache = use_cache
+        self.endpoints = {name: ENDPOINTS[name] for name in (endpoints or ENDPOINTS)}
+        self.client = Client()
+        self.user = User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('id').first()
+        if self.user is None:
+            raise RuntimeError('No benchmark users found, run `manage.py seed_data` first.')
+        self.auth_header = f'Bearer {TokenObtainPairSerializer.get_token(self.user).access_token}'
+        self.pc_id = Pc.objects.order_by('id').values_list('id', flat=True).first()
+
+    def request(self, method, path, authenticated):
+        if not self.use_cache:
+            cache.clear()
+        if method == 'post':
+            response = self.client.post(path, {'username': self.user.username, 'password': PASSWORD},
+                                        content_type='application/json')
+        else:
+            headers = {'HTTP_AUTHORIZATION': self.auth_header} if authenticated else {}
+            response = self.client.get(path, **headers)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method.upper()} {path} returned {response.status_code}')
+        return response
+
+    def measure(self, method, path, authenticated):
+        path = path.format(pc_id=self.pc_id)
+        self.request(method, path, authenticated)  # warm-up
+
+        # An execute wrapper survives the connection being closed at the end of the request
+        queries = []
+        with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+            self.request(method, path, authenticated)
+
+        tracemalloc.start()
+        try:
+            self.request(method, path, authenticated)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        timings = []
+        for _ in range(self.iterations):
+            start = time.perf_counter()
+            self.request(method, path, authenticated)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return {
+            'method': method.upper(),
+            'path': path,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': len(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def run(self):
+        with override_settings(THROTTLE_BUCKETS=unlimited_buckets()):
+            results = {name: self.measure(*endpoint) for name, endpoint in self.endpoints.items()}
+        return {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'iterations': self.iterations,
+                'catalog_cache': self.use_cache,
+                'rows': {
+                    'users': User.objects.count(),
+                    'components': Component.objects.count(),
+                    'pcs': Pc.objects.count(),
+                    'pc_components': Pc_Components.objects.count(),
+                    'orders': Order.objects.count(),
+                    'order_items': Order_Item.objects.count(),
+                },
+            },
+            'results': results,
+        }
@@ -0,0 +1,141 @@
+"""
+Synthetic data for the endpoint benchmarks, generated deterministically from a random seed
+and written with bulk_create.
+"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from orders.models import Order, Order_Item
+from pc_components import cache, compatibility, pricing, search
+from pc_components.models import Component, Pc, Pc_Components
+from users.models import User, User_Pc
+
+USERNAME_PREFIX = 'bench_user_'
+PASSWORD = 'bench-password'
+
+TYPES = ['CPU', 'GPU', 'RAM', 'Mainboard', 'PSU', 'Case', 'SSD', 'HDD', 'Cooler', 'Fan']
+MANUFACTURERS = ['AMD', 'Intel', 'Nvidia', 'ASUS', 'MSI', 'Corsair', 'Samsung', 'Kingston', 'be quiet!', 'Noctua']
+CURRENCIES = ['EUR', 'USD', 'GBP']
+WORDS = ['fast', 'silent', 'gaming', 'office', 'compact', 'rgb', 'overclocked', 'efficient', 'pro', 'mini']
+SOCKETS = ['AM4', 'AM5', 'LGA1700']
+MEMORY_TYPES = ['DDR4', 'DDR5']
+FORM_FACTORS = ['Mini-ITX', 'Micro-ATX', 'ATX']
+# Compatibility attributes written into technical_details, see pc_components.compatibility
+DETAILS = {
+    'CPU': lambda rng: f'Socket: {rng.choice(SOCKETS)}, TDP: {rng.choice([65, 105, 125, 170])}W',
+    'Mainboard': lambda rng: f'Socket: {rng.choice(SOCKETS)}, {rng.choice(MEMORY_TYPES)}, {rng.choice(FORM_FACTORS)}',
+    'RAM': lambda rng: f'{rng.choice(MEMORY_TYPES)}, Power: 5W',
+    'GPU': lambda rng: f'TBP: {rng.choice([115, 200, 285, 450])}W',
+    'PSU': lambda rng: f'{rng.choice([450, 650, 850, 1000])}W, ATX',
+    'Case': lambda rng: rng.choice(FORM_FACTORS),
+    'Cooler': lambda rng: f'Socket: {rng.choice(SOCKETS)}',
+}
+
+DEFAULT_VOLUMES = {
+    'users': 100,
+    'components': 2000,
+    'pcs': 500,
+    'components_per_pc': 6,
+    'pcs_per_user': 1,
+    'orders_per_user': 5,
+    'items_per_order': 3,
+}
+
+BATCH_SIZE = 2000
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _technical_details(rng, component_type):
+    details = DETAILS.get(component_type)
+    return f'{details(rng)}; {_text(rng, 5)}' if details else _text(rng, 10)
+
+
+@transaction.atomic
+def seed(volumes=None, random_seed=0):
+    """ Create the given volumes (see DEFAULT_VOLUMES) and return the created row counts. """
+    volumes = {**DEFAULT_VOLUMES, **(volumes or {})}
+    rng = random.Random(random_seed)
+
+    components = Component.objects.bulk_create([
+        Component(
+            name=f'{rng.choice(MANUFACTURERS)} {component_type} {i}',
+            type=component_type,
+            manufacturer=rng.choice(MANUFACTURERS),
+            price=Decimal(rng.randrange(1000, 200000)) / 100,
+            currency=rng.choice(CURRENCIES),
+            description=_text(rng, 20),
+            technical_details=_technical_details(rng, component_type),
+        )
+        for i, component_type in enumerate(rng.choice(TYPES) for _ in range(volumes['components']))
+    ], batch_size=BATCH_SIZE)
+
+    pcs = Pc.objects.bulk_create([
+        Pc(name=f'Bench PC {i}', description=_text(rng, 15), is_customized=rng.random() < 0.3)
+        for i in range(volumes['pcs'])
+    ], batch_size=BATCH_SIZE)
+
+    links = []
+    if components:
+        for pc in pcs:
+            for component in rng.sample(components, min(volumes['components_per_pc'], len(components))):
+                links.append(Pc_Components(pc=pc, component=component))
+    Pc_Components.objects.bulk_create(links, batch_size=BATCH_SIZE)
+
+    # Hash once; PBKDF2 per user would dominate the seeding time
+    password = make_password(PASSWORD)
+    offset = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+    users = User.objects.bulk_create([
+        User(username=f'{USERNAME_PREFIX}{offset + i}', email=f'{USERNAME_PREFIX}{offset + i}@example.com', password=password)
+        for i in range(volumes['users'])
+    ], batch_size=BATCH_SIZE)
+
+    user_pcs = []
+    if pcs:
+        for user in users:
+            for pc in rng.sample(pcs, min(volumes['pcs_per_user'], len(pcs))):
+                user_pcs.append(User_Pc(user=user, pc=pc))
+    User_Pc.objects.bulk_create(user_pcs, batch_size=BATCH_SIZE)
+
+    orders = Order.objects.bulk_create([
+        Order(
+            user=user,
+            total_price=round(rng.uniform(50, 5000), 2),
+            status=rng.choice(['pending', 'paid', 'shipped']),
+            payment_method=rng.choice(['card', 'paypal', 'invoice']),
+            payment_status=rng.choice(['pending', 'paid']),
+        )
+        for user in users
+        for _ in range(volumes['orders_per_user'])
+    ], batch_size=BATCH_SIZE)
+
+    items = []
+    for order in orders:
+        for _ in range(volumes['items_per_order']):
+            if pcs and (not components or rng.random() < 0.3):
+                items.append(Order_Item(order=order, pc=rng.choice(pcs), order_type='pc', quantity=rng.randint(1, 3)))
+            elif components:
+                items.append(Order_Item(order=order, component=rng.choice(components), order_type='component',
+                                        quantity=rng.randint(1, 3)))
+    Order_Item.objects.bulk_create(items, batch_size=BATCH_SIZE)
+
+    # bulk_create bypasses the catalog signals
+    pricing.rebuild()
+    compatibility.rebuild()
+    cache.bump_version_on_write()
+    search.index.invalidate()
+
+    return {
+        'users': len(users),
+        'components': len(components),
+        'pcs': len(pcs),
+        'pc_components': len(links),
+        'user_pcs': len(user_pcs),
+        'orders': len(orders),
+        'order_items': len(items),
+    }
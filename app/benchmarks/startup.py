@@ -0,0 +1,86 @@
+"""
+Cold-start time of a server process per app profile.
+
+For each profile (settings.APP_PROFILE) the server of concurrency.py is started `runs`
+times with a single worker, and /hello/ is polled every few milliseconds from the moment
+the command is spawned. The gunicorn master binds the socket before it forks the worker,
+so the first answered poll is the worker's first request: its latency from the spawn is
+what an autoscaler sees from a new instance.
+
+The worker also reports its own phases relative to its process start (app/app/startup.py)
+through /metrics; they exclude the interpreter and gunicorn master startup.
+"""
+import platform
+import statistics
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+
+from .concurrency import HOST, Server
+
+PROFILES = ('dev', 'prod')
+PATH = '/hello/'
+
+
+def scrape_startup(port):
+    """ {phase: seconds} from the `process_startup_seconds` gauge of the server's /metrics. """
+    request = urllib.request.Request(f'http://{HOST}:{port}/metrics')
+    if settings.METRICS_TOKEN:
+        request.add_header('Authorization', f'Bearer {settings.METRICS_TOKEN}')
+    with urllib.request.urlopen(request, timeout=10) as response:
+        body = response.read().decode()
+    phases = {}
+    for line in body.splitlines():
+        if line.startswith('process_startup_seconds{'):
+            labels, _, value = line.rpartition(' ')
+            phases[labels.split('"')[1]] = float(value)
+    return phases
+
+
+def summary(values):
+    values_ms = [value * 1000 for value in values]
+    return {
+        'median_ms': round(statistics.median(values_ms), 1),
+        'min_ms': round(min(values_ms), 1),
+        'max_ms': round(max(values_ms), 1),
+    }
+
+
+class StartupBenchmark:
+    def __init__(self, profiles=PROFILES, runs=5, server='sync'):
+        self.profiles = list(profiles)
+        self.runs = runs
+        self.server = server
+
+    def measure(self, profile):
+        start = time.perf_counter()
+        with Server(self.server, 1, True, env={'DJANGO_APP_PROFILE': profile}, path=PATH, poll_interval=0.005) as server:
+            first_response = time.perf_counter() - start
+            phases = scrape_startup(server.port)
+        return first_response, phases
+
+    def run(self):
+        results = {}
+        for profile in self.profiles:
+            samples = [self.measure(profile) for _ in range(self.runs)]
+            phases = {}
+            for _, worker_phases in samples:
+                for phase, seconds in worker_phases.items():
+                    phases.setdefault(phase, []).append(seconds)
+            results[profile] = {
+                'first_response_from_spawn': summary([first_response for first_response, _ in samples]),
+                'worker': {phase: summary(values) for phase, values in phases.items()},
+            }
+        return {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'server': self.server,
+                'runs': self.runs,
+            },
+            'results': results,
+        }
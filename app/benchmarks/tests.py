@@ -0,0 +1,80 @@
+from django.test import TestCase, TransactionTestCase, override_settings
+from app.app import throttling
+from orders.models import Order_Item
+from pc_components.models import Component, Pc_Components
+from .inventory import InventoryBenchmark
+from .runner import ENDPOINTS, EndpointBenchmark, percentile
+from .seed import seed
+from .throttle import ThrottleBenchmark
+
+VOLUMES = {
+    'users': 3,
+    'components': 20,
+    'pcs': 5,
+    'components_per_pc': 4,
+    'pcs_per_user': 2,
+    'orders_per_user': 2,
+    'items_per_order': 2,
+}
+
+
+class SeedTests(TestCase):
+    def test_volumes(self):
+        counts = seed(VOLUMES)
+        self.assertEqual(counts['pc_components'], 20)
+        self.assertEqual(counts['order_items'], 12)
+        self.assertEqual(Pc_Components.objects.count(), 20)
+        self.assertEqual(Order_Item.objects.count(), 12)
+
+    def test_seeding_twice_adds_new_users(self):
+        seed(VOLUMES)
+        self.assertEqual(seed(VOLUMES)['users'], 3)
+
+
+class EndpointBenchmarkTests(TestCase):
+    def test_report_covers_every_endpoint(self):
+        seed(VOLUMES)
+        report = EndpointBenchmark(iterations=1).run()
+        self.assertEqual(set(report['results']), set(ENDPOINTS))
+        self.assertEqual(report['meta']['rows']['components'], 20)
+        for result in report['results'].values():
+            self.assertGreater(result['queries'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+
+    def test_requires_seeded_users(self):
+        with self.assertRaises(RuntimeError):
+            EndpointBenchmark()
+
+    def test_percentile(self):
+        self.assertEqual(percentile([5, 1, 4, 2, 3], 50), 3)
+        self.assertEqual(percentile(list(range(1, 101)), 95), 95)
+
+
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_BUCKETS={
+    'token': {'ip': {'rate': '2/min'}, 'route': {'rate': '3/min'}},
+    'orders': {'user': {'rate': '60/min', 'burst': 2}},
+})
+class ThrottleBenchmarkTests(TestCase):
+    def setUp(self):
+        throttling.clear()
+        seed(VOLUMES)
+
+    def test_benchmark_never_throttles(self):
+        report = ThrottleBenchmark(checks=20, iterations=3, endpoints=['orders-list']).run()
+        self.assertEqual(set(report['results']), {'locmem', 'file'})
+        for result in report['results'].values():
+            self.assertLessEqual(result['check']['p50_us'], result['check']['p95_us'])
+            self.assertEqual(set(result['endpoints']), {'throttled', 'unthrottled'})
+
+
+class InventoryBenchmarkTests(TransactionTestCase):
+    """ Threads need committed rows, hence a TransactionTestCase. """
+
+    def test_last_units_are_not_oversold(self):
+        report = InventoryBenchmark(threads=8, attempts=10, components=2, units=3).run()
+        self.assertEqual((report['units_sold'], report['units_left'], report['oversold']), (6, 0, 0))
+        self.assertEqual(report['served'] + report['refused'], report['orders'])
+        self.assertEqual(report['orders'], 80)
+        self.assertTrue(report['consistent'])
+        self.assertGreater(report['orders_per_s'], 0)
+        self.assertFalse(Component.objects.exists())
@@ -0,0 +1,110 @@
+"""
+Cost of the token-bucket throttle check (app/app/throttling.py).
+
+Two measurements per cache backend (local memory, and the file backend in a temporary
+directory):
+
+- the check alone: TokenBucketThrottle.allow_request() for the `orders` scope, with a
+  user, an IP and a route bucket, i.e. one get_many() and one set_many() on the cache;
+- the throttled endpoints end to end with the endpoint runner, once with the throttle
+  and once with THROTTLE_ENABLED off, to put the check next to a real request.
+
+Buckets are replaced by ones that never run dry (`unlimited_buckets`), so every request
+pays for a full check and none is rejected, as in the endpoint runner.
+"""
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import django
+from django.conf import settings
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+from rest_framework.request import Request
+
+from app.app import throttling
+from .runner import EndpointBenchmark, percentile, unlimited_buckets
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+
+
+def cache_settings(backend, location):
+    return dict(settings.CACHES, **{settings.THROTTLE_CACHE: {
+        'BACKEND': BACKENDS[backend],
+        'LOCATION': location,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }})
+
+
+class ThrottleBenchmark:
+    def __init__(self, checks=5000, iterations=50, backends=None, endpoints=('orders-list', 'token_obtain_pair')):
+        self.checks = checks
+        self.iterations = iterations
+        self.backends = backends or list(BACKENDS)
+        self.endpoints = list(endpoints)
+
+    def check_request(self):
+        request = RequestFactory().get('/orders/', REMOTE_ADDR='203.0.113.7')
+        request.resolver_match = resolve('/orders/')
+        request = Request(request)
+        request.user = SimpleNamespace(pk=1, is_authenticated=True)
+        return request
+
+    def measure_check(self):
+        throttle = throttling.TokenBucketThrottle()
+        view = SimpleNamespace(throttle_scope='orders')
+        request = self.check_request()
+        timings = []
+        for _ in range(self.checks):
+            start = time.perf_counter()
+            allowed = throttle.allow_request(request, view)
+            timings.append((time.perf_counter() - start) * 1_000_000)
+            if not allowed:
+                raise RuntimeError('The throttle rejected a benchmark request.')
+        return {
+            'checks': self.checks,
+            'p50_us': round(percentile(timings, 50), 2),
+            'p95_us': round(percentile(timings, 95), 2),
+            'mean_us': round(statistics.fmean(timings), 2),
+        }
+
+    def measure_endpoints(self):
+        results = {}
+        for enabled in (False, True):
+            with override_settings(THROTTLE_ENABLED=enabled):
+                report = EndpointBenchmark(self.iterations, endpoints=self.endpoints).run()
+            results['throttled' if enabled else 'unthrottled'] = {
+                name: {'p50_ms': result['p50_ms'], 'p95_ms': result['p95_ms']}
+                for name, result in report['results'].items()
+            }
+        return results
+
+    def run(self):
+        results = {}
+        for backend in self.backends:
+            location = tempfile.mkdtemp(prefix='throttle-benchmark-') if backend == 'file' else 'throttle-benchmark'
+            try:
+                with override_settings(CACHES=cache_settings(backend, location), THROTTLE_BUCKETS=unlimited_buckets()):
+                    throttling.clear()
+                    results[backend] = {'check': self.measure_check()}
+                    if self.endpoints:
+                        results[backend]['endpoints'] = self.measure_endpoints()
+            finally:
+                if backend == 'file':
+                    shutil.rmtree(location, ignore_errors=True)
+        return {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'iterations': self.iterations,
+            },
+            'results': results,
+        }
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from currencies import rates
+
+
+class Command(BaseCommand):
+    help = 'Load exchange rates from a JSON file {"base": "EUR", "rates": {"USD": "1.08", ...}}.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=settings.EXCHANGE_RATES_FILE,
+                            help='Rates file (default: settings.EXCHANGE_RATES_FILE)')
+
+    def handle(self, *args, **options):
+        try:
+            count = rates.load_file(options['path'])
+        except OSError as error:
+            raise CommandError(f"Can't read {options['path']}: {error}")
+        except (ValueError, KeyError, ArithmeticError) as error:
+            raise CommandError(f"Invalid rates file {options['path']}: {error!r}")
+        except rates.UnknownCurrency as error:
+            raise CommandError(f'Unknown currency: {error}')
+        self.stdout.write(self.style.SUCCESS(f'Loaded {count} exchange rates'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('currency', models.CharField(choices=[('EUR', 'Euro'), ('USD', 'US-Dollar'), ('GBP', 'British Pound')], max_length=3, unique=True)),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
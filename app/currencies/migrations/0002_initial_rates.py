@@ -0,0 +1,29 @@
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations
+
+
+def load_initial_rates(apps, schema_editor):
+    ExchangeRate = apps.get_model('currencies', 'ExchangeRate')
+    with open(settings.EXCHANGE_RATES_FILE) as file:
+        data = json.load(file)
+    rates = {code: Decimal(str(rate)) for code, rate in data['rates'].items()}
+    rates[data.get('base', settings.BASE_CURRENCY)] = Decimal(1)
+    base_rate = rates[settings.BASE_CURRENCY]
+    ExchangeRate.objects.using(schema_editor.connection.alias).bulk_create([
+        ExchangeRate(currency=code, rate=(rate / base_rate).quantize(Decimal('1e-8')))
+        for code, rate in rates.items() if code != settings.BASE_CURRENCY
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currencies', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(load_initial_rates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models
+
+CURRENCIES = [
+    ('EUR', 'Euro'),
+    ('USD', 'US-Dollar'),
+    ('GBP', 'British Pound'),
+]
+
+
+class ExchangeRate(models.Model):
+    """ Units of `currency` per one unit of settings.BASE_CURRENCY. """
+    id = models.AutoField(primary_key=True)
+    currency = models.CharField(max_length=3, choices=CURRENCIES, unique=True)
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def clean(self):
+        if self.currency == settings.BASE_CURRENCY:
+            raise ValidationError({'currency': f'{self.currency} is the base currency, its rate is always 1.'})
+        if self.rate is not None and self.rate <= 0:
+            raise ValidationError({'rate': 'The rate must be positive.'})
+
+    def __str__(self):
+        return f"1 {settings.BASE_CURRENCY} = {self.rate} {self.currency}"
@@ -0,0 +1,158 @@
+"""
+Exchange-rate matrix and bulk price conversion.
+
+The ExchangeRate table is read once into a {(source, target): factor} matrix that is kept
+in process for EXCHANGE_RATES_TTL seconds; writes through the ORM invalidate it right away
+(see signals.py), other processes pick them up within the TTL.
+
+Prices are converted in bulk: `converted_amount` builds one SQL expression (a CASE over the
+source currencies) for filtering and ordering, `convert_rows` converts serialized rows
+with one precomputed factor per source currency.
+"""
+import json
+import threading
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Value, When
+from django.db.models.functions import Round
+
+from .models import CURRENCIES, ExchangeRate
+
+CENT = Decimal('0.01')
+FACTOR_PLACES = Decimal('1e-10')
+
+_lock = threading.Lock()
+_matrix = None
+_loaded_at = 0.0
+
+
+class UnknownCurrency(Exception):
+    pass
+
+
+def base_currency():
+    return settings.BASE_CURRENCY
+
+
+def currency_codes():
+    return [code for code, _ in CURRENCIES]
+
+
+def _ttl():
+    return getattr(settings, 'EXCHANGE_RATES_TTL', 300)
+
+
+def _load():
+    rates = dict(ExchangeRate.objects.values_list('currency', 'rate'))
+    rates[base_currency()] = Decimal(1)
+    return {
+        (source, target): (rates[target] / rates[source]).quantize(FACTOR_PLACES)
+        for source in rates for target in rates
+    }
+
+
+def get_matrix():
+    """ {(source, target): factor} for every pair of currencies with a known rate. """
+    global _matrix, _loaded_at
+    with _lock:
+        if _matrix is None or time.monotonic() - _loaded_at > _ttl():
+            _matrix = _load()
+            _loaded_at = time.monotonic()
+        return _matrix
+
+
+def invalidate():
+    global _matrix
+    with _lock:
+        _matrix = None
+
+
+def factors_to(target):
+    """ {source: factor} that converts every known currency into `target`. """
+    matrix = get_matrix()
+    if (target, target) not in matrix:
+        raise UnknownCurrency(target)
+    return {source: factor for (source, to), factor in matrix.items() if to == target}
+
+
+def convert(amount, source, target):
+    """ One amount, rounded to cents. """
+    factor = factors_to(target).get(source)
+    if factor is None:
+        raise UnknownCurrency(source)
+    return (Decimal(amount) * factor).quantize(CENT, ROUND_HALF_UP)
+
+
+def converted_amount(amount_field, currency_field, target, output_field=None):
+    """
+    SQL expression for `amount_field` in `target`, rounded to cents. `currency_field` holds
+    each row's currency; None means the amount is in the base currency.
+    Rows in a currency without a rate convert to NULL.
+    """
+    factors = factors_to(target)
+    output_field = output_field or DecimalField(max_digits=14, decimal_places=2)
+    if currency_field is None:
+        factor = Value(factors[base_currency()])
+    else:
+        factor = Case(
+            *[When(**{currency_field: source}, then=Value(value)) for source, value in factors.items()],
+            default=Value(None),
+            output_field=DecimalField(max_digits=20, decimal_places=10),
+        )
+    return Round(ExpressionWrapper(F(amount_field) * factor, output_field=output_field), 2)
+
+
+def _same_type(original, converted):
+    if isinstance(original, float):
+        return float(converted)
+    if isinstance(original, str):
+        return str(converted)
+    return converted
+
+
+def convert_rows(rows, target, amount_keys, currency_key=None):
+    """
+    Convert `amount_keys` of serialized rows (dicts) in place and set their `currency_key`
+    (or a 'currency' key for base-currency amounts) to `target`. Values keep their type:
+    strings stay formatted decimals, floats stay floats.
+    """
+    factors = factors_to(target)
+    base = base_currency()
+    for row in rows:
+        source = row.get(currency_key, base) if currency_key else base
+        factor = factors.get(source)
+        for key in amount_keys:
+            value = row.get(key)
+            if value is None or factor is None:
+                continue
+            row[key] = _same_type(value, (Decimal(str(value)) * factor).quantize(CENT, ROUND_HALF_UP))
+        if factor is not None:
+            row[currency_key or 'currency'] = target
+    return rows
+
+
+def load_file(path):
+    """
+    Upsert the stored rates from a JSON file {"base": "EUR", "rates": {"USD": "1.08", ...}}.
+    Rates given against another base are rebased onto settings.BASE_CURRENCY.
+    """
+    with open(path) as file:
+        data = json.load(file)
+    rates = {code: Decimal(str(rate)) for code, rate in data['rates'].items()}
+    rates[data.get('base', base_currency())] = Decimal(1)
+    unknown = set(rates) - set(currency_codes())
+    if unknown:
+        raise UnknownCurrency(', '.join(sorted(unknown)))
+    if base_currency() not in rates:
+        raise UnknownCurrency(base_currency())
+    base_rate = rates[base_currency()]
+    with transaction.atomic():
+        for code, rate in rates.items():
+            if code != base_currency():
+                ExchangeRate.objects.update_or_create(
+                    currency=code, defaults={'rate': (rate / base_rate).quantize(Decimal('1e-8'))},
+                )
+    return len(rates) - 1
@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from . import rates
+from .models import ExchangeRate
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def invalidate_rate_matrix(sender, **kwargs):
+    # Again on commit, in case another thread reloaded the matrix before the commit
+    rates.invalidate()
+    transaction.on_commit(rates.invalidate)
@@ -0,0 +1,113 @@
+import io
+import json
+import tempfile
+from decimal import Decimal
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from rest_framework.test import APIClient
+from pc_components import cache as pc_cache
+from pc_components.models import Pc
+from pc_components.tests import create_component
+from . import rates
+from .models import ExchangeRate
+
+
+def set_rates(**values):
+    """ Rows written here are rolled back without signals, call rates.invalidate() afterwards. """
+    for currency, rate in values.items():
+        ExchangeRate.objects.update_or_create(currency=currency, defaults={'rate': Decimal(rate)})
+
+
+class RateMatrixTests(TestCase):
+    def setUp(self):
+        rates.invalidate()
+        self.addCleanup(rates.invalidate)
+        set_rates(USD='1.25', GBP='0.5')
+
+    def test_matrix(self):
+        matrix = rates.get_matrix()
+        self.assertEqual(matrix[('EUR', 'USD')], Decimal('1.25'))
+        self.assertEqual(matrix[('USD', 'GBP')], Decimal('0.4'))
+        self.assertEqual(rates.convert('10.00', 'GBP', 'USD'), Decimal('25.00'))
+
+    def test_cached_until_a_rate_changes(self):
+        rates.get_matrix()
+        with self.assertNumQueries(0):
+            rates.factors_to('USD')
+        set_rates(USD='2')
+        self.assertEqual(rates.factors_to('USD')['EUR'], Decimal('2'))
+
+    def test_convert_rows_keeps_value_types(self):
+        rows = [{'price': '10.00', 'currency': 'EUR'}, {'price': 8.0, 'currency': 'GBP'}, {'price': None, 'currency': 'USD'}]
+        rates.convert_rows(rows, 'USD', ['price'], 'currency')
+        self.assertEqual(rows, [
+            {'price': '12.50', 'currency': 'USD'}, {'price': 20.0, 'currency': 'USD'}, {'price': None, 'currency': 'USD'},
+        ])
+
+    def test_load_command_rebases(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as file:
+            json.dump({'base': 'USD', 'rates': {'EUR': '0.5', 'GBP': '0.25'}}, file)
+            file.flush()
+            call_command('load_exchange_rates', file.name, stdout=io.StringIO())
+        self.assertEqual(rates.factors_to('USD')['EUR'], Decimal('2'))
+        self.assertEqual(rates.factors_to('GBP')['EUR'], Decimal('0.5'))
+
+    def test_load_command_rejects_unknown_currency(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as file:
+            json.dump({'base': 'EUR', 'rates': {'JPY': '160'}}, file)
+            file.flush()
+            with self.assertRaises(CommandError):
+                call_command('load_exchange_rates', file.name, stdout=io.StringIO())
+
+    def test_rates_endpoint(self):
+        data = APIClient().get('/currencies/rates/').data
+        self.assertEqual(data['base'], 'EUR')
+        self.assertEqual(Decimal(data['rates']['GBP']), Decimal('0.5'))
+
+
+class CurrencyParamTests(TestCase):
+    def setUp(self):
+        pc_cache.clear()
+        rates.invalidate()
+        self.addCleanup(rates.invalidate)
+        set_rates(USD='2', GBP='0.5')
+        self.client = APIClient()
+        # 100 EUR, 160 USD (80 EUR), 45 GBP (90 EUR)
+        self.eur = create_component(name='Euro part', price='100.00', currency='EUR')
+        self.usd = create_component(name='Dollar part', price='160.00', currency='USD')
+        self.gbp = create_component(name='Pound part', price='45.00', currency='GBP')
+
+    def rows(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [(row['name'], row['price'], row['currency']) for row in response.data['results']]
+
+    def test_components_are_converted(self):
+        self.assertEqual(self.rows('/components/?currency=usd'), [
+            ('Dollar part', '160.00', 'USD'), ('Euro part', '200.00', 'USD'), ('Pound part', '180.00', 'USD'),
+        ])
+        self.assertEqual(self.client.get(f'/components/{self.gbp.id}/?currency=EUR').data['price'], '90.00')
+
+    def test_ordering_and_filtering_across_currencies(self):
+        self.assertEqual([name for name, *_ in self.rows('/components/?currency=EUR&ordering=price')],
+                         ['Dollar part', 'Pound part', 'Euro part'])
+        self.assertEqual([name for name, *_ in self.rows('/components/?currency=GBP&price_min=42.5&price_max=48')],
+                         ['Pound part'])
+
+    def test_keyset_pages_in_converted_order(self):
+        response = self.client.get('/components/?currency=EUR&ordering=-price&page_size=2')
+        self.assertEqual([row['name'] for row in response.data['results']], ['Euro part', 'Pound part'])
+        self.assertEqual([row['name'] for row in self.client.get(response.data['next']).data['results']], ['Dollar part'])
+
+    def test_pc_price_is_kept_in_base_currency(self):
+        pc = Pc.objects.create(name='Mixed', description='Description', is_customized=False)
+        pc.components.add(self.usd, self.gbp)
+        self.assertEqual(pc.price, Decimal('170.00'))
+        self.assertEqual(self.rows('/pcs/?currency=USD'), [('Mixed', '340.00', 'USD')])
+        set_rates(USD='4')
+        self.assertEqual(Pc.objects.get(id=pc.id).price, Decimal('130.00'))
+        self.assertEqual(self.rows('/pcs/?currency=USD'), [('Mixed', '520.00', 'USD')])
+
+    def test_unknown_currency(self):
+        self.assertEqual(self.client.get('/components/?currency=JPY').status_code, 400)
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import ExchangeRateView
+
+urlpatterns = [
+    path('currencies/rates/', ExchangeRateView.as_view(), name='exchange-rates'),
+]
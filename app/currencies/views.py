@@ -0,0 +1,119 @@
+from collections import defaultdict
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import rates
+
+
+def parse_currency(request, param='currency'):
+    """ Requested currency code, None if the parameter is absent. """
+    value = request.query_params.get(param, '').strip().upper()
+    if not value:
+        return None
+    try:
+        rates.factors_to(value)
+    except rates.UnknownCurrency:
+        raise ValidationError({param: f"Unknown currency '{value}', expected one of {', '.join(rates.currency_codes())}."})
+    return value
+
+
+def result_rows(data):
+    """ The row dicts of a list, paginated or detail response body. """
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        return data['results']
+    if isinstance(data, list):
+        return data
+    return [data]
+
+
+class CurrencyConversionMixin:
+    """
+    `?currency=` for a viewset. `converted_fields = {'price': 'currency'}` maps amount fields
+    to the field holding their currency (None: the amount is in settings.BASE_CURRENCY).
+
+    Filter lookups and ordering on those fields run against one SQL expression converting
+    every row (rates.converted_amount); amounts in a single currency keep ordering on the
+    indexed column since conversion doesn't change their order. The response rows are then
+    converted in one pass over the page (rates.convert_rows).
+    """
+    converted_fields = {}
+
+    @staticmethod
+    def converted_name(field):
+        return f'{field}_converted'
+
+    def get_currency(self):
+        return parse_currency(self.request)
+
+    def filter_queryset(self, queryset):
+        currency = self.get_currency()
+        if currency is None:
+            return super().filter_queryset(queryset)
+
+        used = set(getattr(self, 'ordering_fields', None) or [])
+        used.update(lookup.split('__')[0] for lookup, _ in getattr(self, 'filter_params', {}).values())
+        converted = {field: source for field, source in self.converted_fields.items() if field in used}
+        queryset = queryset.annotate(**{
+            self.converted_name(field): rates.converted_amount(field, source, currency)
+            for field, source in converted.items()
+        })
+        # Instance attribute, read by QueryParamFilterBackend for this request only
+        self.filter_params = {
+            param: (self._converted_lookup(lookup, converted), parser)
+            for param, (lookup, parser) in getattr(self, 'filter_params', {}).items()
+        }
+        queryset = super().filter_queryset(queryset)
+
+        ordering = [
+            self._converted_ordering(name, converted) if isinstance(name, str) else name
+            for name in queryset.query.order_by
+        ]
+        return queryset.order_by(*ordering) if ordering else queryset
+
+    def _converted_lookup(self, lookup, converted):
+        field, _, rest = lookup.partition('__')
+        if field not in converted:
+            return lookup
+        return f'{self.converted_name(field)}__{rest}' if rest else self.converted_name(field)
+
+    def _converted_ordering(self, name, converted):
+        field = name.lstrip('-')
+        if converted.get(field) is None:
+            return name
+        return name[:len(name) - len(field)] + self.converted_name(field)
+
+    def convert_response(self, response):
+        currency = self.get_currency()
+        if currency is None or response.status_code != 200:
+            return response
+        self.convert_rows(result_rows(response.data), currency)
+        return response
+
+    def convert_rows(self, rows, currency):
+        by_currency_field = defaultdict(list)
+        for field, source in self.converted_fields.items():
+            by_currency_field[source].append(field)
+        for source, fields in by_currency_field.items():
+            rates.convert_rows(rows, currency, fields, source)
+
+    def list(self, request, *args, **kwargs):
+        return self.convert_response(super().list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.convert_response(super().retrieve(request, *args, **kwargs))
+
+
+class ExchangeRateView(APIView):
+    """ The current rates: units of each currency per one unit of the base currency. """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        base = rates.base_currency()
+        factors = rates.get_matrix()
+        return Response({
+            'base': base,
+            'rates': {target: str(factor) for (source, target), factor in sorted(factors.items()) if source == base},
+        })
@@ -0,0 +1,30 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Run background jobs from the database queue with a bounded number of threads, '
+        'until SIGTERM / SIGINT (or until the queue is empty with --burst).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help='Jobs run at once (default JOB_CONCURRENCY)')
+        parser.add_argument('--poll-interval', type=float, help='Seconds between claims while the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due')
+
+    def handle(self, *args, **options):
+        worker = Worker(options['concurrency'], options['poll_interval'])
+
+        def stop(signum, frame):
+            self.stdout.write('Stopping after the running jobs...')
+            worker.stop()
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f'Worker {worker.name} running {worker.concurrency} jobs at a time')
+        processed = worker.run(burst=options['burst'])
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} jobs'))
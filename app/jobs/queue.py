@@ -0,0 +1,192 @@
+"""
+Database-backed job queue.
+
+`enqueue()` inserts a `Job` row, normally in the transaction of the change that needs the
+work, so the job exists exactly when that change was committed. Handlers are registered
+with `@job(name)` in a module their app imports in `ready()`; the payload is passed to
+them as keyword arguments.
+
+`run_worker` runs a `Worker`: `concurrency` threads, each claiming and running one job at
+a time, which bounds the jobs running in that process. A claim marks due jobs `running`
+under the thread's id:
+
+- with SELECT ... FOR UPDATE SKIP LOCKED where the backend has it (PostgreSQL), so
+  concurrent workers skip each other's rows instead of waiting for them;
+- elsewhere (SQLite) with one conditional UPDATE per candidate that repeats the claim
+  conditions, so of two workers racing for a job only one updates its row.
+
+A job that succeeds is deleted. One that raises is queued again after an exponential
+backoff with jitter (JOB_RETRY_BASE_SECONDS doubling per attempt, capped at
+JOB_RETRY_MAX_SECONDS) until `max_attempts`; then it stays as `failed`, with the error
+in `last_error`, and the handler's `on_failure` is called. A worker that dies leaves its
+jobs `running`; they are claimed again once their lease (JOB_LEASE_SECONDS) runs out,
+so handlers must be safe to run twice.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger('jobs')
+
+ERROR_LENGTH = 4000
+
+
+class JobType:
+    __slots__ = ('name', 'func', 'max_attempts', 'on_failure')
+
+    def __init__(self, name, func, max_attempts, on_failure):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        self.on_failure = on_failure
+
+
+registry = {}
+
+
+def job(name, max_attempts=None, on_failure=None):
+    """ Registers the decorated function as the handler of jobs named `name`. """
+    def register(func):
+        registry[name] = JobType(name, func, max_attempts, on_failure)
+        return func
+    return register
+
+
+def enqueue(name, payload=None, delay=0):
+    job_type = registry.get(name)
+    if job_type is None:
+        raise LookupError(f'No job registered as {name!r}.')
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=job_type.max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def claimable(now):
+    """ Due queued jobs, and running ones whose lease has expired. """
+    expired = now - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    return Job.objects.filter(Q(status=Job.QUEUED, run_at__lte=now) | Q(status=Job.RUNNING, locked_at__lt=expired))
+
+
+def claim(worker_id, limit=1):
+    """ Up to `limit` due jobs, marked as running by `worker_id`; see the module docstring. """
+    now = timezone.now()
+    claimed = {'status': Job.RUNNING, 'locked_by': worker_id, 'locked_at': now, 'attempts': F('attempts') + 1}
+    database = router.db_for_write(Job)
+    if connections[database].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=database):
+            jobs = list(claimable(now).select_for_update(skip_locked=True).order_by('run_at', 'id')[:limit])
+            Job.objects.filter(id__in=[job.id for job in jobs]).update(**claimed)
+    else:
+        jobs = []
+        # A few spare candidates, for those other workers win
+        for job in claimable(now).order_by('run_at', 'id')[:limit * 4]:
+            if claimable(now).filter(id=job.id).update(**claimed):
+                jobs.append(job)
+                if len(jobs) == limit:
+                    break
+    for job in jobs:
+        job.status, job.locked_by, job.locked_at, job.attempts = Job.RUNNING, worker_id, now, job.attempts + 1
+    return jobs
+
+
+def retry_delay(attempts):
+    """ Seconds before attempt `attempts + 1`: half of the capped exponential delay plus up to the other half. """
+    delay = min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_SECONDS)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def execute(job):
+    """ Runs a claimed job and records the outcome, unless another worker took it over meanwhile. """
+    job_type = registry.get(job.name)
+    owned = Job.objects.filter(id=job.id, locked_by=job.locked_by)
+    try:
+        if job_type is None:
+            raise LookupError(f'No job registered as {job.name!r}.')
+        job_type.func(**job.payload)
+    except Exception as error:
+        error_text = ''.join(traceback.format_exception(error))[-ERROR_LENGTH:]
+        if job_type is not None and job.attempts < job.max_attempts:
+            delay = retry_delay(job.attempts)
+            logger.warning('Job %s failed (attempt %d/%d), retrying in %.0fs: %r',
+                           job, job.attempts, job.max_attempts, delay, error)
+            owned.update(status=Job.QUEUED, run_at=timezone.now() + timedelta(seconds=delay),
+                         locked_by='', locked_at=None, last_error=error_text)
+            return False
+        logger.error('Job %s failed for good after %d attempts: %r', job, job.attempts, error)
+        updated = owned.update(status=Job.FAILED, locked_by='', locked_at=None, last_error=error_text)
+        if updated and job_type is not None and job_type.on_failure is not None:
+            try:
+                job_type.on_failure(**job.payload)
+            except Exception:
+                logger.exception('on_failure of job %s failed', job)
+        return False
+    owned.delete()
+    return True
+
+
+class Worker:
+    def __init__(self, concurrency=None, poll_interval=None, name=None):
+        self.concurrency = concurrency or settings.JOB_CONCURRENCY
+        self.poll_interval = poll_interval if poll_interval is not None else settings.JOB_POLL_INTERVAL
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.processed = 0
+        self._lock = threading.Lock()
+
+    def stop(self):
+        """ Lets each thread finish its current job, then return. """
+        self.stopping.set()
+
+    def work(self, burst=False, worker_id=None, manage_connections=False):
+        """ Claims and runs jobs one by one until stopped, or until none is due with `burst`. """
+        worker_id = worker_id or self.name
+        while not self.stopping.is_set():
+            if manage_connections:
+                close_old_connections()
+            try:
+                jobs = claim(worker_id)
+                for job in jobs:
+                    execute(job)
+                    with self._lock:
+                        self.processed += 1
+            except DatabaseError:
+                # E.g. the database restarting; the job's lease expires and it is claimed again
+                logger.exception('Worker %s lost its database connection', worker_id)
+                jobs = []
+            if not jobs:
+                if burst:
+                    break
+                self.stopping.wait(self.poll_interval)
+
+    def _thread(self, number, burst):
+        try:
+            self.work(burst, f'{self.name}:{number}', manage_connections=True)
+        finally:
+            connections.close_all()
+
+    def run(self, burst=False):
+        threads = [
+            threading.Thread(target=self._thread, args=(number, burst), name=f'job-worker-{number}', daemon=True)
+            for number in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        # Short joins keep the main thread responsive to SIGTERM / SIGINT
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(0.5)
+        return self.processed
@@ -0,0 +1,111 @@
+import io
+import logging
+from datetime import timedelta
+from unittest import mock, skipUnless
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from . import queue
+from .models import Job
+
+calls = []
+
+
+@queue.job('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@queue.job('tests.flaky', max_attempts=2, on_failure=lambda value: calls.append(('gave up', value)))
+def flaky(value):
+    raise ConnectionError(value)
+
+
+@override_settings(JOB_RETRY_BASE_SECONDS=10, JOB_RETRY_MAX_SECONDS=30, JOB_LEASE_SECONDS=60, JOB_MAX_ATTEMPTS=3)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        # Keeps the test output clean; assertLogs still sees the records
+        null_handler = logging.NullHandler()
+        queue.logger.addHandler(null_handler)
+        self.addCleanup(queue.logger.removeHandler, null_handler)
+
+    def test_runs_and_deletes_succeeded_jobs(self):
+        queue.enqueue('tests.record', {'value': 1})
+        queue.enqueue('tests.record', {'value': 2})
+        worker = queue.Worker(concurrency=1)
+        worker.work(burst=True)
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(worker.processed, 2)
+        self.assertFalse(Job.objects.exists())
+
+    def test_unknown_name(self):
+        with self.assertRaises(LookupError):
+            queue.enqueue('tests.missing')
+
+    def test_claims_due_jobs_once(self):
+        due = queue.enqueue('tests.record', {'value': 1})
+        queue.enqueue('tests.record', {'value': 2}, delay=60)
+        [claimed] = queue.claim('worker-a', limit=5)
+        self.assertEqual((claimed.id, claimed.attempts, claimed.locked_by), (due.id, 1, 'worker-a'))
+        self.assertEqual(queue.claim('worker-b', limit=5), [])
+
+    def test_expired_lease_is_claimed_again(self):
+        job = queue.enqueue('tests.record', {'value': 1})
+        queue.claim('worker-a')
+        Job.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(seconds=61))
+        [claimed] = queue.claim('worker-b')
+        self.assertEqual((claimed.locked_by, claimed.attempts), ('worker-b', 2))
+        # The first worker finishing late does not touch the job it lost
+        stale = Job.objects.get(id=job.id)
+        stale.locked_by = 'worker-a'
+        queue.execute(stale)
+        self.assertTrue(Job.objects.filter(id=job.id, locked_by='worker-b').exists())
+
+    def test_retries_with_backoff_then_fails(self):
+        job = queue.enqueue('tests.flaky', {'value': 'boom'})
+        self.assertEqual(job.max_attempts, 2)
+        with mock.patch('jobs.queue.random.uniform', return_value=0):
+            queue.Worker().work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertAlmostEqual((job.run_at - timezone.now()).total_seconds(), 5, delta=1)
+        self.assertIn('ConnectionError: boom', job.last_error)
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        with self.assertLogs('jobs', 'ERROR'):
+            queue.Worker().work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertEqual(calls, [('gave up', 'boom')])
+        self.assertEqual(queue.claim('worker'), [])
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        with mock.patch('jobs.queue.random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([queue.retry_delay(attempt) for attempt in range(1, 5)], [10, 20, 30, 30])
+
+    def test_unregistered_job_fails_without_retry(self):
+        Job.objects.create(name='tests.gone', run_at=timezone.now(), max_attempts=5)
+        with self.assertLogs('jobs', 'ERROR'):
+            queue.Worker().work(burst=True)
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    @skipUnless(connection.features.has_select_for_update_skip_locked, 'Needs SELECT ... FOR UPDATE SKIP LOCKED')
+    def test_claim_query_skips_locked_rows(self):
+        queue.enqueue('tests.record', {'value': 1})
+        with self.assertNumQueries(4):
+            # Savepoint, SELECT ... FOR UPDATE SKIP LOCKED, UPDATE, release
+            self.assertEqual(len(queue.claim('worker')), 1)
+
+
+class WorkerCommandTests(TransactionTestCase):
+    def test_burst_run_in_a_worker_thread(self):
+        calls.clear()
+        for value in range(5):
+            queue.enqueue('tests.record', {'value': value})
+        out = io.StringIO()
+        call_command('run_worker', '--burst', '--concurrency', '1', stdout=out)
+        self.assertEqual(sorted(calls), list(range(5)))
+        self.assertIn('Processed 5 jobs', out.getvalue())
+        self.assertFalse(Job.objects.exists())
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, Order_Item
+from .models import Order, Order_Item, Stock_Reservation
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
@@ -15,3 +15,7 @@ class OrderItemsAdmin(admin.ModelAdmin):
     list_filter = ('order_type',)
     ordering = ('order_id',)
 
+@admin.register(Stock_Reservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'order_id', 'component_id', 'quantity', 'expires_at')
+    ordering = ('expires_at',)
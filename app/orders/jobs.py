@@ -0,0 +1,55 @@
+import logging
+
+from django.db import transaction
+
+from jobs.queue import enqueue, job
+from pc_components import stock
+from . import payments, reservations, states
+from .models import Order
+
+PROCESS_PAYMENT = 'orders.process_payment'
+
+logger = logging.getLogger('jobs')
+
+
+def payment_failed(order_id):
+    """ The payment job gave up: the order can be cancelled or its payment retried. """
+    order = Order.objects.filter(id=order_id).first()
+    if order is not None and order.status in states.TRANSITIONS[states.PAYMENT_FAILED]:
+        states.transition(order, states.PAYMENT_FAILED)
+
+
+@job(PROCESS_PAYMENT, on_failure=payment_failed)
+def process_payment(order_id):
+    """
+    Captures the payment of a pending order: pending -> processing -> paid or payment_failed.
+    Runs again on errors; a retry finds the order `processing` and captures again, an order
+    that moved on meanwhile (paid, cancelled) is left alone. The order's stock reservations
+    are renewed before the capture and consumed with the payment (orders/reservations.py).
+    """
+    order = Order.objects.filter(id=order_id).first()
+    if order is None:
+        return
+    if order.status == states.PENDING:
+        states.transition(order, states.PROCESSING)
+    elif order.status != states.PROCESSING:
+        return
+    try:
+        reservations.renew(order)
+    except stock.OutOfStock as error:
+        logger.warning('Order %s not paid: %s', order.id, error)
+        states.transition(order, states.PAYMENT_FAILED)
+        return
+    try:
+        payments.capture(order)
+    except payments.PaymentDeclined:
+        states.transition(order, states.PAYMENT_FAILED)
+        return
+    with transaction.atomic():
+        states.transition(order, states.PAID)
+        reservations.consume(order)
+
+
+def enqueue_payment(order):
+    """ Call in the transaction that creates the order, so the job is committed with it. """
+    return enqueue(PROCESS_PAYMENT, {'order_id': order.id})
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders import reservations
+
+
+class Command(BaseCommand):
+    help = 'Release every expired stock reservation, putting its units back in stock (e.g. from cron).'
+
+    def handle(self, *args, **options):
+        count = reservations.release_expired()
+        self.stdout.write(self.style.SUCCESS(f'Released {count} expired reservations'))
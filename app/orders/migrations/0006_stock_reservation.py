@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_status_choices'),
+        ('pc_components', '0008_component_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Stock_Reservation',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField()),
+                ('component', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pc_components.component')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='orders.order')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='reservation_expires_at_idx')],
+            },
+        ),
+    ]
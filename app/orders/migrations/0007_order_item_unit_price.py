@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+
+
+def copy_catalog_prices(apps, schema_editor):
+    """ Items of earlier orders get the current catalog prices, the best record left of theirs. """
+    alias = schema_editor.connection.alias
+    Order_Item = apps.get_model('orders', 'Order_Item')
+    Component = apps.get_model('pc_components', 'Component')
+    Pc = apps.get_model('pc_components', 'Pc')
+    components = Component.objects.using(alias).filter(id=OuterRef('component_id'))
+    Order_Item.objects.using(alias).filter(order_type='component').update(
+        unit_price=Subquery(components.values('price')[:1]),
+        currency=Subquery(components.values('currency')[:1]),
+    )
+    pcs = Pc.objects.using(alias).filter(id=OuterRef('pc_id'))
+    Order_Item.objects.using(alias).filter(order_type='pc').update(
+        unit_price=Subquery(pcs.values('price')[:1]),
+        # Pc prices are kept in the base currency
+        currency=Value(settings.BASE_CURRENCY),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_stock_reservation'),
+        ('pc_components', '0010_component_price_min_value'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order_item',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='order_item',
+            name='currency',
+            field=models.CharField(blank=True, editable=False, max_length=3, null=True),
+        ),
+        migrations.RunPython(copy_catalog_prices, migrations.RunPython.noop),
+    ]
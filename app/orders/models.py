@@ -1,19 +1,42 @@
 from django.db import models
 
 class Order(models.Model):
+    # Changed through orders.states.transition()
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Payment processing'),
+        ('paid', 'Paid'),
+        ('payment_failed', 'Payment failed'),
+        ('shipped', 'Shipped'),
+        ('delivered', 'Delivered'),
+        ('cancelled', 'Cancelled'),
+    ]
+    PAYMENT_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('paid', 'Paid'),
+        ('failed', 'Failed'),
+    ]
     id = models.AutoField(primary_key=True)
     user = models.ForeignKey('users.User', on_delete=models.CASCADE)
     total_price = models.FloatField()
-    status = models.CharField(max_length=20)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
     payment_method = models.CharField(max_length=50)
-    payment_status = models.CharField(max_length=20)
+    payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='pending')
     currency = models.CharField(max_length=3, choices=[
         ('EUR', 'Euro'),
         ('USD', 'US-Dollar'),
         ('GBP', 'British Pound'),
     ], default='EUR')
 
+    class Meta:
+        indexes = [
+            # Keyset pagination over the default `created_at` ordering
+            models.Index(fields=['created_at', 'id'], name='order_created_at_id_idx'),
+            # Per-user order history, newest first
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_at_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.id}"
@@ -29,6 +52,9 @@ class Order_Item(models.Model):
     component = models.ForeignKey('pc_components.Component', blank=True, null=True, on_delete=models.CASCADE)
     order_type = models.CharField(max_length=9, choices=ORDER_TYPE_CHOICES)
     quantity = models.IntegerField()
+    # Catalog price of the pc or component when the order was priced, set by orders.pricing
+    unit_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False)
+    currency = models.CharField(max_length=3, null=True, blank=True, editable=False)
 
     def __str__(self):
         if self.order_type == 'pc':
@@ -37,7 +63,19 @@ class Order_Item(models.Model):
             return f"Component: {self.component.name} - Quantity: {self.quantity}"
 
 
+class Stock_Reservation(models.Model):
+    """ Units of a component taken from stock for an order until it is paid, cancelled or this expires. """
+    id = models.AutoField(primary_key=True)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='reservations')
+    component = models.ForeignKey('pc_components.Component', on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            # The sweeper's scan for expired reservations
+            models.Index(fields=['expires_at'], name='reservation_expires_at_idx'),
+        ]
 
-
-
+    def __str__(self):
+        return f"{self.quantity} x {self.component_id} for order {self.order_id}"
@@ -0,0 +1,22 @@
+"""
+Payment capture, called by the payment job (orders/jobs.py) through PAYMENT_CAPTURE.
+
+A capture function takes the order, raises PaymentDeclined when the provider refuses the
+payment and any other exception for errors worth retrying (timeouts, provider outages).
+The job may run again after a worker died mid-capture, so the provider call should be
+idempotent, e.g. keyed by the order id.
+"""
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class PaymentDeclined(Exception):
+    pass
+
+
+def accept_all(order):
+    """ Stand-in until a payment provider is integrated: every payment is captured. """
+
+
+def capture(order):
+    import_string(settings.PAYMENT_CAPTURE)(order)
@@ -6,9 +6,13 @@ class IsOrderOwner(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.user.is_superuser:
             return True
-        return obj.user == request.user
+        return obj.user_id == request.user.id
 
 class IsOrder_Item_Owner(BasePermission):
-    pass
+    """Order items belong to the owner of their order."""
+    def has_object_permission(self, request, view, obj):
+        if request.user.is_superuser:
+            return True
+        return obj.order.user_id == request.user.id
 
 
@@ -0,0 +1,57 @@
+"""
+Order totals, computed from catalog prices instead of trusting the client.
+
+`Order.total_price` is read-only in the API. Checkout prices the items it creates, and
+`reprice` prices the items of an order again whenever they or its currency change, in the
+transaction that changes them. Each item keeps the unit price it was priced at, so the
+order history shows what was paid even after the catalog prices change.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from currencies import rates
+from .models import Order, Order_Item
+
+
+def total(lines, factors):
+    """
+    Sum of `(price, price currency, quantity)` lines converted with `factors` ({source:
+    factor}, see currencies.rates.factors_to), rounded to cents.
+    """
+    amount = sum((price * factors[currency] * quantity for price, currency, quantity in lines), Decimal('0'))
+    return float(amount.quantize(rates.CENT, ROUND_HALF_UP))
+
+
+def price_item(item, pc, component):
+    """ Sets the unit price and currency of `item` from its catalog pc or component. """
+    if item.order_type == 'pc' and pc is not None:
+        # Pc prices are kept in the base currency
+        item.unit_price, item.currency = pc.price, rates.base_currency()
+    elif item.order_type == 'component' and component is not None:
+        item.unit_price, item.currency = component.price, component.currency
+    else:
+        item.unit_price, item.currency = None, None
+    return item
+
+
+def lines(items):
+    """ The `total` lines of priced items. """
+    return [(item.unit_price, item.currency, item.quantity) for item in items if item.unit_price is not None]
+
+
+def reprice(order):
+    """
+    Prices the items of `order` at the current catalog prices and saves them with its new
+    total, in its currency. Raises currencies.rates.UnknownCurrency without a rate for that
+    currency.
+    """
+    factors = rates.factors_to(order.currency)
+    items = list(
+        Order_Item.objects.filter(order_id=order.id).select_related('pc', 'component')
+        .only('id', 'order_type', 'quantity', 'pc__price', 'component__price', 'component__currency')
+    )
+    for item in items:
+        price_item(item, item.pc, item.component)
+    Order_Item.objects.bulk_update(items, ['unit_price', 'currency'])
+    order.total_price = total(lines(items), factors)
+    Order.objects.filter(id=order.id).update(total_price=order.total_price)
+    return order.total_price
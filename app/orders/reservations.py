@@ -0,0 +1,100 @@
+"""
+Stock reservations of orders.
+
+Checkout takes the units of every tracked component an order needs from stock
+(pc_components.stock.take), in the transaction that creates the order, and records them
+as `Stock_Reservation`s valid for STOCK_RESERVATION_SECONDS. Then they follow the order:
+
+- paid: the reservations are deleted and the units stay sold;
+- cancelled: they are released at once and the units go back to stock;
+- still unpaid when they expire (no worker running, a failed payment not retried): the
+  sweeper releases them. A job enqueued along with the reservations sweeps the order's
+  reservations once they expire; `manage.py sweep_reservations` sweeps all of them.
+
+A payment, first or retried, renews the order's reservations before capturing, so units
+the sweeper released are taken again, or the payment fails before any money is moved.
+
+Each reservation is released by its own conditional DELETE and only the units of the
+rows a release actually deleted go back, so a sweeper, a cancellation and a payment
+racing for the same reservation release it once.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from jobs.queue import enqueue, job
+from pc_components import stock
+from .models import Order_Item, Stock_Reservation
+
+RELEASE_EXPIRED = 'orders.release_expired_reservations'
+
+
+def order_requirements(order):
+    """ {component id: units} of tracked components the items of `order` need. """
+    components, pcs = Counter(), Counter()
+    for order_type, pc_id, component_id, quantity in Order_Item.objects.filter(order_id=order.id).values_list(
+            'order_type', 'pc_id', 'component_id', 'quantity'):
+        if order_type == 'pc':
+            pcs[pc_id] += quantity
+        else:
+            components[component_id] += quantity
+    return stock.requirements(components, pcs)
+
+
+def reserve(order, quantities):
+    """
+    Takes {component id: units} of tracked components from stock for `order`, raising
+    stock.OutOfStock if any is short. Call it in the transaction that writes the order.
+    """
+    quantities = {component_id: quantity for component_id, quantity in quantities.items() if quantity}
+    if not quantities:
+        return []
+    stock.take(quantities)
+    expires_at = timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_SECONDS)
+    reservations = Stock_Reservation.objects.bulk_create([
+        Stock_Reservation(order_id=order.id, component_id=component_id, quantity=quantity, expires_at=expires_at)
+        for component_id, quantity in sorted(quantities.items())
+    ])
+    enqueue(RELEASE_EXPIRED, {'order_id': order.id}, delay=settings.STOCK_RESERVATION_SECONDS + 1)
+    return reservations
+
+
+def release(reservations):
+    """ Deletes `reservations` and puts their units back, skipping those gone meanwhile. Returns the number released. """
+    returned = Counter()
+    released = 0
+    with transaction.atomic():
+        for reservation in reservations:
+            if Stock_Reservation.objects.filter(id=reservation.id).delete()[0]:
+                returned[reservation.component_id] += reservation.quantity
+                released += 1
+        stock.put_back(returned)
+    return released
+
+
+def release_order(order):
+    return release(list(Stock_Reservation.objects.filter(order_id=order.id)))
+
+
+@job(RELEASE_EXPIRED)
+def release_expired(order_id=None):
+    """ The sweeper: releases the expired reservations, of one order or all. """
+    expired = Stock_Reservation.objects.filter(expires_at__lte=timezone.now())
+    if order_id is not None:
+        expired = expired.filter(order_id=order_id)
+    return release(list(expired.order_by('id')))
+
+
+def renew(order):
+    """ Reserves what `order` needs again for a full period, raising stock.OutOfStock if it can't. """
+    with transaction.atomic():
+        release_order(order)
+        return reserve(order, order_requirements(order))
+
+
+def consume(order):
+    """ The order is paid: its reserved units are sold. """
+    return Stock_Reservation.objects.filter(order_id=order.id).delete()[0]
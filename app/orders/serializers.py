@@ -1,16 +1,42 @@
+from collections import Counter
+from django.db import transaction
 from rest_framework import serializers
+from app.app.fieldsets import FieldsetMixin
+from . import pricing, reservations, states
+from .jobs import enqueue_payment
 from .models import Order, Order_Item
+from currencies import rates
+from pc_components import stock
 from pc_components.models import Pc, Component
+from pc_components.serializers import ComponentSerializer, PcSerializer
 
 
-class OrderSerializer(serializers.ModelSerializer):
-    user_id = serializers.ReadOnlyField(source='user.id')
+class OrderSerializer(FieldsetMixin, serializers.ModelSerializer):
+    user_id = serializers.ReadOnlyField()
+    # Only rendered with ?expand=items
+    expandable_fields = {
+        'items': ('orders.serializers.Order_ItemSerializer', {'source': 'order_item_set', 'many': True, 'read_only': True}),
+    }
     class Meta:
         model = Order
         exclude = ['user']
+        # Driven by orders.states; see the `transition` action of OrderViewSet. The total
+        # is computed from the items (orders/pricing.py)
+        read_only_fields = ['status', 'payment_status', 'total_price']
+
+    def validate_currency(self, value):
+        try:
+            rates.factors_to(value)
+        except rates.UnknownCurrency:
+            raise serializers.ValidationError(f"No exchange rate for '{value}'.")
+        return value
+
+
+class OrderTransitionSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=sorted(states.ADMIN_TARGETS))
 
 
-class Order_ItemSerializer(serializers.ModelSerializer):
+class Order_ItemSerializer(FieldsetMixin, serializers.ModelSerializer):
     pc_id = serializers.PrimaryKeyRelatedField(
         queryset=Pc.objects.all(), source="pc", write_only=True, required=False
     )
@@ -18,10 +44,24 @@ class Order_ItemSerializer(serializers.ModelSerializer):
         queryset=Component.objects.all(), source="component", write_only=True, required=False
     )
 
+    expandable_fields = {
+        'order': (OrderSerializer, {'read_only': True}),
+        'pc': (PcSerializer, {'read_only': True}),
+        'component': (ComponentSerializer, {'read_only': True}),
+    }
+
     class Meta:
         model = Order_Item
         fields = '__all__'
 
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        # Items can only be added to the requester's own orders
+        if request is not None and not request.user.is_superuser and hasattr(fields.get('order'), 'queryset'):
+            fields['order'].queryset = Order.objects.filter(user_id=request.user.id)
+        return fields
+
     def validate_component(self, value):
         if self.initial_data.get('order_type') == 'pc' and self.initial_data.get('component') is None:
             raise serializers.ValidationError("Component must be specified for 'pc' type order.")
@@ -30,4 +70,129 @@ class Order_ItemSerializer(serializers.ModelSerializer):
     def validate_pc(self, value):
         if self.initial_data.get('order_type') == 'component' and self.initial_data.get('pc') is None:
             raise serializers.ValidationError("Pc must be specified for 'component' type order.")
-        return value
\ No newline at end of file
+        return value
+
+
+class OrderHistoryItemSerializer(serializers.ModelSerializer):
+    pc_id = serializers.ReadOnlyField()
+    component_id = serializers.ReadOnlyField()
+    name = serializers.SerializerMethodField()
+    unit_price = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    line_total = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    currency = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Order_Item
+        fields = ['id', 'order_type', 'pc_id', 'component_id', 'name', 'quantity', 'unit_price', 'line_total', 'currency']
+
+    def get_name(self, obj):
+        item = obj.pc if obj.order_type == 'pc' else obj.component
+        return item.name if item is not None else None
+
+
+class OrderHistorySerializer(OrderSerializer):
+    """ Order with the annotations and prefetched items of `orders.views.order_history_queryset`. """
+    item_count = serializers.IntegerField(read_only=True)
+    total_quantity = serializers.IntegerField(read_only=True)
+    items = OrderHistoryItemSerializer(source='history_items', many=True, read_only=True)
+    expandable_fields = {}
+
+
+class CheckoutItemSerializer(serializers.Serializer):
+    order_type = serializers.ChoiceField(choices=Order_Item.ORDER_TYPE_CHOICES)
+    pc_id = serializers.IntegerField(required=False)
+    component_id = serializers.IntegerField(required=False)
+    quantity = serializers.IntegerField(min_value=1)
+
+    def validate(self, data):
+        key = 'pc_id' if data['order_type'] == 'pc' else 'component_id'
+        if data.get(key) is None:
+            raise serializers.ValidationError({key: f"Required for '{data['order_type']}' type order items."})
+        return data
+
+
+class CheckoutSerializer(serializers.Serializer):
+    """
+    Creates an order and all of its items in one transaction, along with the job that
+    captures its payment and the reservation of the stock it needs (orders/reservations.py).
+    Every referenced Pc/Component is loaded with one `in_bulk` query per model, and the
+    total price is computed from catalog prices instead of trusting the client, converted
+    into the order's currency.
+    """
+    payment_method = serializers.CharField(max_length=50)
+    currency = serializers.ChoiceField(choices=Order._meta.get_field('currency').choices, default='EUR')
+    items = CheckoutItemSerializer(many=True, allow_empty=False)
+
+    def validate_currency(self, value):
+        try:
+            self.factors = rates.factors_to(value)
+        except rates.UnknownCurrency:
+            raise serializers.ValidationError(f"No exchange rate for '{value}'.")
+        return value
+
+    def validate_items(self, items):
+        pc_ids = {item['pc_id'] for item in items if item['order_type'] == 'pc'}
+        component_ids = {item['component_id'] for item in items if item['order_type'] == 'component'}
+        self.pcs = Pc.objects.only('id', 'price').in_bulk(pc_ids) if pc_ids else {}
+        self.components = Component.objects.only('id', 'price', 'currency', 'stock').in_bulk(component_ids) if component_ids else {}
+        self.pc_parts = stock.tracked_parts(pc_ids) if pc_ids else {}
+
+        errors = []
+        for item in items:
+            if item['order_type'] == 'pc' and item['pc_id'] not in self.pcs:
+                errors.append({'pc_id': f"Invalid pk \"{item['pc_id']}\" - object does not exist."})
+            elif item['order_type'] == 'component' and item['component_id'] not in self.components:
+                errors.append({'component_id': f"Invalid pk \"{item['component_id']}\" - object does not exist."})
+            else:
+                errors.append({})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    def create(self, validated_data):
+        items = validated_data.pop('items')
+
+        order_items = []
+        # Units of tracked components, taken from stock
+        needed = Counter()
+        for item in items:
+            if item['order_type'] == 'pc':
+                for component_id, count in self.pc_parts.get(item['pc_id'], {}).items():
+                    needed[component_id] += count * item['quantity']
+            else:
+                component = self.components[item['component_id']]
+                if component.stock is not None:
+                    needed[component.id] += item['quantity']
+            order_items.append(pricing.price_item(
+                Order_Item(
+                    pc_id=item.get('pc_id') if item['order_type'] == 'pc' else None,
+                    component_id=item.get('component_id') if item['order_type'] == 'component' else None,
+                    order_type=item['order_type'],
+                    quantity=item['quantity'],
+                ),
+                self.pcs.get(item.get('pc_id')),
+                self.components.get(item.get('component_id')),
+            ))
+
+        with transaction.atomic():
+            order = Order.objects.create(
+                total_price=pricing.total(pricing.lines(order_items), self.factors),
+                status=states.PENDING,
+                payment_status='pending',
+                **validated_data,
+            )
+            try:
+                reservations.reserve(order, needed)
+            except stock.OutOfStock as error:
+                raise serializers.ValidationError({'items': str(error)})
+            for order_item in order_items:
+                order_item.order = order
+            Order_Item.objects.bulk_create(order_items)
+            enqueue_payment(order)
+        order.items = order_items
+        return order
+
+    def to_representation(self, order):
+        data = OrderSerializer(order).data
+        data['items'] = Order_ItemSerializer(order.items, many=True).data
+        return data
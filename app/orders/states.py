@@ -0,0 +1,67 @@
+"""
+Order status state machine.
+
+    pending -> processing -> paid -> shipped -> delivered
+    pending, processing -> payment_failed -> processing (payment retried)
+    pending, payment_failed -> cancelled
+
+Orders are created `pending`, and the payment job (orders/jobs.py) moves them through
+`processing` to `paid` or `payment_failed`. Customers may cancel an unpaid order or retry
+a failed payment; admins ship and deliver. `transition()` checks the current status and
+writes the new one in a single conditional UPDATE, so of two concurrent transitions of
+an order (a worker and a request, or two workers) only one succeeds.
+"""
+from .models import Order
+
+PENDING = 'pending'
+PROCESSING = 'processing'
+PAID = 'paid'
+PAYMENT_FAILED = 'payment_failed'
+SHIPPED = 'shipped'
+DELIVERED = 'delivered'
+CANCELLED = 'cancelled'
+
+# target: statuses it can be reached from
+TRANSITIONS = {
+    PROCESSING: {PENDING, PAYMENT_FAILED},
+    PAID: {PROCESSING},
+    PAYMENT_FAILED: {PENDING, PROCESSING},
+    SHIPPED: {PAID},
+    DELIVERED: {SHIPPED},
+    CANCELLED: {PENDING, PAYMENT_FAILED},
+}
+# payment_status written along with these targets
+PAYMENT_STATUS = {
+    PROCESSING: 'processing',
+    PAID: 'paid',
+    PAYMENT_FAILED: 'failed',
+}
+# Targets a request may ask for, and who may: the order's owner or only admins
+CUSTOMER_TARGETS = {CANCELLED, PROCESSING}
+# Statuses in which items may still be added, changed or removed: nothing is captured or
+# being captured, so the items' stock is still held by expiring reservations
+EDITABLE = {PENDING, PAYMENT_FAILED}
+# Narrower sources for requests: a pending order's payment job is already queued, a second
+# one could capture twice, so a request only retries a failed payment
+REQUEST_TRANSITIONS = {PROCESSING: {PAYMENT_FAILED}}
+ADMIN_TARGETS = CUSTOMER_TARGETS | {SHIPPED, DELIVERED}
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+def transition(order, target, sources=None):
+    """
+    Moves `order` to `target`, or raises InvalidTransition if its stored status does not
+    allow it. `sources` narrows the statuses allowed by TRANSITIONS.
+    """
+    fields = {'status': target}
+    if target in PAYMENT_STATUS:
+        fields['payment_status'] = PAYMENT_STATUS[target]
+    allowed = TRANSITIONS[target] if sources is None else TRANSITIONS[target] & sources
+    if not Order.objects.filter(id=order.id, status__in=allowed).update(**fields):
+        current = Order.objects.filter(id=order.id).values_list('status', flat=True).first()
+        raise InvalidTransition(f"Order {order.id} cannot go from '{current}' to '{target}'.")
+    for name, value in fields.items():
+        setattr(order, name, value)
@@ -1,3 +1,476 @@
-from django.test import TestCase
+import json
+import logging
+from datetime import datetime, timezone
+from decimal import Decimal
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from app.app import throttling
+from app.app.renderers import FastJSONRenderer
+from currencies import rates
+from currencies.tests import set_rates
+from jobs import queue
+from jobs.models import Job
+from pc_components import cache as pc_cache
+from pc_components.views import ComponentViewSet, PcViewSet
+from pc_components import stock
+from pc_components.models import Pc, Pc_Components
+from pc_components.tests import create_component
+from users.models import User
+from . import payments, pricing, reservations, states
+from .models import Order, Order_Item, Stock_Reservation
+from .views import OrderViewSet
 
-# Create your tests here.
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        throttling.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='customer')
+        self.client.force_authenticate(self.user)
+        self.cpu = create_component(name='Ryzen', price='200.00')
+        self.gpu = create_component(name='RTX', type='GPU', price='500.50')
+        self.pc = Pc.objects.create(name='Gaming', description='Description', is_customized=False)
+        Pc_Components.objects.create(pc=self.pc, component=self.cpu)
+        Pc_Components.objects.create(pc=self.pc, component=self.gpu)
+
+    def checkout(self, items):
+        return self.client.post('/orders/checkout/', {'payment_method': 'card', 'items': items}, format='json')
+
+    def test_creates_order_and_items_with_server_side_total(self):
+        response = self.checkout([
+            {'order_type': 'pc', 'pc_id': self.pc.id, 'quantity': 2},
+            {'order_type': 'component', 'component_id': self.gpu.id, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 201, response.data)
+        order = Order.objects.get()
+        self.assertEqual(order.user, self.user)
+        self.assertAlmostEqual(order.total_price, 2 * 700.50 + 500.50)
+        self.assertEqual(response.data['total_price'], order.total_price)
+        self.assertEqual(len(response.data['items']), 2)
+        self.assertEqual(Order_Item.objects.filter(order=order).count(), 2)
+
+    def test_query_count_does_not_grow_with_items(self):
+        components = [create_component(name=f'Part {i}') for i in range(20)]
+        items = [{'order_type': 'component', 'component_id': c.id, 'quantity': 1} for c in components]
+        # Components, savepoint, order, items, payment job, release
+        with self.assertNumQueries(6):
+            self.assertEqual(self.checkout(items[:2]).status_code, 201)
+        with self.assertNumQueries(6):
+            self.assertEqual(self.checkout(items).status_code, 201)
+
+    def test_total_is_converted_into_the_order_currency(self):
+        set_rates(USD='2')
+        self.addCleanup(rates.invalidate)
+        part = create_component(name='Dollar part', price='30.00', currency='USD')
+        response = self.client.post('/orders/checkout/', {
+            'payment_method': 'card',
+            'currency': 'USD',
+            'items': [
+                {'order_type': 'pc', 'pc_id': self.pc.id, 'quantity': 1},
+                {'order_type': 'component', 'component_id': part.id, 'quantity': 2},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertAlmostEqual(Order.objects.get().total_price, 2 * 700.50 + 60)
+
+    def test_invalid_reference_creates_nothing(self):
+        response = self.checkout([
+            {'order_type': 'component', 'component_id': self.cpu.id, 'quantity': 1},
+            {'order_type': 'component', 'component_id': 999, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('component_id', response.data['items'][1])
+        self.assertFalse(Order.objects.exists())
+
+    def test_missing_reference_for_order_type(self):
+        response = self.checkout([{'order_type': 'pc', 'component_id': self.cpu.id, 'quantity': 1}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.checkout([]).status_code, 401)
+
+
+class OrderHistoryTests(TestCase):
+    def setUp(self):
+        throttling.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='customer')
+        self.other = User.objects.create(username='other')
+        self.client.force_authenticate(self.user)
+        self.cpu = create_component(name='Ryzen', price='200.00')
+        self.gpu = create_component(name='RTX', type='GPU', price='500.00')
+        self.pc = Pc.objects.create(name='Gaming', description='Description', is_customized=False)
+        Pc_Components.objects.create(pc=self.pc, component=self.cpu)
+        Pc_Components.objects.create(pc=self.pc, component=self.gpu)
+
+    def create_order(self, user, items=2):
+        order = Order.objects.create(user=user, total_price=0, status='pending', payment_method='card', payment_status='pending')
+        Order_Item.objects.create(order=order, pc=self.pc, order_type='pc', quantity=1)
+        for _ in range(items - 1):
+            Order_Item.objects.create(order=order, component=self.gpu, order_type='component', quantity=3)
+        pricing.reprice(order)
+        return order
+
+    def test_history_is_annotated_and_owner_scoped(self):
+        order = self.create_order(self.user)
+        self.create_order(self.other)
+        results = self.client.get('/orders/history/').data['results']
+        self.assertEqual([row['id'] for row in results], [order.id])
+        self.assertEqual((results[0]['item_count'], results[0]['total_quantity']), (2, 4))
+        pc_line, gpu_line = results[0]['items']
+        self.assertEqual((pc_line['name'], pc_line['line_total']), ('Gaming', '700.00'))
+        self.assertEqual((gpu_line['name'], gpu_line['unit_price'], gpu_line['line_total']), ('RTX', '500.00', '1500.00'))
+
+    def test_history_keeps_the_ordered_prices(self):
+        self.create_order(self.user)
+        self.gpu.price = Decimal('450.00')
+        self.gpu.save()
+        pc_line, gpu_line = self.client.get('/orders/history/').data['results'][0]['items']
+        self.assertEqual((pc_line['unit_price'], gpu_line['unit_price'], gpu_line['line_total']), ('700.00', '500.00', '1500.00'))
+
+    def test_history_query_count_is_constant(self):
+        self.create_order(self.user)
+        with self.assertNumQueries(2):
+            self.client.get('/orders/history/')
+        for _ in range(10):
+            self.create_order(self.user, items=5)
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.client.get('/orders/history/').data['results']), 11)
+
+    def test_history_in_requested_currency(self):
+        set_rates(GBP='0.5')
+        self.addCleanup(rates.invalidate)
+        order = self.create_order(self.user)
+        Order.objects.filter(id=order.id).update(total_price=2200.0)
+        result = self.client.get('/orders/history/?currency=GBP').data['results'][0]
+        self.assertEqual((result['total_price'], result['currency']), (1100.0, 'GBP'))
+        pc_line, gpu_line = result['items']
+        self.assertEqual((pc_line['line_total'], gpu_line['unit_price'], gpu_line['currency']), ('350.00', '250.00', 'GBP'))
+        self.assertEqual(self.client.get('/orders/?currency=GBP').data['results'][0]['total_price'], 1100.0)
+
+    def test_expanded_items(self):
+        order = self.create_order(self.user)
+        self.create_order(self.other)
+        with self.assertNumQueries(3):
+            response = self.client.get('/orders/?fields=id,items.quantity,items.component.name&expand=items.component')
+        self.assertEqual(response.data['results'], [
+            {'id': order.id, 'items': [{'quantity': 1, 'component': None}, {'quantity': 3, 'component': {'name': 'RTX'}}]},
+        ])
+        item = order.order_item_set.get(order_type='pc')
+        response = self.client.get(f'/order_items/{item.id}/?expand=pc&fields=pc.name,pc.components')
+        self.assertEqual(response.data, {'pc': {'name': 'Gaming', 'components': [self.cpu.id, self.gpu.id]}})
+
+    def test_fields_keep_the_currency_of_amounts(self):
+        set_rates(GBP='0.5')
+        self.addCleanup(rates.invalidate)
+        self.create_order(self.user)
+        Order.objects.update(total_price=10.0)
+        result = self.client.get('/orders/?fields=total_price&currency=GBP').data['results'][0]
+        self.assertEqual(result, {'total_price': 5.0, 'currency': 'GBP'})
+        result = self.client.get('/orders/history/?fields=id,total_price&currency=GBP').data['results'][0]
+        self.assertEqual(set(result), {'id', 'total_price', 'currency'})
+
+    def test_order_items_are_owner_scoped(self):
+        own = self.create_order(self.user)
+        foreign = self.create_order(self.other)
+        response = self.client.get('/order_items/')
+        self.assertEqual({row['order'] for row in response.data['results']}, {own.id})
+        foreign_item = foreign.order_item_set.first()
+        self.assertEqual(self.client.get(f'/order_items/{foreign_item.id}/').status_code, 404)
+        response = self.client.post('/order_items/', {'order': foreign.id, 'order_type': 'component',
+                                                       'component_id': self.cpu.id, 'quantity': 1})
+        self.assertEqual(response.status_code, 400)
+
+
+class FastListTests(TestCase):
+    """ The values()-based list path must render exactly what the serializers render. """
+
+    def setUp(self):
+        throttling.clear()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create(username='customer')
+        cpu = create_component(name='Ryzen', price='199.90', currency='USD')
+        pc = Pc.objects.create(name='Gaming', description='Description', is_customized=True)
+        Pc_Components.objects.create(pc=pc, component=cpu)
+        Pc_Components.objects.create(pc=pc, component=create_component(name='RTX', price='500'))
+        Pc.objects.create(name='Empty', description='Description', is_customized=False)
+        Order.objects.create(user=self.user, total_price=12.5, status='pending', payment_method='card',
+                             payment_status='pending', currency='GBP')
+
+    def assertSameOutput(self, viewset, url):
+        pc_cache.clear()
+        request = self.factory.get(url)
+        force_authenticate(request, self.user)
+        fast = viewset.as_view({'get': 'list'})(request).render()
+        viewset.fast_list = False
+        try:
+            pc_cache.clear()
+            request = self.factory.get(url)
+            force_authenticate(request, self.user)
+            slow = viewset.as_view({'get': 'list'})(request).render()
+        finally:
+            viewset.fast_list = True
+        self.assertEqual(fast.content, slow.content)
+        self.assertTrue(fast.data['results'])
+
+    def test_components(self):
+        self.assertSameOutput(ComponentViewSet, '/components/?ordering=-price')
+
+    def test_pcs(self):
+        self.assertSameOutput(PcViewSet, '/pcs/')
+
+    def test_orders(self):
+        self.assertSameOutput(OrderViewSet, '/orders/')
+
+    def test_fieldsets(self):
+        self.assertSameOutput(ComponentViewSet, '/components/?fields=name,price&ordering=-price')
+        self.assertSameOutput(PcViewSet, '/pcs/?fields=components,name')
+
+    def test_renderer_matches_stock_renderer(self):
+        data = {'price': Decimal('1.50'), 'at': datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc), 'name': 'Ü'}
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+
+def decline(order):
+    raise payments.PaymentDeclined()
+
+
+def provider_down(order):
+    raise ConnectionError('provider unavailable')
+
+
+@override_settings(JOB_MAX_ATTEMPTS=2, JOB_RETRY_BASE_SECONDS=60)
+class OrderPaymentTests(TestCase):
+    def setUp(self):
+        throttling.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='customer')
+        self.client.force_authenticate(self.user)
+        null_handler = logging.NullHandler()
+        queue.logger.addHandler(null_handler)
+        self.addCleanup(queue.logger.removeHandler, null_handler)
+
+    def create_order(self):
+        response = self.client.post('/orders/', {
+            'total_price': 10, 'payment_method': 'card', 'status': 'delivered', 'payment_status': 'paid',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Order.objects.get(id=response.data['id'])
+
+    def run_jobs(self):
+        queue.Worker().work(burst=True)
+
+    def test_creation_enqueues_payment_and_ignores_client_status(self):
+        order = self.create_order()
+        self.assertEqual((order.status, order.payment_status), ('pending', 'pending'))
+        self.assertEqual(Job.objects.get().payload, {'order_id': order.id})
+        self.run_jobs()
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.payment_status), ('paid', 'paid'))
+        self.assertFalse(Job.objects.exists())
+
+    def test_total_and_payment_terms_are_not_client_writable(self):
+        part = create_component(name='Dollar part', price='30.00', currency='USD')
+        order = self.client.post('/orders/checkout/', {
+            'payment_method': 'card', 'items': [{'order_type': 'component', 'component_id': part.id, 'quantity': 2}],
+        }, format='json').data['id']
+        set_rates(USD='2')
+        self.addCleanup(rates.invalidate)
+        rates.invalidate()
+        response = self.client.patch(f'/orders/{order}/', {'total_price': 0.01, 'currency': 'USD'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        # Repriced in the new currency, the client's total is ignored
+        self.assertEqual(Order.objects.get(id=order).total_price, 60.0)
+
+        self.run_jobs()
+        for data in ({'currency': 'EUR'}, {'payment_method': 'invoice'}):
+            response = self.client.patch(f'/orders/{order}/', data, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("'paid'", str(response.data))
+        self.assertEqual(self.client.patch(f'/orders/{order}/', {'total_price': 0.01}, format='json').status_code, 200)
+        order = Order.objects.get(id=order)
+        self.assertEqual((order.total_price, order.currency, order.payment_method), (60.0, 'USD', 'card'))
+
+    def test_checkout_enqueues_payment(self):
+        response = self.client.post('/orders/checkout/', {
+            'payment_method': 'card', 'items': [{'order_type': 'component', 'component_id': create_component().id, 'quantity': 1}],
+        }, format='json')
+        self.assertEqual(response.data['status'], 'pending')
+        self.run_jobs()
+        self.assertEqual(Order.objects.get().status, 'paid')
+
+    @override_settings(PAYMENT_CAPTURE='orders.tests.decline')
+    def test_declined_payment_can_be_retried(self):
+        order = self.create_order()
+        self.run_jobs()
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.payment_status), ('payment_failed', 'failed'))
+
+        with override_settings(PAYMENT_CAPTURE='orders.payments.accept_all'):
+            response = self.client.post(f'/orders/{order.id}/transition/', {'status': 'processing'})
+            self.assertEqual(response.data['status'], 'processing')
+            self.run_jobs()
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'paid')
+
+    @override_settings(PAYMENT_CAPTURE='orders.tests.provider_down')
+    def test_payment_fails_after_the_last_attempt(self):
+        order = self.create_order()
+        self.run_jobs()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'processing')
+
+        Job.objects.update(run_at=datetime.now(timezone.utc))
+        self.run_jobs()
+        order.refresh_from_db()
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+        self.assertEqual(order.status, 'payment_failed')
+
+    def test_transitions(self):
+        order = self.create_order()
+        self.assertEqual(self.client.post(f'/orders/{order.id}/transition/', {'status': 'shipped'}).status_code, 403)
+        # The payment job is already queued; a second one could capture twice
+        response = self.client.post(f'/orders/{order.id}/transition/', {'status': 'processing'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("from 'pending' to 'processing'", str(response.data['status']))
+        self.assertEqual(Job.objects.count(), 1)
+        self.run_jobs()
+        response = self.client.post(f'/orders/{order.id}/transition/', {'status': 'cancelled'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("from 'paid' to 'cancelled'", str(response.data['status']))
+
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create(username='admin', is_superuser=True))
+        self.assertEqual(admin.post(f'/orders/{order.id}/transition/', {'status': 'shipped'}).data['status'], 'shipped')
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'shipped')
+
+    def test_concurrent_transition_loses(self):
+        order = self.create_order()
+        stale = Order.objects.get(id=order.id)
+        states.transition(order, states.CANCELLED)
+        with self.assertRaises(states.InvalidTransition):
+            states.transition(stale, states.PROCESSING)
+        # The cancelled order's payment job leaves it alone
+        self.run_jobs()
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'cancelled')
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        throttling.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='customer')
+        self.client.force_authenticate(self.user)
+        self.cpu = create_component(name='Ryzen', stock=2)
+        self.gpu = create_component(name='RTX', type='GPU', stock=3)
+        self.pc = Pc.objects.create(name='Gaming', description='Description', is_customized=False)
+        Pc_Components.objects.create(pc=self.pc, component=self.cpu)
+        Pc_Components.objects.create(pc=self.pc, component=self.gpu)
+
+    def checkout(self, *items):
+        return self.client.post('/orders/checkout/', {'payment_method': 'card', 'items': list(items)}, format='json')
+
+    def stocks(self):
+        availability = stock.component_availability([self.cpu.id, self.gpu.id])
+        return availability[self.cpu.id], availability[self.gpu.id]
+
+    def run_jobs(self):
+        queue.Worker().work(burst=True)
+
+    def test_checkout_reserves_stock(self):
+        response = self.checkout({'order_type': 'pc', 'pc_id': self.pc.id, 'quantity': 1},
+                                 {'order_type': 'component', 'component_id': self.gpu.id, 'quantity': 1})
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.stocks(), (1, 1))
+        self.assertEqual(sorted(Stock_Reservation.objects.values_list('component_id', 'quantity')),
+                         [(self.cpu.id, 1), (self.gpu.id, 2)])
+        self.assertTrue(Job.objects.filter(name=reservations.RELEASE_EXPIRED).exists())
+
+        response = self.checkout({'order_type': 'component', 'component_id': self.gpu.id, 'quantity': 2})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(self.gpu.id), str(response.data['items']))
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(self.stocks(), (1, 1))
+
+    def test_payment_consumes_and_cancellation_releases(self):
+        paid = self.checkout({'order_type': 'component', 'component_id': self.gpu.id, 'quantity': 1}).data['id']
+        cancelled = self.checkout({'order_type': 'pc', 'pc_id': self.pc.id, 'quantity': 2}).data['id']
+        self.assertEqual(self.stocks(), (0, 0))
+        response = self.client.post(f'/orders/{cancelled}/transition/', {'status': 'cancelled'})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.stocks(), (2, 2))
+        self.run_jobs()
+        self.assertEqual(Order.objects.get(id=paid).status, 'paid')
+        self.assertFalse(Stock_Reservation.objects.exists())
+        self.assertEqual(self.stocks(), (2, 2))
+
+    def test_items_of_paid_orders_cannot_change(self):
+        order = self.checkout({'order_type': 'component', 'component_id': self.gpu.id, 'quantity': 1}).data['id']
+        self.run_jobs()
+        item = Order_Item.objects.get(order_id=order)
+        response = self.client.post('/order_items/', {
+            'order': order, 'order_type': 'component', 'component_id': self.gpu.id, 'quantity': 1,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("'paid'", str(response.data['order']))
+        self.assertEqual(self.client.delete(f'/order_items/{item.id}/').status_code, 400)
+        self.assertEqual(self.client.patch(f'/order_items/{item.id}/', {'quantity': 3}).status_code, 400)
+        # No reservation for the sweeper to hand back: the units stay sold
+        self.assertFalse(Stock_Reservation.objects.exists())
+        self.assertEqual(self.stocks(), (2, 2))
+        self.assertEqual(Order_Item.objects.get(id=item.id).quantity, 1)
+
+    def test_expired_reservations_are_swept_and_renewed_by_the_payment(self):
+        order = self.checkout({'order_type': 'pc', 'pc_id': self.pc.id, 'quantity': 2}).data['id']
+        Stock_Reservation.objects.update(expires_at=datetime(2000, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual(reservations.release_expired(), 2)
+        self.assertEqual(self.stocks(), (2, 3))
+        self.assertEqual(reservations.release_expired(), 0)
+        # The units are still there: the payment takes them again
+        self.run_jobs()
+        self.assertEqual(Order.objects.get(id=order).status, 'paid')
+        self.assertEqual(self.stocks(), (0, 1))
+
+    def test_payment_fails_when_expired_units_were_sold(self):
+        order = self.checkout({'order_type': 'component', 'component_id': self.cpu.id, 'quantity': 2}).data['id']
+        Stock_Reservation.objects.update(expires_at=datetime(2000, 1, 1, tzinfo=timezone.utc))
+        reservations.release_expired(order_id=order)
+        stock.take({self.cpu.id: 1})
+        null_handler = logging.NullHandler()
+        queue.logger.addHandler(null_handler)
+        self.addCleanup(queue.logger.removeHandler, null_handler)
+        self.run_jobs()
+        self.assertEqual(Order.objects.get(id=order).status, 'payment_failed')
+        self.assertEqual(self.stocks(), (1, 3))
+
+    def test_added_item_reserves(self):
+        order = Order.objects.create(user=self.user, total_price=0, payment_method='card')
+        response = self.client.post('/order_items/', {'order': order.id, 'order_type': 'pc', 'pc_id': self.pc.id, 'quantity': 3})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order_Item.objects.exists())
+        response = self.client.post('/order_items/', {'order': order.id, 'order_type': 'pc', 'pc_id': self.pc.id, 'quantity': 2})
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.stocks(), (0, 1))
+
+    def test_item_changes_reprice_the_order(self):
+        first = Order.objects.create(user=self.user, total_price=0, payment_method='card')
+        second = Order.objects.create(user=self.user, total_price=0, payment_method='card')
+        response = self.client.post('/order_items/', {
+            'order': first.id, 'order_type': 'component', 'component_id': self.gpu.id, 'quantity': 2,
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Order.objects.get(id=first.id).total_price, 2 * float(self.gpu.price))
+        item = response.data['id']
+        self.assertEqual(self.client.patch(f'/order_items/{item}/', {'quantity': 1}).status_code, 200)
+        self.assertEqual(Order.objects.get(id=first.id).total_price, float(self.gpu.price))
+        # Moved to another order: both are repriced
+        self.assertEqual(self.client.patch(f'/order_items/{item}/', {'order': second.id}).status_code, 200)
+        self.assertEqual([Order.objects.get(id=order.id).total_price for order in (first, second)], [0, float(self.gpu.price)])
+        self.assertEqual(self.client.delete(f'/order_items/{item}/').status_code, 204)
+        self.assertEqual(Order.objects.get(id=second.id).total_price, 0)
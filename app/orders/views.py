@@ -1,18 +1,119 @@
-from rest_framework import viewsets
-from .models import Order, Order_Item
-from .serializers import OrderSerializer, Order_ItemSerializer
+from django.db import transaction
+from django.db.models import Count, F, Prefetch, Sum
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from app.app.fast_list import FastListMixin
+from app.app.fieldsets import FieldsetViewMixin
+from app.app.throttling import TokenBucketThrottle
+from currencies import rates
+from currencies.views import CurrencyConversionMixin
+from pc_components import stock
+from . import pricing, reservations, states
+from .jobs import enqueue_payment
+from .models import Order, Order_Item
 from .permissions import IsOrderOwner, IsOrder_Item_Owner
+from .serializers import (
+    CheckoutSerializer, OrderHistorySerializer, OrderSerializer, OrderTransitionSerializer, Order_ItemSerializer,
+)
+
 
+def order_history_queryset(user_id):
+    """
+    Orders of one user annotated with item count and quantity, plus one prefetch of their
+    items annotated with the line total at the unit price they were ordered at (see
+    orders/pricing.py). Two queries regardless of history size.
+    """
+    items = (
+        Order_Item.objects.select_related('pc', 'component')
+        .only('id', 'order_id', 'order_type', 'quantity', 'unit_price', 'currency', 'pc__name', 'component__name')
+        .annotate(line_total=F('unit_price') * F('quantity'))
+        .order_by('id')
+    )
+    return (
+        Order.objects.filter(user_id=user_id)
+        .annotate(item_count=Count('order_item'), total_quantity=Sum('order_item__quantity'))
+        .prefetch_related(Prefetch('order_item_set', queryset=items, to_attr='history_items'))
+    )
 
-class OrderViewSet(viewsets.ModelViewSet):
+
+class OrderViewSet(CurrencyConversionMixin, FieldsetViewMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated, IsOrderOwner]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'orders'
     ordering = ['created_at']
+    converted_fields = {'total_price': 'currency'}
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        # The payment is captured by a worker; the response returns the order as pending
+        with transaction.atomic():
+            # request.user is built from token claims, only its id is known without a query.
+            # The order has no items yet; they reprice it as they are added
+            order = serializer.save(
+                user_id=self.request.user.id, status=states.PENDING, payment_status='pending', total_price=0,
+            )
+            enqueue_payment(order)
+
+    def perform_update(self, serializer):
+        # What the payment is made with can't change once it began
+        with transaction.atomic():
+            order = serializer.instance
+            status = Order.objects.select_for_update().filter(id=order.id).values_list('status', flat=True).get()
+            changed = [
+                field for field in ('currency', 'payment_method')
+                if field in serializer.validated_data and serializer.validated_data[field] != getattr(order, field)
+            ]
+            if changed and status not in states.EDITABLE:
+                raise ValidationError({field: f"The {field} of a '{status}' order cannot be changed." for field in changed})
+            order = serializer.save()
+            if 'currency' in changed:
+                pricing.reprice(order)
+
+    @action(detail=False, methods=['post'], serializer_class=CheckoutSerializer)
+    def checkout(self, request):
+        """ Create an order with all its items in one request and one transaction. """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user_id=request.user.id)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], serializer_class=OrderTransitionSerializer)
+    def transition(self, request, pk=None):
+        """ Cancel an unpaid order or retry its failed payment; admins also ship and deliver. """
+        order = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target = serializer.validated_data['status']
+        allowed = states.ADMIN_TARGETS if request.user.is_superuser else states.CUSTOMER_TARGETS
+        if target not in allowed:
+            raise PermissionDenied(f"Orders cannot be set to '{target}' by you.")
+        try:
+            with transaction.atomic():
+                states.transition(order, target, states.REQUEST_TRANSITIONS.get(target))
+                if target == states.PROCESSING:
+                    enqueue_payment(order)
+                elif target == states.CANCELLED:
+                    reservations.release_order(order)
+        except states.InvalidTransition as error:
+            raise ValidationError({'status': str(error)})
+        return Response(OrderSerializer(order).data)
+
+    @action(detail=False, methods=['get'], serializer_class=OrderHistorySerializer)
+    def history(self, request):
+        """ The requester's orders, newest first, with item summaries and line totals. """
+        queryset = order_history_queryset(request.user.id).order_by('-created_at', '-id')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        currency = self.get_currency()
+        if currency is not None:
+            items = [item for order in response.data['results'] for item in order.get('items', ())]
+            rates.convert_rows(items, currency, ['unit_price', 'line_total'], 'currency')
+        return self.convert_response(response)
 
     def get_queryset(self):
         if self.request.user.is_superuser:
@@ -21,8 +122,59 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Order.objects.filter(user_id=self.request.user.id)
 
 
-class Order_ItemViewSet(viewsets.ModelViewSet):
+class Order_ItemViewSet(FieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Order_Item.objects.all()
     serializer_class = Order_ItemSerializer
     permission_classes = [IsAuthenticated, IsOrder_Item_Owner]
-    ordering = ['id']
\ No newline at end of file
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'orders'
+    ordering = ['id']
+
+    def lock_editable_order(self, order_id):
+        """ Locks the order for the rest of the transaction; its items can't change once its payment began. """
+        order = Order.objects.select_for_update().only('id', 'status', 'currency').filter(id=order_id).first()
+        if order is not None and order.status not in states.EDITABLE:
+            raise ValidationError({'order': f"The items of a '{order.status}' order cannot be changed."})
+        return order
+
+    def reprice(self, *orders):
+        """ Recomputes the totals of the locked orders whose items changed (orders/pricing.py). """
+        for order in orders:
+            try:
+                pricing.reprice(order)
+            except rates.UnknownCurrency:
+                raise ValidationError({'order': f"No exchange rate for '{order.currency}'."})
+
+    def perform_create(self, serializer):
+        # An item added to an order reserves its stock like checkout does
+        with transaction.atomic():
+            order = self.lock_editable_order(serializer.validated_data['order'].id)
+            item = serializer.save()
+            pcs = {item.pc_id: item.quantity} if item.order_type == 'pc' else {}
+            components = {item.component_id: item.quantity} if item.order_type == 'component' else {}
+            try:
+                reservations.reserve(item.order, stock.requirements(components, pcs))
+            except stock.OutOfStock as error:
+                raise ValidationError({'quantity': str(error)})
+            self.reprice(order)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            orders = [self.lock_editable_order(serializer.instance.order_id)]
+            if 'order' in serializer.validated_data and serializer.validated_data['order'].id != orders[0].id:
+                # A moved item changes the totals of both orders
+                orders.append(self.lock_editable_order(serializer.validated_data['order'].id))
+            serializer.save()
+            self.reprice(*orders)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            order = self.lock_editable_order(instance.order_id)
+            instance.delete()
+            self.reprice(order)
+
+    def get_queryset(self):
+        if self.request.user.is_superuser:
+            return Order_Item.objects.all()
+        else:
+            return Order_Item.objects.filter(order__user_id=self.request.user.id)
\ No newline at end of file
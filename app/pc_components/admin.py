@@ -1,10 +1,10 @@
 from django.contrib import admin
-from .models import Component, Pc, Pc_Components
+from .models import Component, Component_Attributes, Pc, Pc_Components
 
 
 @admin.register(Component)
 class ComponentAdmin(admin.ModelAdmin):
-    list_display = ('id','name', 'type', 'manufacturer', 'price')
+    list_display = ('id','name', 'type', 'manufacturer', 'price', 'stock')
     search_fields = ('name', 'type', 'manufacturer')
     list_filter = ('type', 'manufacturer')
 
@@ -19,4 +19,11 @@ class PcAdmin(admin.ModelAdmin):
 @admin.register(Pc_Components)
 class PcComponentsAdmin(admin.ModelAdmin):
     list_display = ('pc', 'component')
-    list_filter = ('pc', 'component')
\ No newline at end of file
+    list_filter = ('pc', 'component')
+
+
+@admin.register(Component_Attributes)
+class ComponentAttributesAdmin(admin.ModelAdmin):
+    list_display = ('component', 'socket', 'memory_type', 'form_factor', 'wattage')
+    list_filter = ('socket', 'memory_type', 'form_factor')
+    readonly_fields = ('component', 'socket', 'memory_type', 'form_factor', 'wattage')
@@ -1,7 +1,9 @@
 from django.apps import AppConfig
 
-print("pre app pc components")
+
 class PcComponentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pc_components'
-print("post app pc components")
\ No newline at end of file
+
+    def ready(self):
+        from . import signals  # noqa: F401
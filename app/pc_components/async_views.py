@@ -0,0 +1,121 @@
+"""
+Async read endpoints for the catalog: /async/components/ and /async/pcs/, list and detail.
+
+They answer like the GET endpoints of ComponentViewSet and PcViewSet, whose filters,
+ordering, keyset pagination, ?currency= conversion and ValuesReader they reuse, and share
+the catalog cache's versioning. The difference is that they are coroutines: served over
+ASGI (app/asgi.py), a worker keeps accepting requests while others wait on the database,
+because every query goes through the async ORM instead of blocking the worker.
+
+Only the queries of the rows run on the event loop. The catalog cache (which may be the
+file backend) and everything that may load the exchange rates (validating ?currency=,
+building the converted filters and ordering, converting the rows) are blocking calls, run
+through `sync_to_async`.
+
+`?fields=` works as on the sync viewsets, while `?expand=`, search, the other actions and
+all writes stay on them.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.request import Request
+
+from app.app.renderers import FastJSONRenderer
+from currencies.views import parse_currency
+from . import cache
+from .views import ComponentViewSet, PcViewSet
+
+renderer = FastJSONRenderer()
+
+
+def json_response(data, status=200, headers=None):
+    return HttpResponse(renderer.render(data), status=status, content_type='application/json', headers=headers)
+
+
+def error_data(error):
+    """ The body DRF's exception handler would send for `error`. """
+    if isinstance(error.detail, (list, dict)):
+        return error.detail
+    return {'detail': error.detail}
+
+
+class AsyncCatalogView(View):
+    """ GET of `viewset_class`: the list without `pk`, the detail with it. """
+    viewset_class = None
+    http_method_names = ['get', 'head', 'options']
+
+    async def get(self, request, pk=None):
+        request = Request(request)
+        try:
+            key, data = await sync_to_async(self.cached)(request)
+            if data is not None:
+                return json_response(data, headers={'X-Cache': 'HIT'})
+            if pk is None:
+                data = await self.list(request)
+            else:
+                data = await self.retrieve(request, pk)
+        except APIException as error:
+            return json_response(error_data(error), status=error.status_code)
+        await sync_to_async(cache.store)(key, data)
+        return json_response(data, headers={'X-Cache': 'MISS'})
+
+    def cached(self, request):
+        """ The cache key of the request and its cached data, None on a miss. """
+        # An unknown ?currency= is refused before the lookup, as on the sync viewsets
+        parse_currency(request)
+        key = cache.make_key(request, cache.get_version())
+        return key, cache.lookup(key)
+
+    def get_viewset(self, request, action):
+        return self.viewset_class(request=request, format_kwarg=None, action=action, args=(), kwargs={})
+
+    def get_values_reader(self, viewset):
+        reader = viewset.get_values_reader()
+        if not reader.supported():
+            # Nested rows need the serializers of the sync viewsets
+            raise ValidationError({'expand': 'Not available on the async endpoints.'})
+        return reader
+
+    def prepare(self, request, action):
+        """ The viewset, its ValuesReader and its filtered `.values()` queryset, not evaluated yet. """
+        viewset = self.get_viewset(request, action)
+        reader = self.get_values_reader(viewset)
+        if action == 'list':
+            return viewset, reader, viewset.get_values_queryset()
+        return viewset, reader, reader.values(viewset.get_queryset())
+
+    def convert(self, viewset, rows):
+        currency = viewset.get_currency()
+        if currency is not None:
+            viewset.convert_rows(rows, currency)
+
+    async def list(self, request):
+        viewset, reader, values = await sync_to_async(self.prepare)(request, 'list')
+        paginator = viewset.paginator
+        page = None if paginator is None else await paginator.apaginate_queryset(values, request, view=viewset)
+        if page is None:
+            rows = await reader.arows([value async for value in values])
+            data = rows
+        else:
+            rows = await reader.arows(page)
+            data = paginator.get_paginated_response(rows).data
+        await sync_to_async(self.convert)(viewset, rows)
+        return data
+
+    async def retrieve(self, request, pk):
+        viewset, reader, values = await sync_to_async(self.prepare)(request, 'retrieve')
+        value = await values.filter(pk=pk).afirst()
+        if value is None:
+            raise NotFound()
+        rows = await reader.arows([value])
+        await sync_to_async(self.convert)(viewset, rows)
+        return rows[0]
+
+
+class AsyncComponentView(AsyncCatalogView):
+    viewset_class = ComponentViewSet
+
+
+class AsyncPcView(AsyncCatalogView):
+    viewset_class = PcViewSet
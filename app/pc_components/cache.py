@@ -0,0 +1,197 @@
+"""
+Versioned read-through cache for the public catalog endpoints.
+
+Cached entries are keyed by host, path, normalized query params and the current catalog
+version. Any write to Component, Pc or Pc_Components bumps the version (see signals.py),
+which makes every older entry unreachable; those entries then age out of the bounded LRU.
+
+The cache lives in the `catalog` cache alias. The local-memory backend is per process,
+so with several gunicorn workers use the file backend (CATALOG_CACHE_BACKEND) to share
+entries and the version counter between them.
+
+The in-process search and compatibility indexes follow the version as well: the writes of
+this process reach them through the signals, a version bumped by another process makes
+them rebuild (see `bumped_elsewhere`).
+
+With read replicas, responses built in the first REPLICA_LAG_SECONDS after a bump aren't
+stored, since a replica that hasn't caught up could have served them.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from app.app import routers
+
+VERSION_KEY = 'catalog:version'
+HITS_KEY = 'catalog:hits'
+MISSES_KEY = 'catalog:misses'
+BUMPED_AT_KEY = 'catalog:bumped_at'
+
+# The versions this process bumped the counter to, newest last
+_own_versions = deque(maxlen=1000)
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'catalog')]
+
+
+def _incr(key, initial=1):
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key missing (first use or evicted); add() keeps a concurrent initializer's value
+        if cache.add(key, initial, timeout=None):
+            return initial
+        return cache.incr(key)
+
+
+def _initial_version():
+    # If the counter itself gets culled, restart above any version handed out before
+    return time.time_ns() // 1000
+
+
+def get_version():
+    version = get_cache().get(VERSION_KEY)
+    if version is None:
+        get_cache().add(VERSION_KEY, _initial_version(), timeout=None)
+        version = get_cache().get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """ Invalidate all cached catalog responses. """
+    _own_versions.append(_incr(VERSION_KEY, initial=_initial_version()))
+    if routers.replicas():
+        get_cache().set(BUMPED_AT_KEY, time.time(), timeout=None)
+
+
+def bump_version_on_write():
+    # Bump now so this transaction doesn't read its own stale entries, and again on commit
+    # so a reader that cached pre-commit data under the new version is invalidated too.
+    bump_version()
+    transaction.on_commit(bump_version)
+
+
+def bumped_elsewhere(since, version):
+    """
+    Whether a version between `since` (exclusive) and `version` was bumped by another
+    process, or can't be told apart from one. Bumps add one, so each version in between
+    is checked against the ones this process bumped to.
+    """
+    if since == version:
+        return False
+    if since is None or not since < version <= since + len(_own_versions):
+        return True
+    own = set(_own_versions)
+    return any(step not in own for step in range(since + 1, version + 1))
+
+
+class KeyLRU:
+    """ Bounded LRU over the keys this process has written; evicted keys are deleted from the cache. """
+
+    def __init__(self):
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def touch(self, key):
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+
+    def add(self, key, max_entries):
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            evicted = []
+            while len(self._keys) > max_entries:
+                evicted.append(self._keys.popitem(last=False)[0])
+        if evicted:
+            get_cache().delete_many(evicted)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+
+lru = KeyLRU()
+
+
+def make_key(request, version):
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    raw = f'{request.get_host()}|{request.path}|{params}'
+    return f'catalog:{version}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def lookup(key):
+    """ Cached data under `key` or None, counted as a hit or a miss. """
+    data = get_cache().get(key)
+    if data is not None:
+        lru.touch(key)
+        _incr(HITS_KEY)
+    else:
+        _incr(MISSES_KEY)
+    return data
+
+
+def store(key, data):
+    if routers.replicas() and time.time() - get_cache().get(BUMPED_AT_KEY, 0) < settings.REPLICA_LAG_SECONDS:
+        return
+    get_cache().set(key, data, timeout=getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600))
+    lru.add(key, getattr(settings, 'CATALOG_CACHE_MAX_ENTRIES', 1000))
+
+
+def cached_response(request, build_response):
+    """
+    Return the cached response data for this request, or call `build_response` and cache
+    its data when it is a successful response. Responses carry an `X-Cache` HIT/MISS header.
+    """
+    key = make_key(request, get_version())
+    data = lookup(key)
+    if data is not None:
+        return Response(data, headers={'X-Cache': 'HIT'})
+
+    response = build_response()
+    if response.status_code == 200:
+        store(key, response.data)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def get_stats():
+    hits = get_cache().get(HITS_KEY, 0)
+    misses = get_cache().get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'version': get_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+        'entries': len(lru),
+        'max_entries': getattr(settings, 'CATALOG_CACHE_MAX_ENTRIES', 1000),
+    }
+
+
+def clear():
+    get_cache().clear()
+    lru.clear()
+
+
+class CatalogCacheMixin:
+    """ Serve `list` and `retrieve` of a read-heavy viewset through the catalog cache. """
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(request, lambda: super(CatalogCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(request, lambda: super(CatalogCacheMixin, self).retrieve(request, *args, **kwargs))
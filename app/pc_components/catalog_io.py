@@ -0,0 +1,288 @@
+"""
+Streaming CSV / JSON Lines import and export of the catalog tables.
+
+Export walks the table with `.iterator(chunk_size=...)` and yields encoded lines, so the
+output can be fed straight into a StreamingHttpResponse or a file with flat memory.
+Import upserts by `id`: on PostgreSQL the rows are streamed through COPY into a temporary
+table and merged with one INSERT ... ON CONFLICT; elsewhere they are written in batches
+with `bulk_create(update_conflicts=True)`. Rows either all carry an `id` or none do.
+Neither runs model validation, so every value is checked against its field (choices,
+lengths, digits, validators) while the rows stream through; an import with rejected rows
+is rolled back and reports them by row number.
+"""
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import TextField
+
+from . import cache, compatibility, pricing, search
+from .models import Component, Pc, Pc_Components
+
+FORMATS = ('csv', 'jsonl')
+DEFAULT_BATCH_SIZE = 5000
+# Rejected rows listed in the error, the others are counted
+MAX_REPORTED_ERRORS = 20
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ('true', '1', 't'):
+        return True
+    if str(value).lower() in ('false', '0', 'f'):
+        return False
+    raise ValueError(f"invalid boolean '{value}'")
+
+
+def parse_decimal(value):
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"invalid decimal '{value}'")
+
+
+# kind -> (model, {column: parser}); `id` is optional on import
+TABLES = {
+    'components': (Component, {
+        'id': int,
+        'name': str,
+        'type': str,
+        'manufacturer': str,
+        'price': parse_decimal,
+        'currency': str,
+        'description': str,
+        'technical_details': str,
+    }),
+    'pcs': (Pc, {
+        'id': int,
+        'name': str,
+        'description': str,
+        'is_customized': parse_bool,
+    }),
+    'pc_components': (Pc_Components, {
+        'id': int,
+        'pc_id': int,
+        'component_id': int,
+    }),
+}
+
+
+class CatalogImportError(Exception):
+    pass
+
+
+def get_table(kind):
+    try:
+        return TABLES[kind]
+    except KeyError:
+        raise CatalogImportError(f"Unknown catalog table '{kind}', expected one of {', '.join(TABLES)}.")
+
+
+def _json_value(value):
+    return str(value) if isinstance(value, Decimal) else value
+
+
+def export_lines(kind, file_format, chunk_size=2000):
+    """ Yield the table as encoded CSV (with header) or JSON Lines, one row per chunk. """
+    model, columns = get_table(kind)
+    columns = list(columns)
+    rows = model.objects.order_by('id').values_list(*columns).iterator(chunk_size=chunk_size)
+
+    if file_format == 'jsonl':
+        for row in rows:
+            yield json.dumps(dict(zip(columns, map(_json_value, row)))) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.getvalue():
+        yield buffer.getvalue()
+
+
+def read_rows(stream, file_format):
+    """ Parse a text stream into row dicts. """
+    if file_format == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as error:
+                    raise CatalogImportError(f'Line {line_number}: {error}')
+    else:
+        yield from csv.DictReader(stream)
+
+
+def _validate(field, value):
+    """ Field.clean() without a model instance; texts may be empty, as exported rows hold them. """
+    if isinstance(field, TextField) and value == '':
+        return value
+    return field.clean(value, None)
+
+
+def _clean(rows, model, columns, errors):
+    """
+    Convert and validate rows; yields lists of values ordered like `columns` for the valid
+    ones and appends a message for each rejected one to `errors`.
+    """
+    # Relations are left to the foreign key constraints, a lookup per row would be too slow
+    fields = {column: model._meta.get_field(column) for column in columns}
+    for line_number, row in enumerate(rows, start=1):
+        unknown = set(row) - set(columns)
+        if unknown:
+            raise CatalogImportError(f"Row {line_number}: unknown columns {', '.join(sorted(unknown))}")
+        values = []
+        for column, parser in columns.items():
+            value = row.get(column)
+            if column == 'id' and value in (None, ''):
+                values.append(None)
+                continue
+            if value is None:
+                raise CatalogImportError(f"Row {line_number}: missing value for '{column}'")
+            try:
+                value = parser(value)
+                if not fields[column].is_relation:
+                    value = _validate(fields[column], value)
+            except ValueError as error:
+                errors.append(f"Row {line_number}: '{column}': {error}")
+                break
+            except ValidationError as error:
+                errors.append(f"Row {line_number}: '{column}': {' '.join(error.messages)}")
+                break
+            values.append(value)
+        else:
+            yield values
+
+
+def _raise_for(errors):
+    if not errors:
+        return
+    message = '\n'.join(errors[:MAX_REPORTED_ERRORS])
+    if len(errors) > MAX_REPORTED_ERRORS:
+        message += f'\n... and {len(errors) - MAX_REPORTED_ERRORS} more rejected rows'
+    raise CatalogImportError(message)
+
+
+def _batches(values, size):
+    batch = []
+    for row in values:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_rows(kind, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """ Upsert `rows` (dicts) into the table, returns the number of rows written. """
+    model, columns = get_table(kind)
+    errors = []
+    values = _clean(rows, model, columns, errors)
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            count = _copy_upsert(model, list(columns), values)
+        else:
+            count = _bulk_upsert(model, list(columns), values, batch_size)
+        # Rejected rows are only known once all were read; rolls the written ones back
+        _raise_for(errors)
+    # Bulk writes bypass the model signals
+    if kind in ('components', 'pc_components'):
+        pricing.rebuild()
+    if kind == 'components':
+        compatibility.rebuild()
+    cache.bump_version_on_write()
+    search.index.invalidate()
+    return count
+
+
+def _bulk_upsert(model, columns, values, batch_size):
+    update_fields = [model._meta.get_field(column).name for column in columns if column != 'id']
+    count = 0
+    for batch in _batches(values, batch_size):
+        objs = [model(**dict(zip(columns, row))) for row in batch]
+        model.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=update_fields,
+        )
+        count += len(objs)
+    return count
+
+
+class _CsvReader(io.TextIOBase):
+    """ File-like view of converted rows as CSV text, consumed by COPY ... FROM STDIN. """
+
+    def __init__(self, values, with_id):
+        self._values = values
+        self._with_id = with_id
+        self._buffer = ''
+        self.count = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        out = io.StringIO()
+        # Quoted empty strings stay empty strings, unquoted ones would be NULL for COPY
+        writer = csv.writer(out, quoting=csv.QUOTE_ALL)
+        while size < 0 or len(self._buffer) + out.tell() < size:
+            row = next(self._values, None)
+            if row is None:
+                break
+            if (row[0] is not None) != self._with_id:
+                raise CatalogImportError('Either all rows or no rows must have an id.')
+            writer.writerow(row if self._with_id else row[1:])
+            self.count += 1
+        data = self._buffer + out.getvalue()
+        if size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+    readline = read
+
+
+def _copy_upsert(model, columns, values):
+    table = connection.ops.quote_name(model._meta.db_table)
+    first = next(values, None)
+    if first is None:
+        return 0
+    with_id = first[0] is not None
+    if not with_id:
+        columns = columns[1:]
+
+    def rows():
+        yield first
+        yield from values
+
+    quoted = ', '.join(connection.ops.quote_name(column) for column in columns)
+    updates = ', '.join(
+        f'{connection.ops.quote_name(column)} = EXCLUDED.{connection.ops.quote_name(column)}'
+        for column in columns if column != 'id'
+    )
+    reader = _CsvReader(rows(), with_id)
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE TEMP TABLE catalog_import (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP')
+        cursor.cursor.copy_expert(f'COPY catalog_import ({quoted}) FROM STDIN WITH (FORMAT csv)', reader)
+        conflict = f'ON CONFLICT (id) DO UPDATE SET {updates}' if with_id else ''
+        cursor.execute(f'INSERT INTO {table} ({quoted}) SELECT {quoted} FROM catalog_import {conflict}')
+        if with_id:
+            # Explicit ids don't advance the serial sequence
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{model._meta.db_table}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+            )
+        cursor.execute('DROP TABLE catalog_import')
+    return reader.count
@@ -0,0 +1,185 @@
+"""
+Component compatibility for the PC configurator.
+
+`extract` parses socket, memory type, form factor and wattage out of the free-text
+`technical_details` once per write; the result is stored in Component_Attributes and held
+in an in-process index so a compatibility check never has to touch the text again. The
+index is built on first use for the current catalog version (pc_components/cache.py).
+The writes of this process update it through the signals; it is rebuilt when another
+process bumped the version, as its writes don't signal here, and after bulk writes.
+
+A candidate of type T is checked against the pc's components of every other type, i.e.
+as if it replaced the pc's current T. Attributes missing on either side never exclude.
+"""
+import re
+import threading
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+
+from app.app.routers import primary
+from . import cache
+from .models import Component, Component_Attributes
+
+CASE_TYPE = 'Case'
+MAINBOARD_TYPE = 'Mainboard'
+PSU_TYPE = 'PSU'
+
+# Smallest to largest; a case takes boards up to its own size
+FORM_FACTORS = ['Mini-ITX', 'Micro-ATX', 'ATX', 'E-ATX']
+
+SOCKET_LABEL_RE = re.compile(r'\bsocket\s*[:=]?\s*([A-Za-z]+[\s-]?\d+[A-Za-z0-9+]*)', re.IGNORECASE)
+SOCKET_RE = re.compile(r'\b(AM[2-5]\+?|FM[12]\+?|LGA[\s-]?\d{3,4}|sTRX?\d|TR4|sWRX\d)\b', re.IGNORECASE)
+MEMORY_RE = re.compile(r'\b((?:LP)?DDR[2-5])\b', re.IGNORECASE)
+FORM_FACTOR_RE = re.compile(r'\b(E-?ATX|Micro[\s-]?ATX|mATX|Mini[\s-]?ITX|ATX)\b', re.IGNORECASE)
+WATTAGE_LABEL_RE = re.compile(r'\b(?:TDP|TBP|TGP|power|wattage)\s*[:=]?\s*(\d{1,4})\s*(?:W|watts?)\b', re.IGNORECASE)
+WATTAGE_RE = re.compile(r'\b(\d{1,4})\s*(?:W|watts?)\b', re.IGNORECASE)
+
+ATTRIBUTES = ('socket', 'memory_type', 'form_factor', 'wattage')
+
+Attributes = namedtuple('Attributes', ('type', *ATTRIBUTES))
+
+
+def _normalize_form_factor(value):
+    value = re.sub(r'[\s-]', '', value).lower()
+    return {'eatx': 'E-ATX', 'microatx': 'Micro-ATX', 'matx': 'Micro-ATX', 'miniitx': 'Mini-ITX'}.get(value, 'ATX')
+
+
+def extract(technical_details):
+    """ {attribute: value or None} parsed from a `technical_details` text. """
+    text = technical_details or ''
+    socket = SOCKET_LABEL_RE.search(text) or SOCKET_RE.search(text)
+    memory = MEMORY_RE.search(text)
+    form_factor = FORM_FACTOR_RE.search(text)
+    wattage = WATTAGE_LABEL_RE.search(text) or WATTAGE_RE.search(text)
+    return {
+        'socket': re.sub(r'[\s-]', '', socket.group(1)).upper() if socket else None,
+        'memory_type': memory.group(1).upper() if memory else None,
+        'form_factor': _normalize_form_factor(form_factor.group(1)) if form_factor else None,
+        'wattage': int(wattage.group(1)) if wattage else None,
+    }
+
+
+class CompatibilityIndex:
+    """ component id -> Attributes, plus the ids of every type. """
+
+    def __init__(self):
+        self._components = {}
+        self._by_type = defaultdict(set)
+        self._lock = threading.Lock()
+        self._built = False
+        self._version = None
+
+    def _add(self, component_id, attributes):
+        self._remove(component_id)
+        self._components[component_id] = attributes
+        self._by_type[attributes.type].add(component_id)
+
+    def _remove(self, component_id):
+        attributes = self._components.pop(component_id, None)
+        if attributes is not None:
+            self._by_type[attributes.type].discard(component_id)
+
+    def build(self, version=None):
+        rows = Component_Attributes.objects.values_list('component_id', 'component__type', *ATTRIBUTES)
+        with self._lock:
+            self._components.clear()
+            self._by_type.clear()
+            for component_id, *values in rows.iterator(chunk_size=2000):
+                self._add(component_id, Attributes(*values))
+            self._built = True
+            self._version = version
+
+    def ensure_built(self):
+        # Read before the rows: a write during the build leaves the index a version behind
+        version = cache.get_version()
+        if not self._built or cache.bumped_elsewhere(self._version, version):
+            # From the primary, a replica may not have the rows of the new version yet
+            with primary():
+                self.build(version)
+        else:
+            self._version = version
+
+    def update(self, component, attributes):
+        if self._built:
+            with self._lock:
+                self._add(component.id, Attributes(component.type, *(attributes[name] for name in ATTRIBUTES)))
+
+    def remove(self, component_id):
+        if self._built:
+            with self._lock:
+                self._remove(component_id)
+
+    def invalidate(self):
+        """ Rebuild on next use, e.g. after bulk writes that bypass signals. """
+        self._built = False
+
+    def compatible(self, component_ids, component_type):
+        """ Ids of the components of `component_type` that fit with the components `component_ids`. """
+        self.ensure_built()
+        with self._lock:
+            others = [self._components[i] for i in component_ids if i in self._components]
+            others = [other for other in others if other.type != component_type]
+            candidates = [(i, self._components[i]) for i in self._by_type.get(component_type, ())]
+
+        sockets = {other.socket for other in others if other.socket}
+        memory_types = {other.memory_type for other in others if other.memory_type}
+        board_sizes = [_size(other.form_factor) for other in others
+                       if other.type == MAINBOARD_TYPE and other.form_factor]
+        case_sizes = [_size(other.form_factor) for other in others if other.type == CASE_TYPE and other.form_factor]
+        capacity = sum(other.wattage or 0 for other in others if other.type == PSU_TYPE)
+        draw = sum(other.wattage or 0 for other in others if other.type != PSU_TYPE)
+
+        def fits(candidate):
+            if candidate.socket and sockets - {candidate.socket}:
+                return False
+            if candidate.memory_type and memory_types - {candidate.memory_type}:
+                return False
+            if candidate.form_factor and candidate.type == CASE_TYPE and board_sizes:
+                if max(board_sizes) > _size(candidate.form_factor):
+                    return False
+            if candidate.form_factor and candidate.type == MAINBOARD_TYPE and case_sizes:
+                if _size(candidate.form_factor) > min(case_sizes):
+                    return False
+            if candidate.type == PSU_TYPE:
+                return not candidate.wattage or candidate.wattage >= draw
+            return not capacity or draw + (candidate.wattage or 0) <= capacity
+
+        return [component_id for component_id, candidate in candidates if fits(candidate)]
+
+
+def _size(form_factor):
+    return FORM_FACTORS.index(form_factor)
+
+
+index = CompatibilityIndex()
+
+
+def sync(component):
+    """ Store the parsed attributes of one component and update the index. """
+    attributes = extract(component.technical_details)
+    Component_Attributes.objects.update_or_create(component_id=component.id, defaults=attributes)
+    index.update(component, attributes)
+
+
+def rebuild(batch_size=2000):
+    """ Re-extract the attributes of every component, e.g. after bulk writes. """
+    count, last_id = 0, 0
+    with transaction.atomic():
+        while True:
+            rows = list(
+                Component.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'technical_details')[:batch_size]
+            )
+            if not rows:
+                break
+            Component_Attributes.objects.bulk_create(
+                [Component_Attributes(component_id=i, **extract(details)) for i, details in rows],
+                update_conflicts=True, unique_fields=['component'], update_fields=list(ATTRIBUTES),
+            )
+            count += len(rows)
+            last_id = rows[-1][0]
+    # Also makes the indexes of the other processes rebuild
+    cache.bump_version_on_write()
+    index.invalidate()
+    return count
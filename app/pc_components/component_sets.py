@@ -0,0 +1,108 @@
+"""
+Batch edits of the component lists of pcs: PUT / PATCH /pcs/components/.
+
+Setting `Pc.components` through the serializer or the admin writes and signals the
+Pc_Components rows of one pc at a time. Here a whole batch of pcs is diffed against their
+current rows and written with a fixed number of statements, whatever the number of pcs:
+a SELECT ... FOR UPDATE of the pcs, one SELECT of their rows, one `bulk_create` of the
+added links and one `DELETE ... WHERE id IN` of the removed ones (per BATCH_SIZE ids,
+within the databases' parameter limits), all in one transaction.
+
+Component lists are multisets: a pc can hold the same component twice (two memory
+modules), so a diff works on counts, and removing one of two equal links keeps the older.
+Pcs whose list doesn't change aren't written.
+
+The bulk writes bypass the model signals, so what signals.py would do per row is done
+once for the batch: the prices of the changed pcs are recomputed with one UPDATE
+(pc_components.pricing) and the catalog cache version is bumped.
+"""
+from collections import Counter, defaultdict
+
+from django.db import connections, router, transaction
+
+from . import cache, pricing
+from .models import Pc, Pc_Components
+
+BATCH_SIZE = 5000
+
+
+def _chunks(ids, size=BATCH_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def existing_ids(model, ids):
+    """ The subset of `ids` that exist in `model`'s table. """
+    found = set()
+    for chunk in _chunks(set(ids)):
+        found.update(model.objects.filter(id__in=chunk).values_list('id', flat=True))
+    return found
+
+
+def replace(component_lists):
+    """ {pc id: component ids}: each pc ends up with exactly these components. """
+    wanted = {pc_id: Counter(component_ids) for pc_id, component_ids in component_lists.items()}
+    return _write(wanted, lambda pc_id, current: wanted[pc_id])
+
+
+def patch(changes):
+    """ {pc id: (component ids to add, component ids to remove)}; removing an absent component is a no-op. """
+    def target(pc_id, current):
+        add, remove = changes[pc_id]
+        return current + Counter(add) - Counter(remove)
+    return _write(changes, target)
+
+
+def _delete_links(link_ids):
+    """
+    One DELETE ... WHERE id IN of Pc_Components rows. QuerySet.delete() would load the rows
+    to send post_delete for each (signals.py listens); nothing cascades from the table.
+    """
+    connection = connections[router.db_for_write(Pc_Components)]
+    table = connection.ops.quote_name(Pc_Components._meta.db_table)
+    column = connection.ops.quote_name(Pc_Components._meta.pk.column)
+    placeholders = ', '.join(['%s'] * len(link_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', link_ids)
+
+
+def _write(pc_ids, target):
+    """
+    Brings the links of each pc to `target(pc id, Counter of its current component ids)`.
+    Returns the number of pcs changed and of links added and removed.
+    """
+    pc_ids = sorted(pc_ids)
+    additions, removals, changed = [], [], []
+    with transaction.atomic():
+        # Locks the pcs so concurrent batches over the same pcs diff one after the other
+        for chunk in _chunks(pc_ids):
+            list(Pc.objects.select_for_update().filter(id__in=chunk).values_list('id', flat=True))
+        links = defaultdict(list)
+        for chunk in _chunks(pc_ids):
+            rows = Pc_Components.objects.filter(pc_id__in=chunk).order_by('id')
+            for link_id, pc_id, component_id in rows.values_list('id', 'pc_id', 'component_id'):
+                links[pc_id].append((link_id, component_id))
+
+        for pc_id in pc_ids:
+            current = Counter(component_id for _, component_id in links[pc_id])
+            wanted = target(pc_id, current)
+            if wanted == current:
+                continue
+            changed.append(pc_id)
+            for component_id, count in (wanted - current).items():
+                additions.extend(Pc_Components(pc_id=pc_id, component_id=component_id) for _ in range(count))
+            surplus = current - wanted
+            for link_id, component_id in reversed(links[pc_id]):
+                if surplus[component_id]:
+                    surplus[component_id] -= 1
+                    removals.append(link_id)
+
+        for chunk in _chunks(removals):
+            _delete_links(chunk)
+        Pc_Components.objects.bulk_create(additions, batch_size=BATCH_SIZE)
+        for chunk in _chunks(changed):
+            pricing.recompute(Pc.objects.filter(id__in=chunk))
+        if changed:
+            cache.bump_version_on_write()
+    return {'pcs': len(changed), 'added': len(additions), 'removed': len(removals)}
@@ -0,0 +1,68 @@
+from decimal import Decimal, InvalidOperation
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+def parse_bool(value):
+    if value.lower() in ('true', '1'):
+        return True
+    if value.lower() in ('false', '0'):
+        return False
+    raise ValueError(value)
+
+
+def parse_decimal(value):
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(value)
+    # NaN and Infinity parse, but no database column compares with them
+    if not number.is_finite():
+        raise ValueError(value)
+    return number
+
+
+# Largest value of the 32-bit integer primary keys; larger ids overflow the database driver
+MAX_ID = 2 ** 31 - 1
+
+
+def parse_ids(value):
+    """ '1,2,3' -> [1, 2, 3] """
+    try:
+        ids = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise ValueError(value)
+    if not all(0 < number <= MAX_ID for number in ids):
+        raise ValueError(value)
+    return ids
+
+
+class QueryParamFilterBackend(BaseFilterBackend):
+    """
+    Filters the queryset from query params declared on the view as
+    `filter_params = {'param': ('lookup', parser)}`, e.g. `'price_min': ('price__gte', parse_decimal)`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        filters = {}
+        for param, (lookup, parser) in getattr(view, 'filter_params', {}).items():
+            value = request.query_params.get(param)
+            if value in (None, ''):
+                continue
+            try:
+                filters[lookup] = parser(value)
+            except ValueError:
+                raise ValidationError({param: f"Invalid value '{value}'."})
+        return queryset.filter(**filters)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': param,
+                'required': False,
+                'in': 'query',
+                'description': f'Filter on `{lookup}`.',
+                'schema': {'type': {parse_bool: 'boolean', parse_decimal: 'number'}.get(parser, 'string')},
+            }
+            for param, (lookup, parser) in getattr(view, 'filter_params', {}).items()
+        ]
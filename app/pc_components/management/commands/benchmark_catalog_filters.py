@@ -0,0 +1,85 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+
+from pc_components import cache
+from pc_components.models import Component
+
+TYPES = ['CPU', 'GPU', 'RAM', 'Mainboard', 'PSU', 'Case', 'SSD', 'HDD', 'Cooler', 'Fan']
+MANUFACTURERS = ['AMD', 'Intel', 'Nvidia', 'ASUS', 'MSI', 'Corsair', 'Samsung', 'Kingston', 'be quiet!', 'Noctua']
+
+QUERIES = {
+    'type': '/components/?type=GPU',
+    'type+price range': '/components/?type=GPU&price_min=200&price_max=400',
+    'manufacturer+type': '/components/?manufacturer=AMD&type=CPU',
+    'type, order by price': '/components/?type=RAM&ordering=-price',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the filtered /components/ queries against growing catalog sizes. '
+        'Runs inside a transaction that is rolled back, so the database is left untouched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help='Comma separated catalog sizes (default: 1000,10000,100000)')
+        parser.add_argument('--repeat', type=int, default=20, help='Requests per query and size')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        client = Client()
+        results = {name: [] for name in QUERIES}
+
+        with transaction.atomic():
+            seeded = 0
+            for size in sizes:
+                self.seed(size - seeded)
+                seeded = size
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                for name, url in QUERIES.items():
+                    results[name].append(self.measure(client, url, options['repeat']))
+            transaction.set_rollback(True)
+
+        header = f"{'query':<24}" + ''.join(f'{size:>12}' for size in sizes)
+        self.stdout.write(header + f"{'growth':>10}")
+        for name, timings in results.items():
+            growth = timings[-1] / timings[0] if timings[0] else 0
+            row = f'{name:<24}' + ''.join(f'{ms:>10.2f}ms' for ms in timings)
+            self.stdout.write(row + f'{growth:>9.1f}x')
+        self.stdout.write(f'catalog growth: {sizes[-1] / sizes[0]:.0f}x (median latency per request)')
+
+    def seed(self, count):
+        rng = random.Random(count)
+        Component.objects.bulk_create(
+            [
+                Component(
+                    name=f'Component {rng.randrange(10 ** 9)}',
+                    type=rng.choice(TYPES),
+                    manufacturer=rng.choice(MANUFACTURERS),
+                    price=Decimal(rng.randrange(1000, 200000)) / 100,
+                    description='Benchmark component',
+                    technical_details='',
+                )
+                for _ in range(count)
+            ],
+            batch_size=5000,
+        )
+
+    def measure(self, client, url, repeat):
+        timings = []
+        for _ in range(repeat):
+            # Measure the database path, not the response cache
+            cache.clear()
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.status_code
+        return statistics.median(timings)
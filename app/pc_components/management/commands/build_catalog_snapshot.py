@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from pc_components import snapshot
+
+
+class Command(BaseCommand):
+    help = 'Build the /catalog/snapshot.json payload of the current catalog version ahead of the first request.'
+
+    def handle(self, *args, **options):
+        built = snapshot.get_snapshot()
+        sizes = ', '.join(f'{encoding} {len(body):,} bytes' for encoding, body in built.bodies.items())
+        self.stdout.write(self.style.SUCCESS(f'Built catalog snapshot {built.etags["identity"]}: {sizes}'))
@@ -0,0 +1,29 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pc_components.catalog_io import FORMATS, TABLES, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Stream a catalog table (components, pcs, pc_components) to CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(TABLES))
+        parser.add_argument('--format', dest='file_format', choices=FORMATS,
+                            help='Output format, inferred from --output if omitted (default: csv)')
+        parser.add_argument('--output', default='-', help="Output file, '-' for stdout")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        output = options['output']
+        file_format = options['file_format'] or ('jsonl' if output.endswith('.jsonl') else 'csv')
+        lines = export_lines(options['kind'], file_format, chunk_size=options['chunk_size'])
+        if output == '-':
+            sys.stdout.writelines(lines)
+            return
+        try:
+            with open(output, 'w', encoding='utf-8', newline='') as file:
+                file.writelines(lines)
+        except OSError as error:
+            raise CommandError(error)
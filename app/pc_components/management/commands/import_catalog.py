@@ -0,0 +1,38 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pc_components.catalog_io import (
+    DEFAULT_BATCH_SIZE, FORMATS, TABLES, CatalogImportError, import_rows, read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Upsert a catalog table (components, pcs, pc_components) from CSV or JSON Lines. '
+        'Uses COPY on PostgreSQL and batched bulk_create elsewhere.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(TABLES))
+        parser.add_argument('path', help="Input file, '-' for stdin")
+        parser.add_argument('--format', dest='file_format', choices=FORMATS,
+                            help='Input format, inferred from the file extension if omitted (default: csv)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['file_format'] or ('jsonl' if path.endswith('.jsonl') else 'csv')
+        start = time.perf_counter()
+        try:
+            if path == '-':
+                count = import_rows(options['kind'], read_rows(sys.stdin, file_format), options['batch_size'])
+            else:
+                with open(path, encoding='utf-8', newline='') as file:
+                    count = import_rows(options['kind'], read_rows(file, file_format), options['batch_size'])
+        except (OSError, CatalogImportError) as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {count} {options['kind']} rows in {time.perf_counter() - start:.1f}s"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from pc_components import cache, pricing
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized price and component count of every pc.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = pricing.rebuild()
+        cache.bump_version_on_write()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt prices of {count} pcs'))
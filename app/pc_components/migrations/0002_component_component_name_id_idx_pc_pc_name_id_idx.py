@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-18 00:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pc_components', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='component',
+            index=models.Index(fields=['name', 'id'], name='component_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pc',
+            index=models.Index(fields=['name', 'id'], name='pc_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-18 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pc_components', '0002_component_component_name_id_idx_pc_pc_name_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='component',
+            index=models.Index(fields=['price', 'id'], name='component_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='component',
+            index=models.Index(fields=['type', 'name', 'id'], name='component_type_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='component',
+            index=models.Index(fields=['type', 'price', 'id'], name='component_type_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='component',
+            index=models.Index(fields=['manufacturer', 'type'], name='component_manuf_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pc',
+            index=models.Index(fields=['is_customized', 'name', 'id'], name='pc_customized_name_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.4 on 2026-10-18 01:02
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Keep weights in sync with pc_components.search.FIELD_WEIGHTS
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('english', coalesce({row}name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}type, '') || ' ' || coalesce({row}manufacturer, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({row}description, '')), 'C') ||
+    setweight(to_tsvector('english', coalesce({row}technical_details, '')), 'D')
+"""
+
+CREATE_SQL = f"""
+CREATE FUNCTION pc_components_component_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW.')};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER pc_components_component_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON pc_components_component
+    FOR EACH ROW EXECUTE FUNCTION pc_components_component_search_vector_update();
+
+UPDATE pc_components_component SET search_vector = {SEARCH_VECTOR_SQL.format(row='')};
+
+CREATE INDEX component_search_vector_idx ON pc_components_component USING gin (search_vector);
+"""
+
+DROP_SQL = """
+DROP INDEX IF EXISTS component_search_vector_idx;
+DROP TRIGGER IF EXISTS pc_components_component_search_vector_trigger ON pc_components_component;
+DROP FUNCTION IF EXISTS pc_components_component_search_vector_update();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SQL)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pc_components', '0003_catalog_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='component',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
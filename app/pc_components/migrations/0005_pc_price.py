@@ -0,0 +1,48 @@
+# Generated by Django 5.1.4 on 2026-10-18 01:12
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_pc_prices(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Pc = apps.get_model('pc_components', 'Pc')
+    Pc_Components = apps.get_model('pc_components', 'Pc_Components')
+    price_field = DecimalField(max_digits=12, decimal_places=2)
+    links = Pc_Components.objects.filter(pc_id=OuterRef('pk')).values('pc_id')
+    price = Subquery(links.annotate(total=Sum('component__price')).values('total'), output_field=price_field)
+    count = Subquery(links.annotate(total=Count('id')).values('total'))
+    Pc.objects.using(db).update(
+        price=Coalesce(price, Value(0), output_field=price_field),
+        component_count=Coalesce(count, Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pc_components', '0004_component_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pc',
+            name='component_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pc',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='pc',
+            index=models.Index(fields=['price', 'id'], name='pc_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pc',
+            index=models.Index(fields=['is_customized', 'price', 'id'], name='pc_customized_price_idx'),
+        ),
+        migrations.RunPython(backfill_pc_prices, migrations.RunPython.noop),
+    ]
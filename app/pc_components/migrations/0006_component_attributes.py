@@ -0,0 +1,43 @@
+# Generated by Django 5.1.4 on 2026-10-18 01:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from pc_components.compatibility import extract
+
+
+def backfill_component_attributes(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Component = apps.get_model('pc_components', 'Component')
+    Component_Attributes = apps.get_model('pc_components', 'Component_Attributes')
+    Component_Attributes.objects.using(db).bulk_create(
+        [
+            Component_Attributes(component_id=component_id, **extract(technical_details))
+            for component_id, technical_details in Component.objects.using(db).values_list('id', 'technical_details').iterator()
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pc_components', '0005_pc_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Component_Attributes',
+            fields=[
+                ('component', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='attributes', serialize=False, to='pc_components.component')),
+                ('socket', models.CharField(blank=True, max_length=20, null=True)),
+                ('memory_type', models.CharField(blank=True, max_length=10, null=True)),
+                ('form_factor', models.CharField(blank=True, max_length=10, null=True)),
+                ('wattage', models.PositiveIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['socket'], name='component_attr_socket_idx'), models.Index(fields=['memory_type'], name='component_attr_memory_idx'), models.Index(fields=['form_factor'], name='component_attr_form_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_component_attributes, migrations.RunPython.noop),
+    ]
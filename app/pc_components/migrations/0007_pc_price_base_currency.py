@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Round
+
+
+def convert_pc_prices(apps, schema_editor):
+    """ Pc.price summed component prices as stored; recompute it in settings.BASE_CURRENCY. """
+    db = schema_editor.connection.alias
+    Pc = apps.get_model('pc_components', 'Pc')
+    Pc_Components = apps.get_model('pc_components', 'Pc_Components')
+    ExchangeRate = apps.get_model('currencies', 'ExchangeRate')
+    rates = dict(ExchangeRate.objects.using(db).values_list('currency', 'rate'))
+    rates[settings.BASE_CURRENCY] = Decimal(1)
+    price_field = DecimalField(max_digits=12, decimal_places=2)
+    factor = Case(
+        *[When(component__currency=code, then=Value((1 / rate).quantize(Decimal('1e-10')))) for code, rate in rates.items()],
+        default=Value(None),
+        output_field=DecimalField(max_digits=20, decimal_places=10),
+    )
+    base_price = Round(ExpressionWrapper(F('component__price') * factor, output_field=price_field), 2)
+    links = Pc_Components.objects.filter(pc_id=OuterRef('pk')).values('pc_id')
+    price = Subquery(links.annotate(total=Round(Sum(base_price), 2, output_field=price_field)).values('total'),
+                     output_field=price_field)
+    Pc.objects.using(db).update(price=Coalesce(price, Value(0), output_field=price_field))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currencies', '0002_initial_rates'),
+        ('pc_components', '0006_component_attributes'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_pc_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pc_components', '0007_pc_price_base_currency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='component',
+            name='stock',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
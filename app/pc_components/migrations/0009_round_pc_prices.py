@@ -0,0 +1,19 @@
+from django.db import migrations
+from django.db.models.functions import Round
+
+
+def round_pc_prices(apps, schema_editor):
+    """ On SQLite the maintained sums could hold floating point residue (0.30000000000000004). """
+    Pc = apps.get_model('pc_components', 'Pc')
+    Pc.objects.using(schema_editor.connection.alias).update(price=Round('price', 2))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pc_components', '0008_component_stock'),
+    ]
+
+    operations = [
+        migrations.RunPython(round_pc_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:26
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pc_components', '0009_round_pc_prices'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='component',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0'))]),
+        ),
+    ]
@@ -1,3 +1,7 @@
+from decimal import Decimal
+
+from django.contrib.postgres.search import SearchVectorField
+from django.core.validators import MinValueValidator
 from django.db import models
 
 class Component(models.Model):
@@ -5,7 +9,7 @@ class Component(models.Model):
     name = models.CharField(max_length=100)
     type = models.CharField(max_length=50)
     manufacturer = models.CharField(max_length=70)
-    price = models.DecimalField(max_digits=10, decimal_places=2)
+    price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0'))])
     currency = models.CharField(max_length=3, choices=[
         ('EUR', 'Euro'),
         ('USD', 'US-Dollar'),
@@ -13,17 +17,85 @@ class Component(models.Model):
     ], default = 'EUR')
     description = models.TextField()
     technical_details = models.TextField()
+    # Maintained by a PostgreSQL trigger (migration 0004), unused on other databases
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Units on hand, None for components whose stock isn't tracked; changed by pc_components.stock only
+    stock = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    INVENTORY_FIELDS = ('stock',)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination over the default `name` ordering
+            models.Index(fields=['name', 'id'], name='component_name_id_idx'),
+            models.Index(fields=['price', 'id'], name='component_price_id_idx'),
+            # Filtering by type/manufacturer, optionally sorted or ranged by price
+            models.Index(fields=['type', 'name', 'id'], name='component_type_name_idx'),
+            models.Index(fields=['type', 'price', 'id'], name='component_type_price_idx'),
+            models.Index(fields=['manufacturer', 'type'], name='component_manuf_type_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Stock is decremented concurrently in SQL; never write back a stale in-memory value
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.INVENTORY_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.name} - ({self.type}) - ({self.manufacturer})"
 
 
+class Component_Attributes(models.Model):
+    """ Compatibility attributes parsed from `Component.technical_details` by pc_components.compatibility. """
+    component = models.OneToOneField(Component, on_delete=models.CASCADE, primary_key=True, related_name='attributes')
+    socket = models.CharField(max_length=20, null=True, blank=True)
+    memory_type = models.CharField(max_length=10, null=True, blank=True)
+    form_factor = models.CharField(max_length=10, null=True, blank=True)
+    # Capacity for power supplies, power draw for everything else
+    wattage = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['socket'], name='component_attr_socket_idx'),
+            models.Index(fields=['memory_type'], name='component_attr_memory_idx'),
+            models.Index(fields=['form_factor'], name='component_attr_form_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.component_id}: {self.socket} / {self.memory_type} / {self.form_factor} / {self.wattage}W"
+
+
 class Pc(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100)
     description = models.TextField()
     is_customized = models.BooleanField()
     components = models.ManyToManyField('Component', through='Pc_Components')
+    # Sum of the component prices in settings.BASE_CURRENCY and number of components, maintained by pc_components.pricing
+    price = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    component_count = models.PositiveIntegerField(default=0, editable=False)
+
+    DERIVED_FIELDS = ('price', 'component_count')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='pc_name_id_idx'),
+            models.Index(fields=['is_customized', 'name', 'id'], name='pc_customized_name_idx'),
+            models.Index(fields=['price', 'id'], name='pc_price_id_idx'),
+            models.Index(fields=['is_customized', 'price', 'id'], name='pc_customized_price_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The derived fields are updated in SQL; never write back a stale in-memory value
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DERIVED_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.name} (Customized: {self.is_customized})"
@@ -0,0 +1,75 @@
+"""
+Denormalized `Pc.price` / `Pc.component_count`.
+
+Both are maintained in SQL: a new Pc_Components row adds its component's price with one
+UPDATE, other changes recompute only the affected pcs with one UPDATE over an aggregate
+subquery. Bulk writes that bypass signals (imports, seeding) call `rebuild()`, which the
+`rebuild_pc_prices` management command exposes as well.
+Component prices are converted into settings.BASE_CURRENCY, so exchange-rate changes
+rebuild every pc (see signals.py).
+"""
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+
+from currencies import rates
+from .models import Component, Pc, Pc_Components
+
+PRICE_FIELD = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _base_price(price_field, currency_field):
+    return rates.converted_amount(price_field, currency_field, rates.base_currency())
+
+
+def _cents(expression):
+    # SQLite does decimal arithmetic in floating point: 0.10 + 0.20 would be stored as
+    # 0.30000000000000004, which compares unequal to the 0.30 of a keyset cursor
+    return Round(expression, 2, output_field=PRICE_FIELD)
+
+
+def _aggregates(pc_ref):
+    links = Pc_Components.objects.filter(pc_id=pc_ref).values('pc_id')
+    price = Subquery(
+        links.annotate(total=_cents(Sum(_base_price('component__price', 'component__currency')))).values('total'),
+        output_field=PRICE_FIELD,
+    )
+    count = Subquery(links.annotate(total=Count('id')).values('total'))
+    return Coalesce(price, Value(0), output_field=PRICE_FIELD), Coalesce(count, Value(0))
+
+
+def recompute(pcs):
+    """ Recompute price and component count of the pcs in the `pcs` queryset with one UPDATE. """
+    price, count = _aggregates(OuterRef('pk'))
+    return pcs.update(price=price, component_count=count)
+
+
+def rebuild():
+    """ Recompute every pc. """
+    return recompute(Pc.objects.all())
+
+
+def _component_price(component_id):
+    price = Subquery(
+        Component.objects.filter(id=component_id)
+        .annotate(base_price=_base_price('price', 'currency')).values('base_price')[:1]
+    )
+    return Coalesce(price, Value(0), output_field=PRICE_FIELD)
+
+
+def add_component(pc_id, component_id):
+    Pc.objects.filter(id=pc_id).update(
+        price=_cents(F('price') + _component_price(component_id)),
+        component_count=F('component_count') + 1,
+    )
+
+
+def remove_component(pc_id, component_id):
+    Pc.objects.filter(id=pc_id).update(
+        price=_cents(F('price') - _component_price(component_id)),
+        component_count=F('component_count') - 1,
+    )
+
+
+def component_changed(component_id):
+    """ Only the pcs that contain the component are touched. """
+    recompute(Pc.objects.filter(id__in=Pc_Components.objects.filter(component_id=component_id).values('pc_id')))
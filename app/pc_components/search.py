@@ -0,0 +1,159 @@
+"""
+Ranked full-text search over the component catalog.
+
+On PostgreSQL `Component.search_vector` is a weighted tsvector maintained by a trigger
+(migration 0004) and backed by a GIN index; queries are ranked with ts_rank.
+Other databases (SQLite for tests and local development) use an in-process inverted
+index that is built on first use and kept in sync by the catalog signals; a catalog
+version bumped by another process (pc_components/cache.py) makes it rebuild.
+
+Ranks are rounded to six places in both cases, so the rank of the last row of a page
+survives the JSON round trip of the keyset pagination cursor unchanged.
+"""
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast, Round
+
+from app.app.routers import primary
+from . import cache
+
+SEARCH_CONFIG = 'english'
+
+# Same weighting as the PostgreSQL trigger: name A, type/manufacturer B, description C, details D
+FIELD_WEIGHTS = {
+    'name': 1.0,
+    'type': 0.4,
+    'manufacturer': 0.4,
+    'description': 0.2,
+    'technical_details': 0.1,
+}
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def max_results():
+    return getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+
+
+class InvertedIndex:
+    """ term -> {component id: weighted term frequency}, ranked with tf-idf. """
+
+    def __init__(self):
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._lock = threading.Lock()
+        self._built = False
+        self._version = None
+
+    def _add(self, component):
+        weights = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(getattr(component, field) or ''):
+                weights[term] += weight
+        for term, weight in weights.items():
+            self._postings[term][component.id] = weight
+        self._documents[component.id] = list(weights)
+
+    def _remove(self, component_id):
+        for term in self._documents.pop(component_id, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(component_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def build(self, queryset, version=None):
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            for component in queryset.only(*FIELD_WEIGHTS).iterator(chunk_size=2000):
+                self._add(component)
+            self._built = True
+            self._version = version
+
+    def ensure_built(self):
+        # Read before the rows: a write during the build leaves the index a version behind
+        version = cache.get_version()
+        if not self._built or cache.bumped_elsewhere(self._version, version):
+            from .models import Component
+            # Signals keep the index current from here on, so it must start from current rows
+            with primary():
+                self.build(Component.objects.all(), version)
+        else:
+            self._version = version
+
+    def update(self, component):
+        if self._built:
+            with self._lock:
+                self._remove(component.id)
+                self._add(component)
+
+    def remove(self, component_id):
+        if self._built:
+            with self._lock:
+                self._remove(component_id)
+
+    def invalidate(self):
+        """ Rebuild on next search, e.g. after bulk writes that bypass signals. """
+        self._built = False
+
+    def search(self, query, limit):
+        """ Top `limit` (id, score) pairs of documents containing every query term. """
+        self.ensure_built()
+        terms = set(tokenize(query))
+        with self._lock:
+            postings = [self._postings.get(term) for term in terms]
+            if not terms or not all(postings):
+                return []
+            # Intersect starting from the rarest term, so cost follows the postings, not the catalog
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+            total = len(self._documents)
+            idf = [math.log(1 + total / len(posting)) for posting in postings]
+            scores = (
+                (sum(posting[doc] * weight for posting, weight in zip(postings, idf)), doc)
+                for doc in candidates
+            )
+            return [(doc, score) for score, doc in heapq.nlargest(limit, scores)]
+
+
+index = InvertedIndex()
+
+
+def search(queryset, query):
+    """ Filter `queryset` to components matching `query`, annotated with `rank` and ordered by it. """
+    if connections[queryset.db].vendor == 'postgresql':
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        # ts_rank is a float4; rounded through numeric like the scores below
+        rank = Cast(Round(SearchRank(F('search_vector'), search_query), 6), FloatField())
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(rank=rank)
+            .order_by('-rank', 'id')
+        )
+
+    ranked = [(doc, round(score, 6)) for doc, score in index.search(query, max_results())]
+    if not ranked:
+        return queryset.none().annotate(rank=Value(0.0, output_field=FloatField()))
+    return (
+        queryset.filter(id__in=[doc for doc, _ in ranked])
+        .annotate(rank=Case(
+            *[When(id=doc, then=Value(score)) for doc, score in ranked],
+            output_field=FloatField(),
+        ))
+        .order_by('-rank', 'id')
+    )
@@ -1,17 +1,62 @@
 from rest_framework import serializers
+from app.app.fieldsets import FieldsetMixin
+from . import component_sets
 from .models import Component, Pc
 
-class ComponentSerializer(serializers.ModelSerializer):
+class ComponentSerializer(FieldsetMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Component
-        fields = '__all__'
+        # Stock changes with every order, so it is served by /catalog/availability/ rather than the cached catalog
+        exclude = ['search_vector', 'stock']
 
 
-class PcSerializer(serializers.ModelSerializer):
+class PcSerializer(FieldsetMixin, serializers.ModelSerializer):
     components = serializers.PrimaryKeyRelatedField(queryset=Component.objects.all(), many=True)
+    expandable_fields = {'components': (ComponentSerializer, {'many': True, 'read_only': True})}
 
     class Meta:
         model = Pc
         fields = '__all__'
 
+
+class RestockSerializer(serializers.Serializer):
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class PcComponentListSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    components = serializers.ListField(child=serializers.IntegerField(), max_length=100)
+
+
+class PcComponentChangeSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    add = serializers.ListField(child=serializers.IntegerField(), max_length=100, default=list)
+    remove = serializers.ListField(child=serializers.IntegerField(), max_length=100, default=list)
+
+
+class PcComponentsBatchSerializer(serializers.Serializer):
+    """ {"pcs": [...]}: a batch of pcs whose components change, checking that every id exists. """
+    max_pcs = 10000
+
+    def validate_pcs(self, pcs):
+        pc_ids = [pc['id'] for pc in pcs]
+        if len(set(pc_ids)) != len(pc_ids):
+            raise serializers.ValidationError('Each pc may appear only once.')
+        missing = sorted(set(pc_ids) - component_sets.existing_ids(Pc, pc_ids))
+        if missing:
+            raise serializers.ValidationError(f"Unknown pcs: {', '.join(map(str, missing))}.")
+        component_ids = {component_id for pc in pcs for key in ('components', 'add')
+                         for component_id in pc.get(key, ())}
+        missing = sorted(component_ids - component_sets.existing_ids(Component, component_ids))
+        if missing:
+            raise serializers.ValidationError(f"Unknown components: {', '.join(map(str, missing))}.")
+        return pcs
+
+
+class PcComponentListsSerializer(PcComponentsBatchSerializer):
+    pcs = PcComponentListSerializer(many=True, max_length=PcComponentsBatchSerializer.max_pcs, allow_empty=False)
+
+
+class PcComponentChangesSerializer(PcComponentsBatchSerializer):
+    pcs = PcComponentChangeSerializer(many=True, max_length=PcComponentsBatchSerializer.max_pcs, allow_empty=False)
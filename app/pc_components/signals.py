@@ -0,0 +1,105 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from currencies import rates
+from currencies.models import ExchangeRate
+from . import cache, compatibility, pricing, search
+from .models import Component, Pc, Pc_Components
+
+
+@receiver(post_save, sender=Component)
+@receiver(post_delete, sender=Component)
+@receiver(post_save, sender=Pc)
+@receiver(post_delete, sender=Pc)
+@receiver(post_save, sender=Pc_Components)
+@receiver(post_delete, sender=Pc_Components)
+@receiver(m2m_changed, sender=Pc.components.through)
+def invalidate_catalog_cache(sender, **kwargs):
+    """ Any catalog write makes the cached /components/ and /pcs/ responses stale. """
+    action = kwargs.get('action')
+    if action is None or action.startswith('post_'):
+        cache.bump_version_on_write()
+
+
+@receiver(post_save, sender=Component)
+def update_search_index(sender, instance, **kwargs):
+    search.index.update(instance)
+
+
+@receiver(post_delete, sender=Component)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.index.remove(instance.id)
+
+
+@receiver(post_save, sender=Component)
+def update_compatibility(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not {'type', 'technical_details'} & set(update_fields)):
+        return
+    compatibility.sync(instance)
+
+
+@receiver(post_delete, sender=Component)
+def remove_from_compatibility_index(sender, instance, **kwargs):
+    compatibility.index.remove(instance.id)
+
+
+@receiver(pre_save, sender=Pc_Components)
+def remember_link_pc(sender, instance, raw=False, **kwargs):
+    """ The stored pc of a link, which a save may move to another pc. """
+    instance._stored_pc_id = None
+    if raw or instance._state.adding:
+        return
+    instance._stored_pc_id = Pc_Components.objects.filter(pk=instance.pk).values_list('pc_id', flat=True).first()
+
+
+@receiver(post_save, sender=Pc_Components)
+def link_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        pricing.add_component(instance.pc_id, instance.component_id)
+    else:
+        # A moved link changes the price of the pc it left as well
+        pc_ids = {instance.pc_id, getattr(instance, '_stored_pc_id', None)} - {None}
+        pricing.recompute(Pc.objects.filter(id__in=pc_ids))
+
+
+@receiver(post_delete, sender=Pc_Components)
+def link_deleted(sender, instance, **kwargs):
+    pricing.remove_component(instance.pc_id, instance.component_id)
+
+
+@receiver(post_save, sender=Component)
+def component_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw or (update_fields is not None and not {'price', 'currency'} & set(update_fields)):
+        return
+    pricing.component_changed(instance.id)
+
+
+@receiver(m2m_changed, sender=Pc.components.through)
+def components_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """ pc.components.add/remove/set/clear write the through table without model signals. """
+    if action == 'pre_clear' and reverse:
+        instance._cleared_pc_ids = list(instance.pc_set.values_list('id', flat=True))
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        pc_ids = [instance.pk]
+    elif action == 'post_clear':
+        pc_ids = getattr(instance, '_cleared_pc_ids', [])
+    else:
+        pc_ids = pk_set or []
+    pricing.recompute(Pc.objects.filter(id__in=pc_ids))
+    if not reverse:
+        instance.refresh_from_db(fields=['price', 'component_count'])
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def exchange_rate_changed(sender, raw=False, **kwargs):
+    """ Pc prices are stored in the base currency; cached responses may hold converted prices. """
+    if raw:
+        return
+    # Receivers run in app order, don't rely on the currencies app having dropped the matrix yet
+    rates.invalidate()
+    pricing.rebuild()
+    cache.bump_version_on_write()
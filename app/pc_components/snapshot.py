@@ -0,0 +1,133 @@
+"""
+Precompressed snapshot of the whole catalog: GET /catalog/snapshot.json.
+
+Storefront clients download every component and pc at startup. The snapshot is that
+download built once per catalog version (pc_components/cache.py; bumped by every write to
+Component, Pc, Pc_Components and the exchange rates) instead of once per request: the rows
+are read from the primary with the ValuesReaders of the list endpoints, rendered once and
+compressed once, gzip and also brotli when the `brotli` package is installed, the way
+WhiteNoise's CompressedStaticFilesStorage treats static files. The snapshot is shared
+through the `catalog` cache and kept in memory by each process, so a request costs a
+version lookup and the choice of an encoding.
+
+The first request after a write rebuilds it, `manage.py build_catalog_snapshot` builds it
+ahead of time (after a deploy or an import). Each encoding has a strong ETag derived from
+the content, so clients revalidate with If-None-Match and get a 304 as long as the content
+is unchanged, even across rebuilds.
+"""
+import gzip
+import hashlib
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from app.app import routers
+from app.app.fast_list import values_reader
+from app.app.renderers import FastJSONRenderer
+from . import cache
+from .models import Component, Pc
+from .serializers import ComponentSerializer, PcSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CONTENT_TYPE = 'application/json'
+# Preferred first
+ENCODINGS = ['br', 'gzip']
+
+
+class Snapshot:
+    __slots__ = ('version', 'bodies', 'etags')
+
+    def __init__(self, version, content):
+        self.version = version
+        self.bodies = {'identity': content, 'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.bodies['br'] = brotli.compress(content)
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == 'identity' else f'"{digest}-{encoding}"'
+            for encoding in self.bodies
+        }
+
+    def negotiate(self, accept_encoding):
+        """ The stored encoding to send for an Accept-Encoding header. """
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in self.bodies and encoding in accepted:
+                return encoding
+        return 'identity'
+
+
+def accepted_encodings(header):
+    """ Content codings an Accept-Encoding header accepts, i.e. lists without q=0. """
+    accepted = set()
+    for part in header.split(','):
+        coding, *params = [token.strip() for token in part.split(';')]
+        quality = next((param[2:] for param in params if param.startswith('q=')), '1')
+        try:
+            if float(quality) > 0:
+                accepted.add(coding.lower())
+        except ValueError:
+            continue
+    return accepted
+
+
+def build(version):
+    def rows(serializer_class, queryset):
+        reader = values_reader(serializer_class)
+        return reader.rows(list(reader.values(queryset)))
+
+    # Always current rows: the snapshot outlives the replica lag the response cache waits out
+    with routers.primary():
+        data = {
+            'components': rows(ComponentSerializer, Component.objects.order_by('id')),
+            'pcs': rows(PcSerializer, Pc.objects.order_by('id')),
+        }
+    return Snapshot(version, FastJSONRenderer().render(data))
+
+
+_current = None
+_lock = threading.Lock()
+
+
+def get_snapshot():
+    """ The snapshot of the current catalog version: from memory, the `catalog` cache or built now. """
+    global _current
+    version = cache.get_version()
+    snapshot = _current
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        if _current is not None and _current.version == version:
+            return _current
+        key = f'catalog:snapshot:{version}'
+        snapshot = cache.get_cache().get(key)
+        if snapshot is None:
+            snapshot = build(version)
+            cache.get_cache().set(key, snapshot, timeout=getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600))
+        _current = snapshot
+    return snapshot
+
+
+@require_safe
+def snapshot_view(request):
+    snapshot = get_snapshot()
+    encoding = snapshot.negotiate(request.headers.get('Accept-Encoding', ''))
+    etag = snapshot.etags[encoding]
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(snapshot.bodies[encoding], content_type=CONTENT_TYPE)
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept-Encoding'])
+    # Stored by clients and proxies, revalidated before every use
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
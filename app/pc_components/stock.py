@@ -0,0 +1,111 @@
+"""
+Component stock and the availability of pcs derived from it.
+
+`Component.stock` counts the units on hand; None means the component isn't tracked and
+never runs out. It is only written by the statements here, each a single UPDATE over all
+the components involved, e.g. taking 2 of component 1 and 1 of component 7:
+
+    UPDATE component SET stock = stock - CASE id WHEN 1 THEN 2 WHEN 7 THEN 1 END
+    WHERE id IN (1, 7) AND (stock IS NULL OR stock >= CASE id WHEN 1 THEN 2 WHEN 7 THEN 1 END)
+
+The database checks the condition against the row it writes, so two orders racing for the
+last units can't both get them, without a read-check-write or SELECT ... FOR UPDATE: rows
+are locked only by the UPDATE itself. Fewer rows updated than components means some ran
+short, and the savepoint around the UPDATE undoes the others.
+
+These writes bypass `save()` and the catalog signals on purpose: stock isn't part of the
+cached catalog responses, which would otherwise be invalidated by every order. Clients
+read it from the uncached /catalog/availability/ instead.
+
+A pc is available as many times as its scarcest tracked component allows, counting
+components it contains more than once; a pc without tracked components is unlimited.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Component, Pc, Pc_Components
+
+
+class OutOfStock(Exception):
+    def __init__(self, component_ids):
+        self.component_ids = sorted(component_ids)
+        super().__init__(f"Not enough stock of components {', '.join(map(str, self.component_ids))}.")
+
+
+def _per_component(quantities):
+    return Case(*[When(id=component_id, then=Value(quantity)) for component_id, quantity in quantities.items()],
+                output_field=IntegerField())
+
+
+def take(quantities):
+    """ Takes {component id: units} from stock all or nothing; raises OutOfStock for the components short of units. """
+    quantities = {component_id: quantity for component_id, quantity in quantities.items() if quantity}
+    if not quantities:
+        return
+    needed = _per_component(quantities)
+    with transaction.atomic():
+        updated = (
+            Component.objects.filter(id__in=quantities)
+            .filter(Q(stock__isnull=True) | Q(stock__gte=needed))
+            .update(stock=F('stock') - needed)
+        )
+        if updated != len(quantities):
+            stocks = dict(Component.objects.filter(id__in=quantities).values_list('id', 'stock'))
+            raise OutOfStock([
+                component_id for component_id, quantity in quantities.items()
+                if component_id not in stocks or (stocks[component_id] is not None and stocks[component_id] < quantity)
+            ])
+
+
+def put_back(quantities):
+    """ Returns units taken by `take`; untracked components stay untracked. """
+    quantities = {component_id: quantity for component_id, quantity in quantities.items() if quantity}
+    if quantities:
+        Component.objects.filter(id__in=quantities).update(stock=F('stock') + _per_component(quantities))
+
+
+def restock(component_id, quantity):
+    """ Adds units to a component's stock, which starts tracking it. """
+    return Component.objects.filter(id=component_id).update(stock=Coalesce('stock', Value(0)) + quantity)
+
+
+def tracked_parts(pc_ids):
+    """ {pc id: Counter of its tracked component ids}, i.e. the stock one unit of each pc needs. """
+    parts = defaultdict(Counter)
+    links = Pc_Components.objects.filter(pc_id__in=pc_ids, component__stock__isnull=False)
+    for pc_id, component_id in links.values_list('pc_id', 'component_id'):
+        parts[pc_id][component_id] += 1
+    return parts
+
+
+def requirements(component_quantities, pc_quantities):
+    """ {component id: units} of tracked components needed for {component id: units} and {pc id: units}. """
+    needed = Counter()
+    if component_quantities:
+        tracked = Component.objects.filter(id__in=component_quantities, stock__isnull=False).values_list('id', flat=True)
+        for component_id in tracked:
+            needed[component_id] += component_quantities[component_id]
+    if pc_quantities:
+        for pc_id, parts in tracked_parts(pc_quantities).items():
+            for component_id, count in parts.items():
+                needed[component_id] += count * pc_quantities[pc_id]
+    return dict(needed)
+
+
+def component_availability(component_ids):
+    """ {component id: units on hand, None if untracked} of the existing components. """
+    return dict(Component.objects.filter(id__in=component_ids).values_list('id', 'stock'))
+
+
+def pc_availability(pc_ids):
+    """ {pc id: pcs that can be built from stock, None if unlimited} of the existing pcs. """
+    available = {pc_id: None for pc_id in Pc.objects.filter(id__in=pc_ids).values_list('id', flat=True)}
+    links = Pc_Components.objects.filter(pc_id__in=available, component__stock__isnull=False)
+    counts = Counter(links.values_list('pc_id', 'component_id', 'component__stock'))
+    for (pc_id, _, stock), count in counts.items():
+        units = stock // count
+        available[pc_id] = units if available[pc_id] is None else min(available[pc_id], units)
+    return available
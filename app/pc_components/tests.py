@@ -1,3 +1,932 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import tempfile
+from asgiref.sync import sync_to_async
+from decimal import Decimal
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from app.app.routers import PrimaryReplicaRouter, ReplicaPinningMiddleware, primary
+from currencies import rates
+from currencies.models import ExchangeRate
+from orders.models import Order
+from users.models import User
+from . import cache, compatibility, pricing, search, snapshot, stock
+from .models import Component, Component_Attributes, Pc, Pc_Components
 
-# Create your tests here.
+
+def create_component(**kwargs):
+    data = {
+        'name': 'Component',
+        'type': 'CPU',
+        'manufacturer': 'AMD',
+        'price': '100.00',
+        'description': 'Description',
+        'technical_details': 'Details',
+    }
+    data.update(kwargs)
+    return Component.objects.create(**data)
+
+
+def create_pcs(count, components_per_pc=3):
+    """ Seed `count` pcs, each linked to its own `components_per_pc` components. """
+    pcs = []
+    for i in range(count):
+        pc = Pc.objects.create(name=f'Pc {i}', description='Description', is_customized=False)
+        for j in range(components_per_pc):
+            Pc_Components.objects.create(pc=pc, component=create_component(name=f'Part {i}-{j}'))
+        pcs.append(pc)
+    return pcs
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200, response.status_code
+    return len(queries)
+
+
+class ComponentPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        # Duplicate names force the id tiebreaker to keep the order stable
+        for name in ['b', 'a', 'c', 'a', 'b', 'a', 'd']:
+            create_component(name=name)
+        self.expected = list(Component.objects.order_by('name', 'id').values_list('id', flat=True))
+
+    def test_walk_forward_and_backward(self):
+        url = '/components/?page_size=3'
+        seen = []
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, self.expected)
+        self.assertIsNone(pages[0]['previous'])
+
+        response = self.client.get(pages[-1]['previous'])
+        self.assertEqual([row['id'] for row in response.data['results']], self.expected[3:6])
+
+    def test_page_size_is_capped(self):
+        with self.settings(MAX_PAGE_SIZE=2):
+            response = self.client.get('/components/?page_size=100')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/components/?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+    def test_deep_page_is_a_single_query(self):
+        response = self.client.get('/components/?page_size=2')
+        response = self.client.get(response.data['next'])
+        with self.assertNumQueries(1):
+            self.client.get(response.data['next'])
+
+
+class PcQueryCountTests(TestCase):
+    """ Query counts must not grow with the number of rows (N vs 10*N). """
+    N = 3
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_pc_list(self):
+        create_pcs(self.N)
+        small = count_queries(self.client, '/pcs/?page_size=100')
+        create_pcs(9 * self.N)
+        large = count_queries(self.client, '/pcs/?page_size=100')
+        self.assertEqual(small, large)
+
+    def test_pc_detail(self):
+        small_pc = create_pcs(1, components_per_pc=self.N)[0]
+        large_pc = create_pcs(1, components_per_pc=10 * self.N)[0]
+        self.assertEqual(
+            count_queries(self.client, f'/pcs/{small_pc.id}/'),
+            count_queries(self.client, f'/pcs/{large_pc.id}/'),
+        )
+
+    def test_component_list(self):
+        for i in range(self.N):
+            create_component(name=f'Small {i}')
+        small = count_queries(self.client, '/components/?page_size=100')
+        for i in range(9 * self.N):
+            create_component(name=f'Large {i}')
+        large = count_queries(self.client, '/components/?page_size=100')
+        self.assertEqual(small, large)
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.component = create_component(name='Ryzen')
+
+    def test_second_request_is_served_from_cache(self):
+        self.assertEqual(self.client.get('/components/')['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get('/components/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['results'][0]['name'], 'Ryzen')
+
+    def test_query_param_order_does_not_matter(self):
+        self.client.get('/components/?page_size=5&x=1')
+        self.assertEqual(self.client.get('/components/?x=1&page_size=5')['X-Cache'], 'HIT')
+
+    def test_component_write_invalidates(self):
+        self.client.get(f'/components/{self.component.id}/')
+        self.component.name = 'Threadripper'
+        self.component.save()
+        response = self.client.get(f'/components/{self.component.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['name'], 'Threadripper')
+
+    def test_m2m_change_invalidates_pcs(self):
+        pc = Pc.objects.create(name='Gaming', description='Description', is_customized=False)
+        self.assertEqual(self.client.get(f'/pcs/{pc.id}/').data['components'], [])
+        pc.components.add(self.component)
+        response = self.client.get(f'/pcs/{pc.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['components'], [self.component.id])
+
+    def test_lru_is_bounded(self):
+        with self.settings(CATALOG_CACHE_MAX_ENTRIES=2):
+            for size in (1, 2, 3):
+                self.client.get(f'/components/?page_size={size}')
+            self.assertEqual(self.client.get('/components/?page_size=3')['X-Cache'], 'HIT')
+            self.assertEqual(self.client.get('/components/?page_size=1')['X-Cache'], 'MISS')
+
+    def test_stats(self):
+        self.client.get('/components/')
+        self.client.get('/components/')
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        stats = self.client.get('/catalog/cache-stats/').data
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+
+class CatalogFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        create_component(name='Ryzen 5', type='CPU', manufacturer='AMD', price='150.00')
+        create_component(name='Ryzen 9', type='CPU', manufacturer='AMD', price='550.00')
+        create_component(name='Core i5', type='CPU', manufacturer='Intel', price='200.00')
+        create_component(name='RTX 4070', type='GPU', manufacturer='Nvidia', price='600.00')
+
+    def names(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.data['results']]
+
+    def test_exact_filters(self):
+        self.assertEqual(self.names('/components/?type=CPU&manufacturer=AMD'), ['Ryzen 5', 'Ryzen 9'])
+
+    def test_price_range(self):
+        self.assertEqual(self.names('/components/?price_min=160&price_max=560'), ['Core i5', 'Ryzen 9'])
+
+    def test_ordering_by_price_paginates(self):
+        self.assertEqual(self.names('/components/?ordering=-price'), ['RTX 4070', 'Ryzen 9', 'Core i5', 'Ryzen 5'])
+        response = self.client.get('/components/?ordering=-price&page_size=3')
+        self.assertEqual([row['name'] for row in self.client.get(response.data['next']).data['results']], ['Ryzen 5'])
+
+    def test_invalid_price(self):
+        self.assertEqual(self.client.get('/components/?price_min=cheap').status_code, 400)
+        for value in ('NaN', 'sNaN', 'Infinity', '-inf'):
+            self.assertEqual(self.client.get(f'/components/?price_max={value}').status_code, 400)
+            self.assertEqual(self.client.get(f'/pcs/?price_min={value}').status_code, 400)
+
+    def test_pc_is_customized(self):
+        Pc.objects.create(name='Custom', description='Description', is_customized=True)
+        Pc.objects.create(name='Prebuilt', description='Description', is_customized=False)
+        self.assertEqual(self.names('/pcs/?is_customized=false'), ['Prebuilt'])
+        self.assertEqual(self.client.get('/pcs/?is_customized=maybe').status_code, 400)
+
+
+class ComponentSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        search.index.invalidate()
+        self.client = APIClient()
+        self.ryzen = create_component(name='Ryzen 7 7800X3D', description='Gaming processor with 3D V-Cache')
+        self.epyc = create_component(name='Epyc 9654', description='Server processor, gaming capable')
+        create_component(name='RTX 4090', type='GPU', manufacturer='Nvidia', description='Graphics card')
+
+    def ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_ranked_by_field_weight(self):
+        # A match in the name outranks matches in the description only
+        cooler = create_component(name='Processor cooler', type='Cooler', description='Quiet fan')
+        self.assertEqual(self.ids('/components/search/?q=processor'), [cooler.id, self.ryzen.id, self.epyc.id])
+        self.assertEqual(self.ids('/components/search/?q=ryzen gaming'), [self.ryzen.id])
+        self.assertEqual(self.ids('/components/search/?q=epyc'), [self.epyc.id])
+
+    def test_index_follows_writes(self):
+        self.ids('/components/search/?q=ryzen')
+        self.ryzen.name = 'Threadripper 7980X'
+        self.ryzen.save()
+        self.assertEqual(self.ids('/components/search/?q=ryzen'), [])
+        self.assertEqual(self.ids('/components/search/?q=threadripper'), [self.ryzen.id])
+        self.epyc.delete()
+        self.assertEqual(self.ids('/components/search/?q=epyc'), [])
+
+    def test_rebuilt_when_another_process_bumps_the_version(self):
+        self.ids('/components/search/?q=ryzen')
+        with mock.patch.object(search.index, 'build', wraps=search.index.build) as build:
+            self.ryzen.name = 'Threadripper 7980X'
+            self.ryzen.save()
+            self.assertEqual(self.ids('/components/search/?q=threadripper'), [self.ryzen.id])
+            build.assert_not_called()
+            # As written by another process: no signals here, only the shared version moves
+            Component.objects.filter(id=self.epyc.id).update(name='Xeon 6980P')
+            cache.get_cache().incr(cache.VERSION_KEY)
+            self.assertEqual(self.ids('/components/search/?q=xeon'), [self.epyc.id])
+            build.assert_called_once()
+
+    def test_paginated_and_filterable(self):
+        response = self.client.get('/components/search/?q=processor&page_size=1')
+        first = response.data['results'][0]['id']
+        second = self.client.get(response.data['next']).data['results'][0]['id']
+        self.assertEqual({first, second}, {self.ryzen.id, self.epyc.id})
+        self.assertEqual(self.ids('/components/search/?q=card&type=CPU'), [])
+
+    def test_query_required(self):
+        self.assertEqual(self.client.get('/components/search/').status_code, 400)
+
+
+class CatalogImportExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True, is_superuser=True))
+        self.cpu = create_component(name='Ryzen', price='200.00', technical_details='')
+
+    def export(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def upload(self, path, content):
+        return self.client.post(path, {'file': SimpleUploadedFile('upload', content.encode())}, format='multipart')
+
+    def test_csv_round_trip_upserts(self):
+        exported = self.export('/catalog/export/components.csv')
+        self.assertTrue(exported.startswith('id,name,type,manufacturer,price,currency,description,technical_details'))
+        changed = exported.replace('Ryzen', 'Ryzen 9') + ',Core i9,CPU,Intel,550.00,EUR,Description,\r\n'
+        response = self.upload('/catalog/import/components.csv', changed)
+        self.assertEqual(response.data, {'imported': 2})
+        self.assertEqual(sorted(Component.objects.values_list('name', flat=True)), ['Core i9', 'Ryzen 9'])
+        self.assertEqual(Component.objects.get(id=self.cpu.id).technical_details, '')
+
+    def test_jsonl_round_trip(self):
+        pc = Pc.objects.create(name='Gaming', description='Description', is_customized=True)
+        Pc_Components.objects.create(pc=pc, component=self.cpu)
+        pcs = self.export('/catalog/export/pcs.jsonl')
+        links = self.export('/catalog/export/pc_components.jsonl')
+        self.assertEqual(json.loads(pcs), {'id': pc.id, 'name': 'Gaming', 'description': 'Description', 'is_customized': True})
+        Pc.objects.all().delete()
+        self.upload('/catalog/import/pcs.jsonl', pcs)
+        self.upload('/catalog/import/pc_components.jsonl', links)
+        self.assertEqual(list(Pc.objects.get(id=pc.id).components.all()), [self.cpu])
+
+    def test_import_invalidates_catalog_cache(self):
+        self.client.get('/components/')
+        self.upload('/catalog/import/components.jsonl', json.dumps({
+            'name': 'RTX', 'type': 'GPU', 'manufacturer': 'Nvidia', 'price': 500,
+            'currency': 'USD', 'description': 'Graphics card', 'technical_details': '',
+        }))
+        response = self.client.get('/components/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_invalid_rows_are_rejected(self):
+        response = self.upload('/catalog/import/components.csv', 'name,price\nBroken,cheap\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Component.objects.count(), 1)
+
+    def test_rows_are_validated_against_the_fields(self):
+        header = 'name,type,manufacturer,price,currency,description,technical_details\n'
+        response = self.upload('/catalog/import/components.csv', header + (
+            'Fine,CPU,AMD,10.00,EUR,,\n'
+            'Yen,CPU,AMD,10.00,JPY,,\n'
+            'Refund,CPU,AMD,-5.00,EUR,,\n'
+            f"Long,{'x' * 51},AMD,10.00,EUR,,\n"
+        ))
+        self.assertEqual(response.status_code, 400)
+        errors = str(response.data['file'])
+        self.assertIn("Row 2: 'currency'", errors)
+        self.assertIn("Row 3: 'price'", errors)
+        self.assertIn("Row 4: 'type'", errors)
+        self.assertNotIn('Row 1', errors)
+        # The valid row is rolled back with the rest
+        self.assertEqual(Component.objects.count(), 1)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as file:
+            file.write(header + 'Yen,CPU,AMD,10.00,JPY,,\n')
+            file.flush()
+            with self.assertRaisesMessage(CommandError, "Row 1: 'currency'"):
+                call_command('import_catalog', 'components', file.name, stdout=io.StringIO())
+
+    def test_import_requires_admin(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.upload('/catalog/import/components.csv', '').status_code, 401)
+
+
+class PcPriceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cpu = create_component(name='CPU', price='200.00')
+        self.gpu = create_component(name='GPU', type='GPU', price='500.00')
+        self.pc = Pc.objects.create(name='Gaming', description='Description', is_customized=False)
+
+    def assertPrice(self, pc, price, count):
+        pc = Pc.objects.get(id=pc.id)
+        self.assertEqual((pc.price, pc.component_count), (Decimal(price), count))
+
+    def test_links_are_added_and_removed(self):
+        Pc_Components.objects.create(pc=self.pc, component=self.cpu)
+        link = Pc_Components.objects.create(pc=self.pc, component=self.gpu)
+        self.assertPrice(self.pc, '700.00', 2)
+        link.delete()
+        self.assertPrice(self.pc, '200.00', 1)
+
+    def test_moved_link_reprices_both_pcs(self):
+        other = Pc.objects.create(name='Office', description='Description', is_customized=False)
+        Pc_Components.objects.create(pc=self.pc, component=self.cpu)
+        link = Pc_Components.objects.create(pc=self.pc, component=self.gpu)
+        link.pc = other
+        link.save()
+        self.assertPrice(self.pc, '200.00', 1)
+        self.assertPrice(other, '500.00', 1)
+
+    def test_keyset_walk_by_price(self):
+        # Sums like 0.10 + 0.20 aren't exact in floating point, which SQLite computes in
+        for i in range(12):
+            pc = Pc.objects.create(name=f'Pc {i}', description='Description', is_customized=False)
+            parts = [create_component(price=f'{i % 5}.10'), create_component(price=f'{i % 5}.20')]
+            if i % 2:
+                pc.components.add(*parts)
+            else:
+                for part in parts:
+                    Pc_Components.objects.create(pc=pc, component=part)
+        self.assertEqual(Pc.objects.get(name='Pc 1').price, Decimal('2.30'))
+        ExchangeRate.objects.update_or_create(currency='USD', defaults={'rate': Decimal('1.1')})
+        rates.invalidate()
+        self.addCleanup(rates.invalidate)
+        expected = list(Pc.objects.order_by('-price', '-id').values_list('id', flat=True))
+        client = APIClient()
+        for query in ['', '&currency=USD']:
+            url, pages = f'/pcs/?page_size=5&ordering=-price{query}', []
+            while url:
+                pages.append(client.get(url).data)
+                url = pages[-1]['next']
+            self.assertEqual([row['id'] for page in pages for row in page['results']], expected)
+            url, seen = pages[-1]['previous'], [row['id'] for row in pages[-1]['results']]
+            while url:
+                page = client.get(url).data
+                seen[:0] = [row['id'] for row in page['results']]
+                url = page['previous']
+            self.assertEqual(seen, expected)
+
+    def test_m2m_add_remove_clear(self):
+        self.pc.components.add(self.cpu, self.gpu)
+        self.assertEqual(self.pc.price, Decimal('700.00'))
+        self.pc.components.remove(self.cpu)
+        self.assertPrice(self.pc, '500.00', 1)
+        self.gpu.pc_set.clear()
+        self.assertPrice(self.pc, '0.00', 0)
+
+    def test_component_price_change_only_touches_its_pcs(self):
+        other = Pc.objects.create(name='Office', description='Description', is_customized=False)
+        self.pc.components.add(self.cpu)
+        other.components.add(self.gpu)
+        self.cpu.price = Decimal('250.00')
+        with CaptureQueriesContext(connection) as queries:
+            self.cpu.save()
+        self.assertPrice(self.pc, '250.00', 1)
+        self.assertPrice(other, '500.00', 1)
+        self.assertEqual(len([q for q in queries if 'UPDATE "pc_components_pc"' in q['sql']]), 1)
+
+    def test_stale_instance_does_not_overwrite_price(self):
+        stale = Pc.objects.get(id=self.pc.id)
+        self.pc.components.add(self.cpu)
+        stale.name = 'Renamed'
+        stale.save()
+        self.assertPrice(self.pc, '200.00', 1)
+
+    def test_order_and_filter_by_price(self):
+        cheap = Pc.objects.create(name='Cheap', description='Description', is_customized=False)
+        cheap.components.add(self.cpu)
+        self.pc.components.add(self.gpu)
+        client = APIClient()
+        response = client.get('/pcs/?ordering=-price')
+        self.assertEqual([row['name'] for row in response.data['results']], ['Gaming', 'Cheap'])
+        self.assertEqual(response.data['results'][0]['price'], '500.00')
+        response = client.get('/pcs/?price_max=300')
+        self.assertEqual([row['name'] for row in response.data['results']], ['Cheap'])
+
+    def test_rebuild_command(self):
+        self.pc.components.add(self.cpu, self.gpu)
+        Pc.objects.update(price=0, component_count=0)
+        call_command('rebuild_pc_prices', stdout=io.StringIO())
+        self.assertPrice(self.pc, '700.00', 2)
+        self.assertEqual(pricing.rebuild(), 1)
+
+
+class CompatibilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        compatibility.index.invalidate()
+        self.client = APIClient()
+        self.am5 = create_component(name='Ryzen 7', type='CPU', technical_details='Socket: AM5, TDP: 120W')
+        self.lga = create_component(name='Core i7', type='CPU', technical_details='LGA 1700, 253 W')
+        self.board = create_component(name='B650', type='Mainboard', technical_details='Socket AM5, DDR5, Micro-ATX')
+        self.ddr4 = create_component(name='DDR4 Kit', type='RAM', technical_details='DDR4-3200')
+        self.ddr5 = create_component(name='DDR5 Kit', type='RAM', technical_details='DDR5-6000')
+        self.small_case = create_component(name='Cube', type='Case', technical_details='Mini-ITX')
+        self.case = create_component(name='Tower', type='Case', technical_details='E-ATX tower')
+        self.psu = create_component(name='PSU 300', type='PSU', technical_details='300W, ATX')
+        self.gpu = create_component(name='RTX', type='GPU', technical_details='TBP: 285W')
+        self.pc = Pc.objects.create(name='Custom', description='Description', is_customized=True)
+        self.pc.components.add(self.am5, self.board)
+
+    def names(self, component_type, pc=None):
+        response = self.client.get(f'/pcs/{(pc or self.pc).id}/compatible-components/?type={component_type}')
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.data['results']]
+
+    def test_extract(self):
+        self.assertEqual(compatibility.extract('Socket: LGA-1700, DDR5, mATX, TDP: 125 W, boost 5.4 GHz'), {
+            'socket': 'LGA1700', 'memory_type': 'DDR5', 'form_factor': 'Micro-ATX', 'wattage': 125,
+        })
+        self.assertEqual(compatibility.extract('Quiet fan'), dict.fromkeys(compatibility.ATTRIBUTES))
+
+    def test_attributes_are_stored(self):
+        attributes = Component_Attributes.objects.get(component=self.board)
+        self.assertEqual((attributes.socket, attributes.memory_type, attributes.form_factor), ('AM5', 'DDR5', 'Micro-ATX'))
+
+    def test_socket_memory_and_form_factor(self):
+        # The candidate replaces the pc's own CPU, so both CPUs are checked against the board only
+        self.assertEqual(self.names('CPU'), ['Ryzen 7'])
+        self.assertEqual(self.names('RAM'), ['DDR5 Kit'])
+        self.assertEqual(self.names('Case'), ['Tower'])
+
+    def test_power_budget(self):
+        self.pc.components.add(self.psu)
+        self.assertEqual(self.names('GPU'), [])
+        self.pc.components.remove(self.psu)
+        self.pc.components.add(self.gpu)
+        self.assertEqual(self.names('PSU'), [])
+
+    def test_index_follows_writes(self):
+        self.assertEqual(self.names('RAM'), ['DDR5 Kit'])
+        self.ddr4.technical_details = 'DDR5-5600'
+        self.ddr4.save()
+        self.assertEqual(self.names('RAM'), ['DDR4 Kit', 'DDR5 Kit'])
+        self.ddr5.delete()
+        self.assertEqual(self.names('RAM'), ['DDR4 Kit'])
+
+    def test_answered_from_the_index(self):
+        self.names('RAM')
+        # Bypasses the signals and the version bump
+        Component_Attributes.objects.all().delete()
+        self.assertEqual(self.names('CPU'), ['Ryzen 7'])
+
+    def test_rebuilt_when_another_process_bumps_the_version(self):
+        self.assertEqual(self.names('CPU'), ['Ryzen 7'])
+        with mock.patch.object(compatibility.index, 'build', wraps=compatibility.index.build) as build:
+            self.ddr4.technical_details = 'DDR5-5600'
+            self.ddr4.save()
+            self.assertEqual(self.names('RAM'), ['DDR4 Kit', 'DDR5 Kit'])
+            build.assert_not_called()
+            # As written by another process: no signals here, only the shared version moves
+            Component_Attributes.objects.filter(component=self.lga).update(socket='AM5')
+            cache.get_cache().incr(cache.VERSION_KEY)
+            self.assertEqual(self.names('CPU'), ['Core i7', 'Ryzen 7'])
+            build.assert_called_once()
+
+    def test_rebuild_after_bulk_writes(self):
+        Component.objects.filter(id=self.lga.id).update(technical_details='Socket: AM5')
+        self.assertEqual(compatibility.rebuild(), Component.objects.count())
+        cache.clear()
+        self.assertEqual(self.names('CPU'), ['Core i7', 'Ryzen 7'])
+
+    def test_type_required_and_unknown_pc(self):
+        self.assertEqual(self.client.get(f'/pcs/{self.pc.id}/compatible-components/').status_code, 400)
+        self.assertEqual(self.client.get('/pcs/999/compatible-components/?type=CPU').status_code, 404)
+
+
+class CatalogSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        create_pcs(2)
+
+    def get(self, **headers):
+        return self.client.get('/catalog/snapshot.json', headers=headers)
+
+    def test_gzipped_catalog(self):
+        response = self.get(accept_encoding='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(data['components'], self.client.get('/components/?page_size=100&ordering=name').data['results'])
+        self.assertEqual([pc['name'] for pc in data['pcs']], ['Pc 0', 'Pc 1'])
+        self.assertEqual(gzip.decompress(response.content), self.get().content)
+        self.assertFalse(self.get().has_header('Content-Encoding'))
+        self.assertFalse(self.get(accept_encoding='gzip;q=0').has_header('Content-Encoding'))
+
+    def test_no_work_per_request_and_conditional_get(self):
+        etag = self.get()['ETag']
+        with self.assertNumQueries(0):
+            response = self.get(if_none_match=etag)
+        self.assertEqual((response.status_code, response.content), (304, b''))
+        self.assertNotEqual(self.get(accept_encoding='gzip')['ETag'], etag)
+
+    def test_rebuilt_on_catalog_writes(self):
+        etag = self.get()['ETag']
+        component = create_component(name='New')
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('New', [row['name'] for row in json.loads(response.content)['components']])
+        component.delete()
+        # Same content, same ETag
+        self.assertEqual(self.get(if_none_match=etag).status_code, 304)
+
+    @skipUnless(snapshot.brotli, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        response = self.get(accept_encoding='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(snapshot.brotli.decompress(response.content), self.get().content)
+
+
+class StockTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.cpu = create_component(name='Ryzen', stock=5)
+        self.gpu = create_component(name='RTX', stock=1)
+        self.case = create_component(name='Case')
+
+    def stocks(self):
+        return stock.component_availability([self.cpu.id, self.gpu.id, self.case.id])
+
+    def test_take_is_all_or_nothing(self):
+        with self.assertRaises(stock.OutOfStock) as raised:
+            stock.take({self.cpu.id: 2, self.gpu.id: 2, self.case.id: 1})
+        self.assertEqual(raised.exception.component_ids, [self.gpu.id])
+        self.assertEqual(self.stocks(), {self.cpu.id: 5, self.gpu.id: 1, self.case.id: None})
+        stock.take({self.cpu.id: 2, self.gpu.id: 1, self.case.id: 100})
+        self.assertEqual(self.stocks(), {self.cpu.id: 3, self.gpu.id: 0, self.case.id: None})
+        stock.put_back({self.cpu.id: 2, self.case.id: 1})
+        self.assertEqual(self.stocks(), {self.cpu.id: 5, self.gpu.id: 0, self.case.id: None})
+
+    def test_full_save_keeps_concurrent_stock_changes(self):
+        component = Component.objects.get(id=self.cpu.id)
+        stock.take({self.cpu.id: 4})
+        component.name = 'Renamed'
+        component.save()
+        self.assertEqual(self.stocks()[self.cpu.id], 1)
+
+    def test_pc_availability(self):
+        pc = Pc.objects.create(name='Gaming', description='Description', is_customized=False)
+        for component in [self.cpu, self.cpu, self.gpu, self.case]:
+            Pc_Components.objects.create(pc=pc, component=component)
+        untracked = Pc.objects.create(name='Office', description='Description', is_customized=False)
+        Pc_Components.objects.create(pc=untracked, component=self.case)
+        self.assertEqual(stock.pc_availability([pc.id, untracked.id, 999]), {pc.id: 1, untracked.id: None})
+        stock.take({self.gpu.id: 1})
+        self.assertEqual(stock.pc_availability([pc.id])[pc.id], 0)
+        # Served live, outside the catalog cache
+        response = self.client.get(f'/catalog/availability/?components={self.cpu.id},{self.case.id}&pcs={pc.id}')
+        self.assertEqual(json.loads(response.content), {
+            'components': {str(self.cpu.id): 5, str(self.case.id): None}, 'pcs': {str(pc.id): 0},
+        })
+        self.assertEqual(self.client.get('/catalog/availability/?pcs=a').status_code, 400)
+        for ids in ('0', '-1', str(2 ** 31), str(10 ** 30)):
+            self.assertEqual(self.client.get(f'/catalog/availability/?components={ids}').status_code, 400)
+
+    def test_restock(self):
+        url = f'/components/{self.case.id}/restock/'
+        self.assertEqual(self.client.post(url, {'quantity': 3}).status_code, 401)
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True))
+        self.assertEqual(self.client.post(url, {'quantity': 3}).data, {'id': self.case.id, 'stock': 3})
+        self.assertEqual(self.client.post(url, {'quantity': 2}).data['stock'], 5)
+        self.assertEqual(self.client.post(url, {'quantity': 0}).status_code, 400)
+        self.assertNotIn('stock', self.client.get(f'/components/{self.case.id}/').data)
+
+
+class PcComponentSetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True))
+        self.cpu = create_component(name='Ryzen', price='200.00')
+        self.ram = create_component(name='DDR5', type='RAM', price='50.00')
+        self.gpu = create_component(name='RTX', type='GPU', price='500.00')
+        self.ssd = create_component(name='NVMe', type='SSD', price='80.00')
+        self.pc = Pc.objects.create(name='Gaming', description='Description', is_customized=False)
+        self.pc.components.add(self.cpu, self.gpu)
+        self.older_ram = Pc_Components.objects.create(pc=self.pc, component=self.ram)
+        Pc_Components.objects.create(pc=self.pc, component=self.ram)
+        self.office = Pc.objects.create(name='Office', description='Description', is_customized=False)
+        self.office.components.add(self.cpu)
+
+    def components(self, pc):
+        return sorted(Pc_Components.objects.filter(pc=pc).values_list('component_id', flat=True))
+
+    def assertPrice(self, pc, price, count):
+        pc.refresh_from_db()
+        self.assertEqual((pc.price, pc.component_count), (Decimal(price), count))
+
+    def test_replace_diffs_against_current_links(self):
+        version = cache.get_version()
+        response = self.client.put('/pcs/components/', {'pcs': [
+            {'id': self.pc.id, 'components': [self.cpu.id, self.ram.id, self.ssd.id]},
+            {'id': self.office.id, 'components': [self.cpu.id]},
+        ]}, format='json')
+        self.assertEqual(response.data, {'pcs': 1, 'added': 1, 'removed': 2})
+        self.assertEqual(self.components(self.pc), sorted([self.cpu.id, self.ram.id, self.ssd.id]))
+        # Of two equal links the older one is kept
+        self.assertTrue(Pc_Components.objects.filter(id=self.older_ram.id).exists())
+        self.assertPrice(self.pc, '330.00', 3)
+        self.assertPrice(self.office, '200.00', 1)
+        self.assertNotEqual(cache.get_version(), version)
+
+    def test_statements_do_not_grow_with_the_batch(self):
+        pcs = create_pcs(20)
+
+        def statements(pcs):
+            body = {'pcs': [{'id': pc.id, 'add': [self.ssd.id], 'remove': [self.cpu.id]} for pc in pcs]}
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.patch('/pcs/components/', body, format='json').status_code, 200)
+            return len(queries)
+
+        self.assertEqual(statements(pcs[:1]), statements(pcs[1:]))
+
+    def test_patch(self):
+        response = self.client.patch('/pcs/components/', {'pcs': [
+            {'id': self.pc.id, 'add': [self.ssd.id, self.ssd.id], 'remove': [self.ram.id, self.gpu.id, self.gpu.id]},
+            {'id': self.office.id, 'remove': [self.ssd.id]},
+        ]}, format='json')
+        self.assertEqual(response.data, {'pcs': 1, 'added': 2, 'removed': 2})
+        self.assertEqual(self.components(self.pc), sorted([self.cpu.id, self.ram.id, self.ssd.id, self.ssd.id]))
+        self.assertPrice(self.pc, '410.00', 4)
+        self.assertEqual(self.components(self.office), [self.cpu.id])
+
+    def test_invalid_batches(self):
+        def put(pcs):
+            return self.client.put('/pcs/components/', {'pcs': pcs}, format='json')
+
+        self.assertEqual(put([]).status_code, 400)
+        self.assertEqual(put([{'id': 999, 'components': []}]).status_code, 400)
+        self.assertEqual(put([{'id': self.pc.id, 'components': [999]}]).status_code, 400)
+        self.assertEqual(put([{'id': self.pc.id, 'components': []}, {'id': self.pc.id, 'components': []}]).status_code, 400)
+        self.assertEqual(len(self.components(self.pc)), 4)
+        self.client.force_authenticate(None)
+        self.assertEqual(put([{'id': self.pc.id, 'components': []}]).status_code, 401)
+
+
+class FieldsetTests(TestCase):
+    """ ?fields= / ?expand=: what is rendered, and what is read from the database for it. """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.pc = create_pcs(1, components_per_pc=2)[0]
+
+    def queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data, [query['sql'] for query in queries]
+
+    def test_fields_are_pushed_down(self):
+        data, sql = self.queries('/components/?fields=id,name,price')
+        # An amount comes with its currency
+        self.assertEqual(set(data['results'][0]), {'id', 'name', 'price', 'currency'})
+        self.assertNotIn('description', sql[0])
+        self.assertNotIn('technical_details', sql[0])
+        data, sql = self.queries(f'/components/{self.pc.components.first().id}/?fields=name')
+        self.assertEqual(set(data), {'name'})
+        self.assertNotIn('description', sql[0])
+
+    def test_relations_prefetched_only_when_rendered(self):
+        data, sql = self.queries('/pcs/?fields=id,name')
+        self.assertEqual(data['results'], [{'id': self.pc.id, 'name': 'Pc 0'}])
+        self.assertEqual(len(sql), 1)
+        data, sql = self.queries('/pcs/')
+        self.assertEqual(len(data['results'][0]['components']), 2)
+        self.assertEqual(len(sql), 2)
+
+    def test_expand(self):
+        data, sql = self.queries('/pcs/?expand=components&fields=id,components.name')
+        self.assertEqual(data['results'], [{'id': self.pc.id, 'components': [{'name': 'Part 0-0'}, {'name': 'Part 0-1'}]}])
+        self.assertEqual(len(sql), 2)
+        self.assertNotIn('description', sql[1])
+        data, _ = self.queries(f'/pcs/{self.pc.id}/?expand=components')
+        self.assertEqual(data['components'][0]['technical_details'], 'Details')
+
+    def test_fields_on_writes_are_ignored(self):
+        response = self.client.patch(f'/pcs/{self.pc.id}/?fields=id', {'name': 'Renamed'}, format='json')
+        self.assertEqual(response.data['name'], 'Renamed')
+
+    def test_unknown_names(self):
+        response = self.client.get('/components/?fields=id,search_vector')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
+        response = self.client.get('/pcs/?expand=owner')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expand', response.data)
+        self.assertEqual(self.client.get('/pcs/?expand=components&fields=components.nope').status_code, 400)
+
+    async def test_async_endpoints(self):
+        response = await AsyncClient().get('/async/components/?fields=id,name')
+        self.assertEqual(set(json.loads(response.content)['results'][0]), {'id', 'name'})
+        response = await AsyncClient().get('/async/pcs/?expand=components')
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncCatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rates.invalidate()
+        self.addCleanup(rates.invalidate)
+        self.client = APIClient()
+        self.async_client = AsyncClient()
+        self.pcs = create_pcs(3)
+        create_component(name='Radeon', type='GPU', price='50.00', currency='USD')
+
+    def sync_body(self, url):
+        return json.loads(self.client.get(url).content)
+
+    async def test_list_matches_sync_endpoint(self):
+        for query in ['?page_size=2', '?type=GPU', '?ordering=-price&price_max=100']:
+            response = await self.async_client.get(f'/async/components/{query}')
+            self.assertEqual(response.status_code, 200)
+            expected = await sync_to_async(self.sync_body)(f'/components/{query}')
+            body = json.loads(response.content)
+            self.assertEqual(body['results'], expected['results'])
+            self.assertEqual(body['next'] is None, expected['next'] is None)
+
+    async def test_cursor_walks_pages(self):
+        url, names = '/async/components/?page_size=4', []
+        while url:
+            body = json.loads((await self.async_client.get(url)).content)
+            names += [row['name'] for row in body['results']]
+            url = body['next']
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(len(names), 10)
+
+    async def test_pc_detail_and_not_found(self):
+        pc = self.pcs[0]
+        response = await self.async_client.get(f'/async/pcs/{pc.id}/')
+        expected = await sync_to_async(self.sync_body)(f'/pcs/{pc.id}/')
+        self.assertEqual(json.loads(response.content), expected)
+        response = await self.async_client.get('/async/pcs/999999/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content), {'detail': 'Not found.'})
+
+    async def test_cached_and_invalid_params(self):
+        self.assertEqual((await self.async_client.get('/async/pcs/'))['X-Cache'], 'MISS')
+        self.assertEqual((await self.async_client.get('/async/pcs/'))['X-Cache'], 'HIT')
+        response = await self.async_client.get('/async/components/?price_min=abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('price_min', json.loads(response.content))
+
+    async def test_currency_conversion(self):
+        await ExchangeRate.objects.aupdate_or_create(currency='USD', defaults={'rate': Decimal('2')})
+        response = await self.async_client.get('/async/components/?type=GPU&currency=EUR')
+        row = json.loads(response.content)['results'][0]
+        self.assertEqual((row['price'], row['currency']), ('25.00', 'EUR'))
+        response = await self.async_client.get('/async/components/?currency=XYZ')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(EXCHANGE_RATES_TTL=0)
+    async def test_expired_rates_are_loaded_off_the_event_loop(self):
+        # Every use of the rate matrix reloads it from the database
+        await ExchangeRate.objects.aupdate_or_create(currency='USD', defaults={'rate': Decimal('2')})
+        response = await self.async_client.get('/async/components/?ordering=price&price_max=30&currency=EUR')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['price'] for row in json.loads(response.content)['results']], ['25.00'])
+        response = await self.async_client.get(f'/async/pcs/{self.pcs[0].id}/?currency=USD')
+        self.assertEqual(json.loads(response.content)['price'], '600.00')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+    """ Routing decisions only, the `replica` alias is never connected to. """
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def route(self, method='get', cookies=None, steps=()):
+        """ Runs `steps` inside a request through the middleware, returns their results and the response. """
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies or {})
+        results = []
+
+        def view(request):
+            results.extend(step() for step in steps)
+            return Response()
+        response = ReplicaPinningMiddleware(view)(request)
+        return results, response
+
+    def read(self, model):
+        return lambda: self.router.db_for_read(model)
+
+    def write(self, model):
+        return lambda: self.router.db_for_write(model)
+
+    def test_catalog_and_user_reads_go_to_the_replica(self):
+        results, response = self.route(steps=[self.read(Component), self.read(User), self.read(Order)])
+        self.assertEqual(results, ['replica', 'replica', 'default'])
+        self.assertNotIn('db_primary', response.cookies)
+
+    def test_reads_after_a_write_go_to_the_primary(self):
+        results, response = self.route(steps=[self.read(Pc), self.write(Pc), self.read(Pc)])
+        self.assertEqual(results, ['replica', 'default', 'default'])
+        self.assertEqual(response.cookies['db_primary']['max-age'], settings.REPLICA_LAG_SECONDS)
+
+    def test_pinned_requests(self):
+        results, _ = self.route(method='post', steps=[self.read(Component)])
+        self.assertEqual(results, ['default'])
+        results, _ = self.route(cookies={'db_primary': '1'}, steps=[self.read(Component)])
+        self.assertEqual(results, ['default'])
+
+    def test_primary_blocks_and_locking_reads(self):
+        def in_primary_block():
+            with primary():
+                return self.router.db_for_read(Component)
+        results, _ = self.route(steps=[
+            in_primary_block, self.read(Component), lambda: Component.objects.select_for_update().db,
+        ])
+        self.assertEqual(results, ['default', 'replica', 'default'])
+
+    def test_outside_requests_and_without_replicas(self):
+        self.assertEqual(self.router.db_for_read(Component), 'default')
+        with override_settings(DATABASE_REPLICAS=[]):
+            results, _ = self.route(steps=[self.read(Component)])
+        self.assertEqual(results, ['default'])
+
+
+# A second database that is not a test mirror of `default`, e.g. two SQLite files:
+# DATABASES = {'default': {... 'NAME': 'primary.sqlite3'}, 'replica': {... 'NAME': 'replica.sqlite3'}}
+REPLICA = next((alias for alias, database in settings.DATABASES.items()
+                if alias != 'default' and not database.get('TEST', {}).get('MIRROR')), None)
+
+
+@skipUnless(REPLICA, 'needs a second database standing in for a replica')
+@override_settings(DATABASE_REPLICAS=[REPLICA] if REPLICA else [])
+class ReplicaReadTests(TestCase):
+    """ Primary and replica are separate databases here, so each read shows where it went. """
+    databases = {'default', REPLICA} if REPLICA else {'default'}
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        create_component(name='On both')
+        Component.objects.using(REPLICA).bulk_create([Component(
+            name='On both', type='CPU', manufacturer='AMD', price='100.00', description='', technical_details='',
+        )])
+
+    def names(self, client, url='/components/'):
+        return [row['name'] for row in client.get(url).data['results']]
+
+    def test_write_then_read_your_writes(self):
+        response = self.client.post('/components/', {
+            'name': 'New', 'type': 'GPU', 'manufacturer': 'AMD', 'price': '10.00',
+            'description': 'Description', 'technical_details': 'Details',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('db_primary', response.cookies)
+        # Not replicated in this setup: only the pinned client sees the new row
+        self.assertEqual(self.names(self.client), ['New', 'On both'])
+        self.assertEqual(self.names(APIClient()), ['On both'])
+
+    async def test_async_views_read_from_the_replica(self):
+        await Component.objects.acreate(
+            name='Primary only', type='CPU', manufacturer='AMD', price='1.00', description='', technical_details='',
+        )
+        response = await AsyncClient().get('/async/components/')
+        self.assertEqual([row['name'] for row in json.loads(response.content)['results']], ['On both'])
+
+    def test_orders_stay_on_the_primary(self):
+        user = User.objects.create_user(username='buyer', email='buyer@example.com', password='password')
+        Order.objects.create(user=user, total_price=0, status='pending', payment_method='card', payment_status='pending')
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assertEqual(len(client.get('/orders/').data['results']), 1)
@@ -1,6 +1,10 @@
 from rest_framework.routers import DefaultRouter
-from django.urls import path, include
-from .views import ComponentViewSet, PcViewSet
+from django.urls import path, include, re_path
+from . import snapshot
+from .async_views import AsyncComponentView, AsyncPcView
+from .views import (
+    AvailabilityView, ComponentViewSet, PcViewSet, CatalogCacheStatsView, CatalogExportView, CatalogImportView,
+)
 
 component_router = DefaultRouter()
 component_router.register('components', ComponentViewSet)
@@ -12,4 +16,13 @@ pc_router.register('pcs', PcViewSet)
 urlpatterns = [
     path('', include(component_router.urls)),
     path('', include(pc_router.urls)),
+    path('async/components/', AsyncComponentView.as_view(), name='async-component-list'),
+    path('async/components/<int:pk>/', AsyncComponentView.as_view(), name='async-component-detail'),
+    path('async/pcs/', AsyncPcView.as_view(), name='async-pc-list'),
+    path('async/pcs/<int:pk>/', AsyncPcView.as_view(), name='async-pc-detail'),
+    path('catalog/availability/', AvailabilityView.as_view(), name='catalog-availability'),
+    path('catalog/snapshot.json', snapshot.snapshot_view, name='catalog-snapshot'),
+    path('catalog/cache-stats/', CatalogCacheStatsView.as_view(), name='catalog-cache-stats'),
+    re_path(r'^catalog/export/(?P<kind>\w+)\.(?P<file_format>csv|jsonl)$', CatalogExportView.as_view(), name='catalog-export'),
+    re_path(r'^catalog/import/(?P<kind>\w+)\.(?P<file_format>csv|jsonl)$', CatalogImportView.as_view(), name='catalog-import'),
 ]
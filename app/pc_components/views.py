@@ -1,19 +1,194 @@
 from rest_framework import viewsets
-from .models import Component, Pc
-from .serializers import ComponentSerializer, PcSerializer
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.response import Response
+from rest_framework.views import APIView
+import io
+from django.db.models import Prefetch
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework.parsers import MultiPartParser
+from . import component_sets, compatibility, search, stock
+from app.app.fast_list import FastListMixin
+from app.app.fieldsets import FieldsetViewMixin
+from currencies import rates
+from currencies.views import CurrencyConversionMixin
+from .cache import CatalogCacheMixin, cached_response, get_stats
+from .catalog_io import TABLES, CatalogImportError, export_lines, import_rows, read_rows
+from .filters import QueryParamFilterBackend, parse_bool, parse_decimal, parse_ids
+from .models import Component, Pc, Pc_Components
+from .serializers import (
+    ComponentSerializer, PcComponentChangesSerializer, PcComponentListsSerializer, PcSerializer, RestockSerializer,
+)
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from .permissions import IsPcOwnerOrCustomizedFalse # Not needed currently
 
 
-class ComponentViewSet(viewsets.ModelViewSet):
-    queryset = Component.objects.all()
+class ComponentViewSet(CatalogCacheMixin, CurrencyConversionMixin, FieldsetViewMixin, FastListMixin, viewsets.ModelViewSet):
+    queryset = Component.objects.defer('search_vector')
     serializer_class = ComponentSerializer
     permission_classes = [AllowAny]
+    filter_backends = [QueryParamFilterBackend, OrderingFilter]
+    # Backed by the (type, price, id) and (manufacturer, type) indexes
+    filter_params = {
+        'type': ('type', str),
+        'manufacturer': ('manufacturer', str),
+        'price_min': ('price__gte', parse_decimal),
+        'price_max': ('price__lte', parse_decimal),
+    }
+    ordering_fields = ['price', 'name']
     ordering = ['name']
+    converted_fields = {'price': 'currency'}
 
-class PcViewSet(viewsets.ModelViewSet):
-    queryset = Pc.objects.all()
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """ Ranked full-text search: /components/search/?q=... (combinable with the list filters). """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'This query parameter is required.'})
+        return cached_response(request, lambda: self.convert_response(self._search(query)))
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
+    def restock(self, request, pk=None):
+        """ Adds {"quantity": n} units to the component's stock; an untracked component starts being tracked. """
+        serializer = RestockSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        component = get_object_or_404(Component.objects.only('id'), pk=pk)
+        stock.restock(component.id, serializer.validated_data['quantity'])
+        return Response({'id': component.id, 'stock': stock.component_availability([component.id])[component.id]})
+
+    def _search(self, query):
+        queryset = search.search(self.filter_queryset(self.get_queryset()), query)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+def pc_queryset():
+    """ Pcs with everything PcSerializer touches prefetched (only component ids are rendered). """
+    return Pc.objects.prefetch_related(
+        Prefetch('components', queryset=Component.objects.only('id'))
+    )
+
+
+class PcViewSet(CatalogCacheMixin, CurrencyConversionMixin, FieldsetViewMixin, FastListMixin, viewsets.ModelViewSet):
+    queryset = pc_queryset()
     serializer_class = PcSerializer
     permission_classes = [AllowAny]   # IsPcOwnerOrCustomizedFalse if customized pcs should be private to the user. (Needs change, foreign key to user needs to be added.)
+    filter_backends = [QueryParamFilterBackend, OrderingFilter]
+    # Backed by the (price, id) and (is_customized, price, id) indexes
+    filter_params = {
+        'is_customized': ('is_customized', parse_bool),
+        'price_min': ('price__gte', parse_decimal),
+        'price_max': ('price__lte', parse_decimal),
+    }
+    ordering_fields = ['price', 'name']
     ordering = ['name']
+    # Pc.price is kept in settings.BASE_CURRENCY
+    converted_fields = {'price': None}
+
+    @action(detail=True, methods=['get'], url_path='compatible-components')
+    def compatible_components(self, request, pk=None):
+        """ Components of ?type= that fit with the pc's other components, from the compatibility index. """
+        component_type = request.query_params.get('type', '').strip()
+        if not component_type:
+            raise ValidationError({'type': 'This query parameter is required.'})
+        return cached_response(request, lambda: self._compatible_components(pk, component_type))
+
+    @action(detail=False, methods=['put', 'patch'], url_path='components', permission_classes=[IsAdminUser])
+    def bulk_components(self, request):
+        """
+        Component lists of many pcs at once, diffed against their current links:
+        PUT {"pcs": [{"id": 1, "components": [4, 4, 9]}, ...]} replaces the lists,
+        PATCH {"pcs": [{"id": 1, "add": [7], "remove": [4]}, ...]} edits them.
+        """
+        if request.method == 'PUT':
+            serializer = PcComponentListsSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            pcs = serializer.validated_data['pcs']
+            result = component_sets.replace({pc['id']: pc['components'] for pc in pcs})
+        else:
+            serializer = PcComponentChangesSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            pcs = serializer.validated_data['pcs']
+            result = component_sets.patch({pc['id']: (pc['add'], pc['remove']) for pc in pcs})
+        return Response(result)
+
+    def _compatible_components(self, pk, component_type):
+        pc = get_object_or_404(Pc.objects.only('id'), pk=pk)
+        component_ids = Pc_Components.objects.filter(pc_id=pc.id).values_list('component_id', flat=True)
+        ids = compatibility.index.compatible(list(component_ids), component_type)
+        queryset = Component.objects.defer('search_vector').filter(id__in=ids).order_by('name', 'id')
+        page = self.paginate_queryset(queryset)
+        serializer = ComponentSerializer(page, many=True, context=self.get_serializer_context())
+        response = self.get_paginated_response(serializer.data)
+        currency = self.get_currency()
+        if currency is not None:
+            rates.convert_rows(response.data['results'], currency, ['price'], 'currency')
+        return response
+
+
+class AvailabilityView(APIView):
+    """
+    Units in stock: /catalog/availability/?components=1,2&pcs=3 -> {"components": {"1": 4, "2": null}, "pcs": {"3": 2}},
+    null meaning not tracked / unlimited. Read live, unlike the cached catalog.
+    """
+    permission_classes = [AllowAny]
+    max_ids = 1000
+
+    def get(self, request):
+        ids = {}
+        for param in ('components', 'pcs'):
+            try:
+                ids[param] = parse_ids(request.query_params.get(param, ''))
+            except ValueError:
+                raise ValidationError({param: 'Expected comma separated positive ids.'})
+            if len(ids[param]) > self.max_ids:
+                raise ValidationError({param: f'At most {self.max_ids} ids.'})
+        return Response({
+            'components': stock.component_availability(ids['components']) if ids['components'] else {},
+            'pcs': stock.pc_availability(ids['pcs']) if ids['pcs'] else {},
+        })
+
+
+class CatalogCacheStatsView(APIView):
+    """ Hit/miss counters of the catalog response cache. """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_stats())
+
+
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+class CatalogExportView(APIView):
+    """ Streams a catalog table: /catalog/export/components.csv, /catalog/export/pcs.jsonl, ... """
+    permission_classes = [AllowAny]
+
+    def get(self, request, kind, file_format):
+        if kind not in TABLES:
+            raise Http404
+        response = StreamingHttpResponse(export_lines(kind, file_format), content_type=CONTENT_TYPES[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{kind}.{file_format}"'
+        return response
+
+
+class CatalogImportView(APIView):
+    """ Upserts an uploaded CSV / JSON Lines `file` into a catalog table. """
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
 
+    def post(self, request, kind, file_format):
+        if kind not in TABLES:
+            raise Http404
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': 'No file was submitted.'})
+        stream = io.TextIOWrapper(upload, encoding='utf-8', newline='')
+        try:
+            count = import_rows(kind, read_rows(stream, file_format))
+        except CatalogImportError as error:
+            raise ValidationError({'file': str(error)})
+        return Response({'imported': count})
@@ -1,7 +1,9 @@
 from django.apps import AppConfig
 
-print("start apps users")
+
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
-print("end apps users")
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from app.app.routers import primary
+from .models import User
+
+TOKEN_VERSION_CLAIM = 'token_version'
+
+
+def _ttl():
+    return getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+
+
+def _version_key(user_id):
+    return f'users:token_version:{user_id}'
+
+
+def _user_key(user_id):
+    return f'users:user:{user_id}'
+
+
+def get_token_version(user_id, use_cache=True):
+    """
+    Current token version of an active user, or None if the user is gone or inactive.
+    Cached for AUTH_USER_CACHE_TTL seconds, so revocation through another process's
+    local-memory cache takes effect within that TTL.
+    """
+    if use_cache:
+        version = cache.get(_version_key(user_id))
+        if version is not None:
+            return version
+    # From the primary, a lagging replica could hand back the version of revoked tokens
+    with primary():
+        version = User.objects.filter(pk=user_id, is_active=True).values_list('token_version', flat=True).first()
+    if version is not None:
+        cache.set(_version_key(user_id), version, _ttl())
+    return version
+
+
+def get_cached_user(user_id):
+    """ Full User row through a short TTL cache. """
+    user = cache.get(_user_key(user_id))
+    if user is None:
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(_user_key(user_id), user, _ttl())
+    return user
+
+
+def forget_user(user_id):
+    cache.delete_many([_version_key(user_id), _user_key(user_id)])
+
+
+def revoke_tokens(user):
+    """ Invalidate every access and refresh token issued to `user` so far. """
+    User.objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    forget_user(user.pk)
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user built from the signed token claims (id, is_superuser, is_staff, token version).
+    Code that needs the real model instance uses `.user`, served from a short TTL cache.
+    """
+
+    @cached_property
+    def user(self):
+        return get_cached_user(self.id)
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication without a per-request User query. Tokens are rejected once the
+    user's token version has been bumped (see `revoke_tokens`) or the user is deactivated.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if validated_token.get(TOKEN_VERSION_CLAIM, 0) != get_token_version(user.id):
+            raise AuthenticationFailed('Token has been revoked.', code='token_revoked')
+        return user
@@ -8,8 +8,16 @@ from django.contrib.auth.models import AbstractUser
 class User(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     pcs = models.ManyToManyField('pc_components.Pc', through='User_Pc')
+    # Claimed by issued JWTs; bumping it revokes all of them (users.authentication)
+    token_version = models.PositiveIntegerField(default=0, editable=False)
     REQUIRED_FIELDS = ['email']
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Keyset pagination over the default `created_at` ordering
+            models.Index(fields=['created_at', 'id'], name='user_created_at_id_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -1,11 +1,18 @@
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from .models import User
+from .authentication import TOKEN_VERSION_CLAIM, get_token_version, revoke_tokens
 from django.contrib.auth.hashers import make_password
+from app.app.fieldsets import FieldsetMixin
 from pc_components import serializers as pc_serializers
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(FieldsetMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
-    pcs = pc_serializers.PcSerializer(many=True, read_only=True)
+    # Pc ids, the pcs themselves with ?expand=pcs
+    pcs = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    expandable_fields = {'pcs': (pc_serializers.PcSerializer, {'many': True, 'read_only': True})}
 
     class Meta:
         model = User
@@ -18,7 +25,33 @@ class UserSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
-        """ Hash the password when updating a user password """
+        """ Hash the password when updating a user password and revoke the issued tokens """
         if 'password' in validated_data:
             validated_data['password'] = make_password(validated_data['password'])
-        return super().update(instance, validated_data)
\ No newline at end of file
+            revoke_tokens(instance)
+            instance.refresh_from_db(fields=['token_version'])
+        return super().update(instance, validated_data)
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    """ Adds the claims the stateless authentication needs instead of a User query. """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['is_superuser'] = user.is_superuser
+        # Read by IsAdminUser through TokenUser.is_staff
+        token['is_staff'] = user.is_staff
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """ Refuses refresh tokens issued before the user's token version was bumped. """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user_id = refresh.payload.get(jwt_settings.USER_ID_CLAIM)
+        if refresh.get(TOKEN_VERSION_CLAIM, 0) != get_token_version(user_id, use_cache=False):
+            raise AuthenticationFailed('Token has been revoked.', code='token_revoked')
+        return super().validate(attrs)
\ No newline at end of file
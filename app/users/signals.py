@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .authentication import forget_user, revoke_tokens
+from .models import User
+
+# Baked into the token claims or checked before trusting them
+PRIVILEGE_FIELDS = ('is_superuser', 'is_staff', 'is_active')
+
+
+@receiver(pre_save, sender=User)
+def remember_privileges(sender, instance, raw=False, update_fields=None, **kwargs):
+    """ The stored privileges, to tell in post_save whether this save changes them. """
+    instance._stored_privileges = None
+    if raw or instance._state.adding or (update_fields is not None and not set(PRIVILEGE_FIELDS) & set(update_fields)):
+        return
+    instance._stored_privileges = User.objects.filter(pk=instance.pk).values_list(*PRIVILEGE_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_privilege_change(sender, instance, **kwargs):
+    """ Tokens carry is_superuser and are refreshed without a User query: reissue them after a change. """
+    stored = getattr(instance, '_stored_privileges', None)
+    if stored is not None and stored != tuple(getattr(instance, name) for name in PRIVILEGE_FIELDS):
+        revoke_tokens(instance)
+        # A later full save() must not write the old version back
+        instance.refresh_from_db(fields=['token_version'])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    """ Drop the cached token version and user row so deactivation applies immediately. """
+    forget_user(instance.pk)
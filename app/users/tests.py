@@ -1,3 +1,118 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from app.app import throttling
+from pc_components.tests import count_queries, create_pcs
+from .authentication import StatelessJWTAuthentication
+from .models import User, User_Pc
 
-# Create your tests here.
+
+class UserQueryCountTests(TestCase):
+    """ Query counts must not grow with the number of users or their pcs (N vs 10*N). """
+    N = 3
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_authenticate(self.admin)
+
+    def create_users(self, count, pcs_per_user=2):
+        users = []
+        for i in range(count):
+            user = User.objects.create(username=f'user{User.objects.count()}')
+            for pc in create_pcs(pcs_per_user):
+                User_Pc.objects.create(user=user, pc=pc)
+            users.append(user)
+        return users
+
+    def test_user_list(self):
+        self.create_users(self.N)
+        small = count_queries(self.client, '/users/?page_size=100')
+        self.create_users(9 * self.N)
+        large = count_queries(self.client, '/users/?page_size=100')
+        self.assertEqual(small, large)
+
+    def test_user_detail(self):
+        small_user = self.create_users(1, pcs_per_user=self.N)[0]
+        large_user = self.create_users(1, pcs_per_user=10 * self.N)[0]
+        self.assertEqual(
+            count_queries(self.client, f'/users/{small_user.id}/'),
+            count_queries(self.client, f'/users/{large_user.id}/'),
+        )
+
+    def test_pcs_expanded_on_request(self):
+        user = self.create_users(1)[0]
+        pc = user.pcs.order_by('id').first()
+        data = self.client.get(f'/users/{user.id}/').data
+        self.assertEqual(data['pcs'], list(user.pcs.order_by('id').values_list('id', flat=True)))
+        data = self.client.get(f'/users/{user.id}/?expand=pcs.components&fields=pcs.name,pcs.components.name').data
+        self.assertEqual(data['pcs'][0], {'name': pc.name, 'components': [
+            {'name': name} for name in pc.components.order_by('id').values_list('name', flat=True)
+        ]})
+        self.assertEqual(
+            count_queries(self.client, f'/users/{user.id}/?fields=id,username') + 1,
+            count_queries(self.client, f'/users/{user.id}/'),
+        )
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        throttling.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user('customer', 'customer@example.com', 'secret-password')
+        tokens = self.client.post('/api/token/', {'username': 'customer', 'password': 'secret-password'}).data
+        self.access, self.refresh = tokens['access'], tokens['refresh']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+    def test_no_user_query_per_request(self):
+        self.client.get('/orders/')  # warms the token version cache
+        # Only the orders page itself is queried
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/orders/').status_code, 200)
+
+    def test_claims(self):
+        user = StatelessJWTAuthentication().get_user(AccessToken(self.access))
+        self.assertEqual((user.id, user.is_superuser), (self.user.id, False))
+        self.assertEqual(user.user, self.user)
+
+    def test_revoked_access_and_refresh_tokens_are_rejected(self):
+        self.assertEqual(self.client.post(f'/users/{self.user.id}/revoke-tokens/').status_code, 204)
+        self.assertEqual(self.client.get('/orders/').status_code, 401)
+        response = self.client.post('/api/token/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 401)
+
+    def test_demoted_superuser_loses_admin_access(self):
+        admin = User.objects.create_user('admin', 'admin@example.com', 'secret-password', is_superuser=True)
+        tokens = self.client.post('/api/token/', {'username': 'admin', 'password': 'secret-password'}).data
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.assertEqual(len(client.get('/users/').data['results']), 2)
+
+        admin.is_superuser = False
+        admin.save()
+        self.assertEqual(client.get('/users/').status_code, 401)
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}).status_code, 401)
+        tokens = self.client.post('/api/token/', {'username': 'admin', 'password': 'secret-password'}).data
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.assertEqual([row['id'] for row in client.get('/users/').data['results']], [admin.id])
+        # Saves that leave the privileges alone keep the tokens valid
+        admin.email = 'renamed@example.com'
+        admin.save()
+        self.assertEqual(client.get('/users/').status_code, 200)
+
+    def test_staff_claim_grants_admin_endpoints(self):
+        User.objects.create_user('staff', 'staff@example.com', 'secret-password', is_staff=True, is_superuser=True)
+        tokens = self.client.post('/api/token/', {'username': 'staff', 'password': 'secret-password'}).data
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.assertEqual(client.get('/catalog/cache-stats/').status_code, 200)
+        # A customer's token doesn't carry it
+        self.assertEqual(self.client.get('/catalog/cache-stats/').status_code, 403)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get('/orders/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/orders/').status_code, 401)
@@ -1,20 +1,28 @@
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework_simplejwt import views as jwt_views
 from .models import User
 from .serializers import UserSerializer
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from .permissions import IsUserOwner
+from .authentication import revoke_tokens
+from app.app.fieldsets import FieldsetViewMixin
+from app.app.throttling import TokenBucketThrottle
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(FieldsetViewMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     ordering = ['created_at']
 
     def get_queryset(self):
+        # The pcs (ids, or the expanded pcs) are prefetched by FieldsetViewMixin
+        queryset = User.objects.all()
         if self.request.user.is_superuser:
-            return User.objects.all()
+            return queryset
         else:
-            return User.objects.filter(id=self.request.user.id)
+            return queryset.filter(id=self.request.user.id)
 
     def get_permissions(self):
         if self.request.method == "POST":
@@ -22,6 +30,19 @@ class UserViewSet(viewsets.ModelViewSet):
         else:
             return [IsAuthenticated(), IsUserOwner()]
 
+    @action(detail=True, methods=['post'], url_path='revoke-tokens')
+    def revoke_tokens(self, request, pk=None):
+        """ Log the user out everywhere by invalidating all issued tokens. """
+        revoke_tokens(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class TokenObtainPairView(jwt_views.TokenObtainPairView):
+    """ Throttled per client IP and in total: every attempt runs the password hasher. """
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'token'
 
+
+class TokenRefreshView(jwt_views.TokenRefreshView):
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'token'
@@ -13,5 +13,9 @@ export DJANGO_SETTINGS_MODULE=app.settings
 cd /opt/render/project/src/app
 python manage.py collectstatic --noinput
 
+# Prebuild the OpenAPI schema for the prod profile, whose workers serve this file
+# (OPENAPI_SCHEMA_FILE) at /api/schema/ instead of loading drf-spectacular
+DJANGO_APP_PROFILE=dev python manage.py spectacular --format openapi-json --file openapi.json
+
 # Apply database migrations
 python manage.py migrate
\ No newline at end of file